@@ -0,0 +1,182 @@
+import re
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ------------------ Config ------------------
+# Batches are sized by serialized bytes rather than feature count: a 120-vertex
+# ground track is ~50x the size of a point, so a fixed count either wastes
+# round trips on points or builds huge requests for lines.
+MAX_BATCH_BYTES = 1_000_000
+MAX_BATCH_FEATURES = 1000
+WORKERS = 4
+RETRIES = 3
+BACKOFF_SECONDS = 1.0
+
+RESULT_KEYS = {"adds": "addResults", "updates": "updateResults", "deletes": "deleteResults"}
+# HTTP statuses worth another try; anything else (and every per-item failure
+# in an edit response, e.g. a bad attribute) would fail the same way again
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+
+class UploadResult:
+    def __init__(self, operation, count):
+        self.operation = operation
+        self.submitted = count
+        # Per-item edit results, aligned with the submitted items
+        self.results = [None] * count
+        self.batches = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.seconds = 0.0
+
+    @property
+    def succeeded(self):
+        return sum(1 for r in self.results if r and r.get("success"))
+
+    @property
+    def failed(self):
+        return [i for i, r in enumerate(self.results) if not (r and r.get("success"))]
+
+    @property
+    def features_per_second(self):
+        return self.succeeded / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes_sent / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return {
+            "operation": self.operation,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": len(self.failed),
+            "batches": self.batches,
+            "retries": self.retries,
+            "bytes_sent": self.bytes_sent,
+            "seconds": round(self.seconds, 3),
+            "features_per_second": round(self.features_per_second, 1),
+            "bytes_per_second": round(self.bytes_per_second, 1),
+        }
+
+
+def payload_size(item):
+    return len(json.dumps(item, separators=(",", ":"), default=str))
+
+
+def make_batches(indices, sizes, max_bytes=MAX_BATCH_BYTES, max_features=MAX_BATCH_FEATURES):
+    batches, batch, batch_bytes = [], [], 0
+    for i in indices:
+        if batch and (batch_bytes + sizes[i] > max_bytes or len(batch) >= max_features):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(i)
+        batch_bytes += sizes[i]
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# Status code of a failed request: requests' HTTPError carries the response,
+# the arcgis package only puts "(Error Code: 503)" in the message
+def error_status(error):
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    if status is None:
+        match = re.search(r"(?:error code|status)\D{0,3}(\d{3})", str(error), re.IGNORECASE)
+        status = int(match.group(1)) if match else None
+    return status
+
+
+# Timeouts, dropped connections and 5xx/429 answers; requests' exceptions are
+# OSErrors too
+def is_transient(error):
+    status = error_status(error)
+    if status is not None:
+        return status in TRANSIENT_STATUS
+    return isinstance(error, (OSError, TimeoutError))
+
+
+def send_batch(layer, operation, items, batch):
+    try:
+        response = layer.edit_features(**{operation: [items[i] for i in batch]})
+        return response.get(RESULT_KEYS[operation]) or [], None
+    except Exception as e:
+        return [], e
+
+
+# ------------------ Concurrent uploader ------------------
+# Keeps up to `workers` batches in flight.  Only batches whose whole request
+# failed transiently (is_transient) are resubmitted, after an exponential
+# backoff, with the byte budget halved; items the service rejected stay failed.
+#
+# Updates and deletes are idempotent, so they are simply sent again.  Adds are
+# not: a request that timed out may still have been applied, and resending it
+# would create duplicates.  Their items go to reconcile(indices), which looks
+# them up on the layer and returns {index: edit result} for those that made it;
+# only the rest are resent.  Without a reconcile callback they are not resent.
+def upload(layer, operation, items, max_bytes=MAX_BATCH_BYTES, max_features=MAX_BATCH_FEATURES,
+           workers=WORKERS, retries=RETRIES, backoff=BACKOFF_SECONDS, reconcile=None):
+    result = UploadResult(operation, len(items))
+    if not items:
+        return result
+
+    start = time.perf_counter()
+    sizes = [payload_size(item) for item in items]
+    pending = list(range(len(items)))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for attempt in range(retries + 1):
+            if attempt:
+                result.retries += 1
+                delay = backoff * 2 ** (attempt - 1)
+                print(f"Retrying {len(pending)} {operation} in {delay:.1f}s (attempt {attempt}/{retries})")
+                time.sleep(delay)
+
+            batches = make_batches(pending, sizes, max_bytes, max_features)
+            result.batches += len(batches)
+            result.bytes_sent += sum(sizes[i] for i in pending)
+
+            retry, ambiguous = [], []
+            for batch, (responses, error) in zip(
+                    batches, pool.map(lambda b: send_batch(layer, operation, items, b), batches)):
+                for i, response in zip(batch, responses):
+                    result.results[i] = response
+                if error is None:
+                    continue
+                print(f"Upload of {len(batch)} {operation} failed: {error}")
+                if not is_transient(error):
+                    continue
+                (ambiguous if operation == "adds" else retry).extend(batch)
+
+            if ambiguous:
+                retry.extend(reconcile_adds(reconcile, ambiguous, result))
+            pending = retry
+            if not pending:
+                break
+            max_bytes = max(max_bytes // 2, 1)
+
+    result.seconds = time.perf_counter() - start
+    print(f"Uploaded {result.succeeded}/{result.submitted} {operation} in {result.batches} batches, "
+          f"{result.seconds:.2f}s ({result.features_per_second:.0f} features/s, "
+          f"{result.bytes_sent / 1e6:.2f} MB)")
+    return result
+
+
+# Records the adds that reconcile() found on the layer; returns the indices
+# that are safe to send again
+def reconcile_adds(reconcile, indices, result):
+    if reconcile is None:
+        print(f"Not resending {len(indices)} adds: no way to check whether they were applied")
+        return []
+    try:
+        found = reconcile(indices)
+    except Exception as e:
+        print(f"Could not check {len(indices)} adds against the layer ({e}); not resending them")
+        return []
+    for i, response in found.items():
+        result.results[i] = response
+    if found:
+        print(f"{len(found)} of {len(indices)} adds had been applied despite the error")
+    return [i for i in indices if i not in found]
@@ -0,0 +1,78 @@
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from conjunctions import SCREEN_DISTANCE_KM, find_conjunctions, grid_pairs, screening_radius  # noqa: E402
+from instrumentation import RunReport  # noqa: E402
+from propagation import propagate_catalog, geodetic_to_itrs  # noqa: E402
+from synthetic import parse_mix, synthetic_gp  # noqa: E402
+
+# Conjunction screening across catalog sizes: the hour-long propagation
+# update_ground_tracks.py already does, then the grid screen plus refinement.
+# --brute also times the all-pairs distance check per step it replaces (and
+# checks both find the same pairs) up to --brute-max satellites.
+#   python benchmarks/bench_conjunctions.py --satellites 1000 5000 10000 20000
+
+
+def brute_pairs(r, radius_km):
+    valid = np.nonzero(np.isfinite(r).all(axis=1))[0]
+    p = r[valid]
+    pairs = set()
+    for k in range(len(p) - 1):
+        distance = np.linalg.norm(p[k + 1:] - p[k], axis=1)
+        pairs.update((int(valid[k]), int(valid[k + 1 + m])) for m in np.nonzero(distance < radius_km)[0])
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--satellites", type=int, nargs="+", default=[1000, 5000, 10000, 20000])
+    parser.add_argument("--mix", type=parse_mix, default=None, help="orbit regime shares, e.g. leo=0.8,geo=0.2")
+    parser.add_argument("--distance-km", type=float, default=SCREEN_DISTANCE_KM)
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument("--step", type=int, default=30)
+    parser.add_argument("--brute", action="store_true")
+    parser.add_argument("--brute-max", type=int, default=5000)
+    args = parser.parse_args()
+
+    epoch = datetime.datetime(2025, 6, 1, 12)
+    offsets = np.arange(0, args.minutes * 60, args.step)
+    radius_km = screening_radius(args.distance_km, args.step)
+    print(f"screening radius {radius_km:.1f} km for {args.distance_km} km at {args.step} s steps")
+    print(f"{'satellites':>10} {'propagate s':>11} {'screen s':>9} {'candidates':>10} {'refined':>8} {'found':>6} "
+          f"{'brute step s':>12} {'grid step s':>11} {'same pairs':>10}")
+    for count in args.satellites:
+        tle_data = synthetic_gp(count, epoch=epoch, mix=args.mix)
+        start = time.perf_counter()
+        catalog, lon, lat, alt_km = propagate_catalog(tle_data, epoch, offsets)
+        propagate_s = time.perf_counter() - start
+
+        report = RunReport("bench_conjunctions", path="")
+        start = time.perf_counter()
+        conjunctions = find_conjunctions(catalog, lon, lat, alt_km, tle_data, epoch, offsets,
+                                         distance_km=args.distance_km, report=report)
+        screen_s = time.perf_counter() - start
+
+        brute_s = grid_s = same = ""
+        if args.brute and count <= args.brute_max:
+            r = geodetic_to_itrs(lon[:, 0], lat[:, 0], alt_km[:, 0])
+            start = time.perf_counter()
+            expected = brute_pairs(r, radius_km)
+            brute_s = f"{time.perf_counter() - start:.4f}"
+            start = time.perf_counter()
+            i, j, _ = grid_pairs(r, radius_km)
+            grid_s = f"{time.perf_counter() - start:.4f}"
+            same = str(expected == set(zip(i.tolist(), j.tolist())))
+
+        print(f"{count:>10} {propagate_s:>11.3f} {screen_s:>9.3f} {report.counters['conjunction_candidates']:>10} "
+              f"{report.counters['conjunction_refined']:>8} {len(conjunctions):>6} {brute_s:>12} {grid_s:>11} {same:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ephemeris import Ephemeris, STEP_SECONDS  # noqa: E402
+from propagation import load_catalog, time_grid, propagate_itrs  # noqa: E402
+from synthetic import REGIMES, synthetic_gp  # noqa: E402
+from timescale import load_timescale  # noqa: E402
+
+# Ephemeris table vs direct SGP4: build time, the worst mid-step interpolation
+# error per orbit regime (the bound quoted in ephemeris.py), and query time
+# for the point layer (one step) and the ground tracks (an hour at 30 s).
+#   python benchmarks/bench_ephemeris.py --satellites 200 --steps 60 120 300
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--satellites", type=int, default=200, help="satellites per regime")
+    parser.add_argument("--regimes", nargs="+", choices=list(REGIMES), default=list(REGIMES))
+    parser.add_argument("--steps", type=int, nargs="+", default=[STEP_SECONDS])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    ts = load_timescale()
+    epoch = datetime.datetime(2025, 6, 1, 12)
+    now = epoch + datetime.timedelta(minutes=30)
+    track_offsets = np.arange(0, 3600, 30)
+
+    print(f"{'regime':>6} {'step s':>6} {'build s':>8} {'max err m':>10} "
+          f"{'point sgp4':>10} {'point eph':>10} {'track sgp4':>10} {'track eph':>10} {'track diff m':>12}")
+    for regime in args.regimes:
+        tle_data = synthetic_gp(args.satellites, epoch=epoch, mix={regime: 1.0})
+        catalog = load_catalog(tle_data, verbose=False)
+        satrec_array = catalog.array()
+        for step_s in args.steps:
+            with tempfile.TemporaryDirectory() as directory:
+                ephemeris = Ephemeris(os.path.join(directory, "ephemeris"), step_s=step_s)
+                start = time.perf_counter()
+                ephemeris.update(tle_data, now)
+                build_s = time.perf_counter() - start
+                error_m = ephemeris.interpolation_error_km(catalog, range(len(catalog))) * 1000
+
+                t, jd, fr = time_grid(ts, now, [0.0])
+                point_sgp4, _ = best_of(args.repeat, lambda: propagate_itrs(satrec_array, t, jd, fr))
+                point_eph, _ = best_of(args.repeat, lambda: ephemeris.itrs(catalog, now, [0.0], t, jd, fr))
+
+                t, jd, fr = time_grid(ts, now, track_offsets)
+                track_sgp4, direct = best_of(args.repeat, lambda: propagate_itrs(satrec_array, t, jd, fr))
+                track_eph, interpolated = best_of(
+                    args.repeat, lambda: ephemeris.itrs(catalog, now, track_offsets, t, jd, fr))
+                track_diff_m = float(np.nanmax(np.linalg.norm(interpolated - direct, axis=2))) * 1000
+                del ephemeris
+
+            print(f"{regime:>6} {step_s:>6} {build_s:>8.3f} {error_m:>10.2f} {point_sgp4:>10.5f} "
+                  f"{point_eph:>10.5f} {track_sgp4:>10.4f} {track_eph:>10.4f} {track_diff_m:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from flood_raster import Raster, create_float_grid  # noqa: E402
+from flood_reclassify import REMAP_RANGES, class_regions, reclassify, reclassify_rasters  # noqa: E402
+
+# code/flood_reclassify.py on synthetic depth rasters: the RemapRange
+# boundaries, polygons against a cell-by-cell reference, tiled + pooled
+# against a single tile, and timings across raster sizes and worker counts.
+#   python benchmarks/bench_flood_reclassify.py --sizes 2000 8000 --workers 1 4
+
+
+# Smooth flood-like depth surface (a few basins, 0..~15 m) with dry (NODATA)
+# patches, written block by block so it never has to fit in memory
+def synthetic_depth(path, size, cell=3.0, seed=0, block_rows=512):
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform(0, size, (6, 2))
+    widths = rng.uniform(size / 12, size / 4, 6)
+    depths = rng.uniform(3, 15, 6)
+    grid = create_float_grid(path, size, size, left=500000.0, bottom=3800000.0, cell=cell)
+    cols = np.arange(size)
+    for row0 in range(0, size, block_rows):
+        rows = np.arange(row0, min(row0 + block_rows, size))[:, None]
+        depth = np.zeros((len(rows), size))
+        for (cy, cx), width, peak in zip(centres, widths, depths):
+            depth += peak * np.exp(-((rows - cy) ** 2 + (cols - cx) ** 2) / (2 * width ** 2))
+        depth += 0.3 * np.sin(cols / 37.0) * np.cos(rows / 53.0)
+        depth[depth < 0.05] = np.nan
+        grid[row0:row0 + len(rows)] = np.where(np.isnan(depth), -9999.0, depth)
+    grid.flush()
+    return path
+
+
+def check_boundaries():
+    values = np.array([-0.1, 0.0, 0.5, 1.0, np.nextafter(1.0, 2), 2.0, 5.0, 5.5, 10.0, 10.5, 100.0, 100.1, np.nan])
+    expected = []
+    for value in values:
+        found = 0
+        for low, high, code in REMAP_RANGES:
+            if (low < value <= high) or (value == low == REMAP_RANGES[0][0]):
+                found = code
+                break
+        expected.append(found)
+    return reclassify(values).tolist() == expected
+
+
+# Every classified cell as its own box, unioned -- slow but obviously right
+def check_against_cells(size=120):
+    with tempfile.TemporaryDirectory() as folder:
+        raster = Raster(synthetic_depth(os.path.join(folder, "small.flt"), size, seed=3))
+        classes = reclassify(raster.read((0, 0, size, size)))
+        regions = class_regions(classes)
+        for value in np.unique(classes[classes > 0]):
+            rows, cols = np.nonzero(classes == value)
+            cells = shapely.union_all(shapely.box(cols, rows, cols + 1, rows + 1))
+            if not shapely.equals(cells, regions[int(value)]):
+                return False
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 4000, 8000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--tile-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    print("RemapRange boundaries match:", check_boundaries())
+    print("Polygons match a cell-by-cell union:", check_against_cells())
+
+    print(f"{'cells':>12} {'workers':>7} {'seconds':>8} {'Mcells/s':>8} {'classes':>7} {'vertices':>9} "
+          f"{'area ok':>7} {'same as 1 tile':>14}")
+    with tempfile.TemporaryDirectory() as folder:
+        for size in args.sizes:
+            path = synthetic_depth(os.path.join(folder, f"depth_{size}.flt"), size)
+            single = None
+            if size <= 4000:
+                single = reclassify_rasters([path], tile_size=size, workers=1)[path]
+            for workers in args.workers:
+                start = time.perf_counter()
+                rows = reclassify_rasters([path], tile_size=args.tile_size, workers=workers)[path]
+                seconds = time.perf_counter() - start
+                vertices = sum(shapely.get_num_coordinates(row["geometry"]) for row in rows)
+                area_ok = all(abs(row["geometry"].area - row["area"]) <= 1e-6 * row["area"] for row in rows)
+                same = ""
+                if single is not None:
+                    same = str(len(single) == len(rows) and all(
+                        a["pixels"] == b["pixels"] and shapely.equals(a["geometry"], b["geometry"])
+                        for a, b in zip(single, rows)))
+                print(f"{size * size:>12} {workers:>7} {seconds:>8.2f} {size * size / seconds / 1e6:>8.1f} "
+                      f"{len(rows):>7} {vertices:>9} {str(area_ok):>7} {same:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_flood_reclassify import synthetic_depth  # noqa: E402
+from flood_raster import Raster  # noqa: E402
+from flood_structures import (EVENT_TABLES, GeoPackageBackend, MemoryBackend, join_flood_depths,  # noqa: E402
+                              quote, register_gpkg_functions, zonal_max)
+
+# code/flood_structures.py with synthetic buildings: the single-pass join
+# against the arcpy script's one-pass-per-event loop (in memory and on a
+# GeoPackage), and the zonal max computed from a depth raster against a
+# footprint-by-footprint reference.
+#   python benchmarks/bench_flood_structures.py --buildings 1000000
+
+
+def synthetic_buildings(count, raster, seed=0):
+    rng = np.random.default_rng(seed)
+    width = raster.ncols * raster.cell
+    height = raster.nrows * raster.cell
+    x = raster.left + rng.uniform(0, width, count)
+    y = raster.top - rng.uniform(0, height, count)
+    w, h = rng.uniform(2, 30, count), rng.uniform(2, 30, count)
+    return np.arange(1, count + 1), shapely.box(x, y, x + w, y + h)
+
+
+def synthetic_tables(ids, seed=0):
+    rng = np.random.default_rng(seed)
+    tables = {}
+    for k, table in enumerate(EVENT_TABLES.values()):
+        flooded = ids[rng.random(len(ids)) < 0.1 + 0.1 * k]
+        depth = rng.uniform(0, 2 + k, len(flooded))
+        depth[rng.random(len(flooded)) < 0.01] = np.nan
+        tables[table] = {"OBJECTID_1": flooded, "MAX": depth}
+    return tables
+
+
+# Flood_Depth_Statistic_to_Structures.py's loop: a dict and a full pass over
+# the buildings per event
+def per_event_passes(ids, tables):
+    fields = {}
+    for event, table in EVENT_TABLES.items():
+        max_values = dict(zip(tables[table]["OBJECTID_1"].tolist(), tables[table]["MAX"].tolist()))
+        column = []
+        for object_id in ids.tolist():
+            column.append(max_values.get(object_id))
+        fields[event] = column
+    return fields
+
+
+def write_geopackage(path, ids, footprints, tables):
+    import geopandas as gpd
+    import pandas as pd
+    import pyogrio
+
+    gpd.GeoDataFrame({"OBJECTID": ids}, geometry=footprints, crs="EPSG:32615").to_file(
+        path, layer="500 Year Buildings", driver="GPKG")
+    for table, columns in tables.items():
+        pyogrio.write_dataframe(pd.DataFrame(columns), path, layer=table)
+
+
+def per_event_updates(path):
+    connection = sqlite3.connect(path)
+    register_gpkg_functions(connection)
+    table = quote("500 Year Buildings")
+    with connection:
+        for event, zonal in EVENT_TABLES.items():
+            max_values = dict(connection.execute(f"SELECT OBJECTID_1, MAX FROM {quote(zonal)}"))
+            # Row by row through the primary key, as an UpdateCursor walks the table
+            rows = connection.execute(f"SELECT fid, OBJECTID FROM {table}").fetchall()
+            connection.executemany(f"UPDATE {table} SET {quote(event)} = ? WHERE fid = ?",
+                                   ((max_values.get(object_id), fid) for fid, object_id in rows))
+    connection.close()
+
+
+def reference_zonal_max(raster, footprint):
+    (row0,), (col0,), (row1,), (col1,) = raster.windows(shapely.bounds(footprint))
+    rows, cols = np.mgrid[row0:row1, col0:col1]
+    x, y = raster.centres(rows.ravel(), cols.ravel())
+    inside = shapely.contains_xy(footprint, x, y)
+    depth = np.asarray(raster.data[rows.ravel()[inside], cols.ravel()[inside]], dtype=float)
+    depth[depth == raster.nodata] = np.nan
+    if not inside.any():
+        return None
+    return np.nan if np.isnan(depth).all() else np.nanmax(depth)
+
+
+def same(a, b):
+    return np.array_equal(np.asarray(a, dtype=float), np.asarray(b, dtype=float), equal_nan=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--buildings", type=int, default=1_000_000)
+    parser.add_argument("--raster-size", type=int, default=6000, help="cells per side of the 3 m depth raster")
+    parser.add_argument("--reference", type=int, default=500, help="footprints checked one by one")
+    parser.add_argument("--no-geopackage", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        raster = Raster(synthetic_depth(os.path.join(folder, "depth.flt"), args.raster_size))
+        ids, footprints = synthetic_buildings(args.buildings, raster)
+        tables = synthetic_tables(ids)
+        print(f"{args.buildings} buildings, {sum(len(t['MAX']) for t in tables.values())} zonal rows")
+
+        start = time.perf_counter()
+        expected = per_event_passes(ids, tables)
+        print(f"  per-event passes (arcpy script loop)   {time.perf_counter() - start:7.2f} s")
+        backend = MemoryBackend(ids, footprints, tables)
+        start = time.perf_counter()
+        join_flood_depths(backend)
+        print(f"  single pass, MemoryBackend             {time.perf_counter() - start:7.2f} s")
+        backend_fields = backend.fields
+        print("  same values:", all(same(backend.fields[e], [np.nan if v is None else v for v in expected[e]])
+                                   for e in EVENT_TABLES))
+
+        if not args.no_geopackage:
+            path = os.path.join(folder, "buildings.gpkg")
+            start = time.perf_counter()
+            write_geopackage(path, ids, footprints, tables)
+            print(f"  (GeoPackage written in {time.perf_counter() - start:.2f} s)")
+            backend = GeoPackageBackend(path)
+            start = time.perf_counter()
+            join_flood_depths(backend)
+            print(f"  single pass, GeoPackageBackend         {time.perf_counter() - start:7.2f} s")
+            fields = ", ".join(quote(e) for e in EVENT_TABLES)
+            written = backend.connection.execute(f"SELECT {fields} FROM {quote('500 Year Buildings')} "
+                                                 "ORDER BY OBJECTID").fetchall()
+            backend.close()
+            written = np.array(written, dtype=float)
+            print("  same values:", all(same(written[:, j], backend_fields[e]) for j, e in enumerate(EVENT_TABLES)))
+            start = time.perf_counter()
+            per_event_updates(path)
+            print(f"  per-event UPDATE passes, GeoPackage    {time.perf_counter() - start:7.2f} s")
+
+        start = time.perf_counter()
+        depth = zonal_max(raster, footprints)
+        seconds = time.perf_counter() - start
+        print(f"  zonal max from raster                  {seconds:7.2f} s "
+              f"({np.isfinite(depth).sum()} buildings wet)")
+        sample = np.random.default_rng(1).choice(len(footprints), min(args.reference, len(footprints)), replace=False)
+        matches = 0
+        for i in sample:
+            reference = reference_zonal_max(raster, footprints[i])
+            # No cell centre inside: the engine falls back to the cell under the footprint
+            matches += reference is None or same(reference, depth[i])
+        print(f"  matches footprint-by-footprint reference: {matches}/{len(sample)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import datetime
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests"))
+
+from doubles import RecordedResponse  # noqa: E402
+from gp_cache import GPStore, spacetrack_login  # noqa: E402
+from http_client import HttpClient, redact  # noqa: E402
+from synthetic import synthetic_gp  # noqa: E402
+from test_http_client import StubServer  # noqa: E402
+
+# http_client.HttpClient against a local stub server: pooled vs one-off
+# connections, concurrent vs sequential requests, conditional requests, gzip,
+# retries and the Space-Track login check.  Nothing leaves the machine.  The
+# stub server is the one tests/test_http_client.py runs against.
+#   python benchmarks/bench_http.py --requests 50 --latency-ms 20
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--satellites", type=int, default=2000, help="size of the served GP catalog")
+    args = parser.parse_args()
+
+    import requests
+
+    catalog = synthetic_gp(args.satellites)
+    body = json.dumps(catalog).encode("utf-8")
+    server = StubServer([{"match": "/gp", "body": catalog}, {"match": "/flaky", "body": "ok"}],
+                        args.latency_ms / 1000.0, {"/flaky": 2})
+    urls = [f"{server.url}/above/{i}?apiKey=secret" for i in range(args.requests)]
+    rows = []
+
+    def measure(name, fn):
+        server.connections = server.sent_bytes = 0
+        seconds, result = timed(fn)
+        rows.append((name, seconds, server.connections, server.sent_bytes))
+        return result
+
+    measure("requests.get per call", lambda: [requests.get(url, timeout=10) for url in urls])
+    with HttpClient() as client:
+        measure("HttpClient sequential", lambda: [client.get(url) for url in urls])
+    with HttpClient() as client:
+        measure("HttpClient.get_many", lambda: client.get_many(urls))
+
+    with HttpClient() as client:
+        gp_url = f"{server.url}/gp"
+        first = measure("conditional, first", lambda: client.get(gp_url, conditional=True))
+        second = measure("conditional, unchanged", lambda: client.get(gp_url, conditional=True))
+        assert first.status_code == 200 and second.status_code == 304
+        assert first.json() == catalog
+
+    with HttpClient(backoff=0.01) as client:
+        flaky = measure("2 x 503 then 200", lambda: client.get(f"{server.url}/flaky"))
+        assert flaky.status_code == 200 and client.stats["retries"] == 2
+
+    print(f"GP catalog: {len(body)} bytes, {len(gzip.compress(body))} gzipped; "
+          f"{args.requests} requests at {args.latency_ms:.0f} ms latency")
+    print(f"{'':>24} {'seconds':>8} {'connections':>11} {'bytes sent':>10}")
+    for name, seconds, connections, sent in rows:
+        print(f"{name:>24} {seconds:>8.3f} {connections:>11} {sent:>10}")
+
+    # The login POST is checked instead of assumed
+    try:
+        spacetrack_login("user", "wrong", session=LoginStub(server.url))
+        print("Login check: bad password NOT detected")
+    except RuntimeError:
+        print("Login check: bad password detected")
+    print("Redacted:", redact(urls[0]))
+
+    # A GP delta answered with 304 keeps the cached catalog
+    now = datetime.datetime(2025, 6, 1, 12)
+    store = GPStore(None)
+    store.merge(synthetic_gp(10, epoch=now), now)
+    store.refresh(NotModified(), now=now)
+    server.close()
+
+
+class LoginStub(HttpClient):
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+
+    def post(self, url, data=None, **kwargs):
+        return super().post(self.base_url + "/ajaxauth/login", data=data, **kwargs)
+
+
+class NotModified:
+    def get(self, url, **kwargs):
+        return RecordedResponse("", 304)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+from skyfield.api import load
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from observer import satellites_above  # noqa: E402
+from propagation import load_catalog  # noqa: E402
+from synthetic import synthetic_gp  # noqa: E402
+
+# Local "satellites above" engine across catalog size x observer count.
+#   python benchmarks/bench_observer.py --satellites 1000 5000 --observers 1 10 100
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--satellites", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--observers", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    ts = load.timescale()
+    now = datetime.datetime.utcnow()
+    rng = np.random.default_rng(0)
+
+    print(f"{'satellites':>10} {'observers':>9} {'seconds':>9} {'visible/obs':>11}")
+    for count in args.satellites:
+        catalog = load_catalog(synthetic_gp(count, epoch=now))
+        for n_observers in args.observers:
+            observers = np.column_stack((
+                rng.uniform(-60, 60, n_observers),
+                rng.uniform(-180, 180, n_observers),
+                rng.uniform(0, 1000, n_observers),
+            ))
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results = satellites_above(catalog, {}, now, ts, observers)
+                best = min(best, time.perf_counter() - start)
+            visible = sum(len(r) for r in results) / n_observers
+            print(f"{count:>10} {n_observers:>9} {best:>9.4f} {visible:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests"))
+
+import phase_two  # noqa: E402
+import update_ground_tracks  # noqa: E402
+import upload_satellites  # noqa: E402
+from buffer_filter import BufferFilter  # noqa: E402
+from country_index import load_country_index  # noqa: E402
+from doubles import RecordedSession  # noqa: E402
+from fake_layer import FakeFeatureLayer  # noqa: E402
+from feature_serializer import gdf_to_features  # noqa: E402
+from feature_sync import LayerSync  # noqa: E402
+from gp_cache import GPStore  # noqa: E402
+from instrumentation import RunReport, peak_rss_mb  # noqa: E402
+from ground_tracks import build_track_paths  # noqa: E402
+from observer import LITTLE_ROCK, satellites_above  # noqa: E402
+from pipeline import feature_chunks, run_pipeline  # noqa: E402
+from propagation import build_features, load_catalog, propagate_catalog  # noqa: E402
+from skyfield.api import load  # noqa: E402
+from synthetic import parse_mix, synthetic_gp  # noqa: E402
+
+# Offline replay of the three scripts: a synthetic GP catalog is served by a
+# RecordedSession (tests/doubles.py), layers are FakeFeatureLayers, and each
+# stage is timed.  Every scenario x size runs in its own subprocess so peak
+# RSS belongs to that run.
+#   python benchmarks/bench_pipeline.py --satellites 1000 5000 --mix leo=0.7,meo=0.2,geo=0.1 \
+#       --output bench.json [--baseline previous.json]
+
+SCENARIOS = ("update_ground_tracks", "update_ground_tracks_stream", "upload_satellites", "phase_two")
+NOW = datetime.datetime(2025, 6, 1, 12, 30)
+EPOCH = datetime.datetime(2025, 6, 1, 12, 0)
+# Rough outline of Arkansas plus the buffer
+ARKANSAS_BUFFER = shapely.box(-94.62, 33.0, -89.64, 36.5).buffer(0.5)
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", upload_satellites.csv_path)
+
+
+# Stages are timed by the same RunReport the scripts write their run reports
+# with; each stage also counts the items it handled as "<stage>_items"
+def stage_results(report):
+    results = {}
+    for name, entry in report.stages.items():
+        items = report.counters.get(f"{name}_items")
+        results[name] = {
+            "seconds": entry["seconds"],
+            "items": items,
+            "items_per_second": round(items / entry["seconds"], 1) if items and entry["seconds"] else None,
+            "peak_rss_mb": entry["peak_rss_mb"],
+        }
+    return results
+
+
+def recorded_session(tle_data, directory):
+    path = os.path.join(directory, "gp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"responses": [{"match": "/class/gp/", "status": 200, "body": tle_data}]}, f)
+    return RecordedSession(path)
+
+
+def fetch(report, tle_data, directory):
+    with report.stage("fetch"):
+        store = GPStore(None)
+        store.refresh(recorded_session(tle_data, directory), now=NOW)
+        report.count("fetch_items", len(store))
+    return store
+
+
+# The sync state lives next to the recorded responses, so a second sync of the
+# same layer sees what the first one published
+def sync(report, name, layer, features, state_path):
+    with report.stage(name):
+        LayerSync(layer, "norad_cat_id", state_path).sync(features)
+        report.count(f"{name}_items", len(features))
+
+
+def layer_report(layers):
+    return {name: {"calls": layer.calls, "edits": layer.edits, "payload_bytes": layer.payload_bytes}
+            for name, layer in layers.items()}
+
+
+def run_update_ground_tracks(report, tle_data, countries, directory):
+    store = fetch(report, tle_data, directory)
+    offsets = np.arange(0, update_ground_tracks.PREDICTION_MINUTES * 60, update_ground_tracks.TIME_STEP_SECONDS)
+    with report.stage("propagate"):
+        catalog, lon, lat, alt_km = propagate_catalog(store.tle_data(), NOW, offsets,
+                                                      satrec_cache=store.satrec_cache)
+        report.count("propagate_items", lon.size)
+    with report.stage("tracks"):
+        paths, stats = build_track_paths(lon, lat)
+        report.count("tracks_items", stats["vertices_before"])
+    with report.stage("features"):
+        points, lines = build_features(catalog, lon, lat, alt_km, NOW.strftime("%Y-%m-%d %H:%M:%S"),
+                                       update_ground_tracks.PREDICTION_MINUTES, countries, paths=paths)
+        report.count("features_items", len(points) + len(lines))
+
+    layers = {"points": FakeFeatureLayer(), "lines": FakeFeatureLayer()}
+    sync(report, "upload_points", layers["points"], points, os.path.join(directory, "points.json"))
+    sync(report, "upload_lines", layers["lines"], lines, os.path.join(directory, "lines.json"))
+    # Second pass with nothing changed: the steady-state cost of an hourly run
+    sync(report, "resync_points", layers["points"], points, os.path.join(directory, "points.json"))
+    sync(report, "resync_lines", layers["lines"], lines, os.path.join(directory, "lines.json"))
+    return layers
+
+
+def run_update_ground_tracks_stream(report, tle_data, countries, directory):
+    store = fetch(report, tle_data, directory)
+    offsets = np.arange(0, update_ground_tracks.PREDICTION_MINUTES * 60, update_ground_tracks.TIME_STEP_SECONDS)
+    layers = {"points": FakeFeatureLayer(), "lines": FakeFeatureLayer()}
+    with report.stage("pipeline"):
+        chunks = feature_chunks(store.tle_data(), NOW, offsets, update_ground_tracks.PREDICTION_MINUTES, countries,
+                                satrec_cache=store.satrec_cache)
+        run_pipeline(chunks, LayerSync(layers["points"], "norad_cat_id"), LayerSync(layers["lines"], "norad_cat_id"))
+        report.count("pipeline_items", len(store))
+    return layers
+
+
+def run_upload_satellites(report, tle_data, countries, directory):
+    store = fetch(report, tle_data, directory)
+    ts = load.timescale()
+    with report.stage("catalog"):
+        catalog = load_catalog(store.tle_data(), satrec_cache=store.satrec_cache)
+        report.count("catalog_items", len(catalog))
+    with report.stage("above"):
+        above = satellites_above(catalog, store.records, NOW, ts, [LITTLE_ROCK])[0]
+        report.count("above_items", len(catalog))
+    with report.stage("features"):
+        features = upload_satellites.build_features(above, countries)
+        report.count("features_items", len(features))
+
+    layers = {"satellites": FakeFeatureLayer()}
+    with report.stage("upload"):
+        LayerSync(layers["satellites"], "satid").sync(features)
+        report.count("upload_items", len(features))
+    return layers
+
+
+def run_phase_two(report, tle_data, countries, directory):
+    store = fetch(report, tle_data, directory)
+    offsets = np.arange(0, update_ground_tracks.PREDICTION_MINUTES * 60, update_ground_tracks.TIME_STEP_SECONDS)
+    with report.stage("propagate"):
+        catalog, lon, lat, alt_km = propagate_catalog(store.tle_data(), NOW, offsets,
+                                                      satrec_cache=store.satrec_cache)
+        report.count("propagate_items", lon.size)
+    with report.stage("tracks"):
+        paths, stats = build_track_paths(lon, lat)
+        report.count("tracks_items", stats["vertices_before"])
+    with report.stage("frames"):
+        points_gdf, lines_gdf = phase_two.catalog_frames(catalog, lon, lat, alt_km, paths,
+                                                         NOW.strftime("%Y-%m-%d %H:%M:%S"), countries)
+        report.count("frames_items", len(points_gdf) + len(lines_gdf))
+    with report.stage("filter"):
+        buffer = BufferFilter([ARKANSAS_BUFFER])
+        points_gdf = points_gdf[buffer.points_mask(points_gdf.geometry.x, points_gdf.geometry.y)]
+        clipped = buffer.clip_lines(lines_gdf.geometry.values)
+        lines_gdf = lines_gdf[shapely.is_geometry(clipped)].copy()
+        lines_gdf.geometry = list(clipped[shapely.is_geometry(clipped)])
+        report.count("filter_items", len(catalog))
+    with report.stage("serialize"):
+        points = gdf_to_features(points_gdf, is_point=True)
+        lines = gdf_to_features(lines_gdf, is_point=False)
+        report.count("serialize_items", len(points) + len(lines))
+
+    layers = {"points": FakeFeatureLayer(), "lines": FakeFeatureLayer()}
+    sync(report, "upload_points", layers["points"], points, os.path.join(directory, "points.json"))
+    sync(report, "upload_lines", layers["lines"], lines, os.path.join(directory, "lines.json"))
+    return layers
+
+
+def run_one(scenario, satellites, mix, seed, verbose=False):
+    runner = globals()[f"run_{scenario}"]
+    tle_data = synthetic_gp(satellites, epoch=EPOCH, seed=seed, mix=parse_mix(mix))
+    report = RunReport(f"bench_{scenario}", path="")
+    log = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with log, tempfile.TemporaryDirectory() as directory:
+        countries = load_country_index(CSV_PATH)
+        layers = runner(report, tle_data, countries, directory)
+    seconds = time.perf_counter() - start
+    return {
+        "scenario": scenario,
+        "satellites": satellites,
+        "mix": mix,
+        "seed": seed,
+        "seconds": round(seconds, 4),
+        "satellites_per_second": round(satellites / seconds, 1),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stage_results(report),
+        "layers": layer_report(layers),
+    }
+
+
+def run_isolated(scenario, satellites, mix, seed):
+    command = [sys.executable, os.path.abspath(__file__), "--one", scenario,
+               "--satellites", str(satellites), "--mix", mix, "--seed", str(seed)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# Stages slower than the baseline by more than `tolerance` (0.25 = 25%)
+def regressions(results, baseline, tolerance):
+    previous = {(r["scenario"], r["satellites"], r["mix"]): r for r in baseline["results"]}
+    found = []
+    for result in results:
+        old = previous.get((result["scenario"], result["satellites"], result["mix"]))
+        if old is None:
+            continue
+        for name, stage in result["stages"].items():
+            before = old["stages"].get(name, {}).get("seconds")
+            if before and stage["seconds"] > before * (1 + tolerance):
+                found.append(f"{result['scenario']} n={result['satellites']} {name}: "
+                             f"{before:.3f}s -> {stage['seconds']:.3f}s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--satellites", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--mix", default="leo=0.8,meo=0.1,geo=0.1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier JSON report to compare stage times against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--one", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--verbose", action="store_true", help="show the scripts' own output (with --one)")
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_one(args.one, args.satellites[0], args.mix, args.seed, args.verbose)))
+        return
+
+    results = []
+    for satellites in args.satellites:
+        for scenario in args.scenarios:
+            result = run_isolated(scenario, satellites, args.mix, args.seed)
+            print(f"{scenario:>28} n={satellites:<7} {result['seconds']:>8.2f}s "
+                  f"{result['peak_rss_mb']} MB peak RSS", file=sys.stderr)
+            results.append(result)
+
+    report = {
+        "commit": git_commit(),
+        "created": datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
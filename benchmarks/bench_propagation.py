@@ -0,0 +1,61 @@
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+from skyfield.api import EarthSatellite, load
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from propagation import load_catalog, time_grid, propagate_subpoints  # noqa: E402
+from synthetic import synthetic_gp  # noqa: E402
+
+# Vectorized catalog propagation vs. the old per-satellite EarthSatellite loop.
+#   python benchmarks/bench_propagation.py --satellites 500
+
+
+def per_satellite(tle_data, ts, times):
+    lon, lat, alt = [], [], []
+    for entry in tle_data:
+        satellite = EarthSatellite(entry["TLE_LINE1"], entry["TLE_LINE2"], entry["OBJECT_NAME"], ts)
+        subpoints = [satellite.at(t).subpoint() for t in times]
+        lon.append([sp.longitude.degrees for sp in subpoints])
+        lat.append([sp.latitude.degrees for sp in subpoints])
+        alt.append([sp.elevation.km for sp in subpoints])
+    return np.array(lon), np.array(lat), np.array(alt)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--satellites", type=int, default=200)
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument("--step", type=int, default=30)
+    args = parser.parse_args()
+
+    ts = load.timescale()
+    now = datetime.datetime.utcnow()
+    tle_data = synthetic_gp(args.satellites, epoch=now)
+    offsets = np.arange(0, args.minutes * 60, args.step)
+    times, jd, fr = time_grid(ts, now, offsets)
+
+    start = time.perf_counter()
+    catalog = load_catalog(tle_data)
+    lon, lat, alt = propagate_subpoints(catalog.array(), times, jd, fr)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ref_lon, ref_lat, ref_alt = per_satellite(tle_data, ts, times)
+    looped = time.perf_counter() - start
+
+    dlon = np.abs((lon - ref_lon + 180.0) % 360.0 - 180.0)
+    print(f"{args.satellites} satellites x {len(offsets)} steps")
+    print(f"  per-satellite loop: {looped:.3f} s")
+    print(f"  vectorized:         {vectorized:.3f} s  ({looped / vectorized:.1f}x faster)")
+    print(f"  max |dlon| {dlon.max():.2e} deg, max |dlat| {np.abs(lat - ref_lat).max():.2e} deg, "
+          f"max |dalt| {np.abs(alt - ref_alt).max() * 1000:.2e} m")
+
+
+if __name__ == "__main__":
+    main()
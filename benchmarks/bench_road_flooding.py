@@ -0,0 +1,98 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from road_flooding import ALL_ROADS, road_flooding  # noqa: E402
+
+# code/road_flooding.py on a synthetic road network: all events through one
+# STRtree (sequential and in a pool) against Road_Flooding_Statistic.py's
+# approach redone in shapely -- clip, then intersect every clipped road with
+# the event's polygons, one event at a time.
+#   python benchmarks/bench_road_flooding.py --roads 200000 --events 7 --workers 1 4
+
+
+# Short polylines scattered over a 20 km square, with a class each
+def synthetic_roads(count, seed=0):
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(0, 20000, (count, 2))
+    steps = rng.normal(0, 60, (count, 4, 2)).cumsum(axis=1)
+    coords = np.concatenate((start[:, None, :], start[:, None, :] + steps), axis=1)
+    roads = shapely.linestrings(coords)
+    classes = rng.choice(np.array(["Local", "Collector", "Arterial", "Highway"], dtype=object), count,
+                         p=[0.7, 0.15, 0.1, 0.05])
+    return roads, classes
+
+
+# Flood events growing with the return period: the same river corridor and
+# ponds, wider each time, as a few hundred overlapping polygons
+def synthetic_events(count, seed=0):
+    rng = np.random.default_rng(seed)
+    river = shapely.LineString(np.column_stack((np.linspace(0, 20000, 200),
+                                                10000 + 3000 * np.sin(np.linspace(0, 6, 200)))))
+    ponds = rng.uniform(0, 20000, (300, 2))
+    events = {}
+    for k in range(count):
+        width = 150 * (k + 1)
+        pieces = [shapely.buffer(river, width)]
+        pieces += list(shapely.buffer(shapely.points(ponds), rng.uniform(50, 100 * (k + 1), len(ponds))))
+        events[f"Flood_{k + 1}"] = np.array(pieces, dtype=object)
+    return events
+
+
+def one_at_a_time(roads, boundary, events):
+    clipped = shapely.intersection(roads, shapely.union_all(boundary))
+    total = shapely.length(clipped).sum()
+    flooded = {}
+    for name, polygons in events.items():
+        flooded[name] = shapely.length(shapely.intersection(clipped, shapely.union_all(polygons))).sum()
+    return total, flooded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--roads", type=int, default=100000)
+    parser.add_argument("--events", type=int, default=7)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--reference-max", type=int, default=50000, help="skip the one-event-at-a-time run above this")
+    args = parser.parse_args()
+
+    roads, classes = synthetic_roads(args.roads)
+    boundary = np.array([shapely.Polygon([(1000, 1000), (19000, 2000), (18000, 19000), (3000, 17000)])])
+    events = synthetic_events(args.events)
+    print(f"{args.roads} roads, {args.events} events")
+
+    reference = None
+    if args.roads <= args.reference_max:
+        start = time.perf_counter()
+        reference = one_at_a_time(roads, boundary, events)
+        print(f"  clip + intersect per event   {time.perf_counter() - start:7.2f} s")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        rows = road_flooding(roads, classes, boundary, events, workers=workers)
+        seconds = time.perf_counter() - start
+        print(f"  road_flooding, {workers} workers    {seconds:7.2f} s")
+
+    totals = [row for row in rows if row["Road_Class"] == ALL_ROADS]
+    for row in totals:
+        classes_sum = sum(r["Flooded_Length_m"] for r in rows
+                          if r["Event"] == row["Event"] and r["Road_Class"] != ALL_ROADS)
+        check = ""
+        if reference is not None:
+            check = (f"  reference {reference[1][row['Event']]:.1f} m "
+                     f"(diff {abs(reference[1][row['Event']] - row['Flooded_Length_m']):.2e})")
+        print(f"  {row['Event']:>8}: {row['Flooded_Length_m']:12.1f} of {row['Total_Length_m']:12.1f} m "
+              f"({row['Percentage_Flooded']:5.2f}%), {row['Flooded_Length_ft']:12.1f} ft, "
+              f"classes sum {classes_sum:12.1f} m{check}")
+    if reference is not None:
+        print(f"  total length diff vs reference: {abs(reference[0] - totals[0]['Total_Length_m']):.2e} m")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+import time
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from feature_serializer import gdf_to_features  # noqa: E402
+
+# Columnar serializer vs. the original row-wise phase_two.gdf_to_features.
+#   python benchmarks/bench_serializer.py --features 1000 10000 100000
+
+
+def legacy_gdf_to_features(gdf, is_point=True):
+    features = []
+    for _, row in gdf.iterrows():
+        geom = row.geometry
+        if is_point:
+            geometry = {
+                "x": geom.x,
+                "y": geom.y,
+                "z": getattr(geom, "z", None),
+                "spatialReference": {"wkid": 4326}
+            }
+        else:
+            geometry = {
+                "paths": [list(geom.coords)],
+                "spatialReference": {"wkid": 4326}
+            }
+
+        attributes = {k: v for k, v in row.items() if k != "geometry"}
+        features.append({"geometry": geometry, "attributes": attributes})
+    return features
+
+
+def synthetic_frames(count, vertices=40, seed=0):
+    rng = np.random.default_rng(seed)
+    attributes = {
+        "sat_name": [f"SYNTH-{i}" for i in range(count)],
+        "norad_cat_id": np.arange(90000, 90000 + count),
+        "epoch": "2025-06-01 12:00:00",
+        "altitude_km": rng.uniform(300, 36000, count).round(2),
+        "mean_motion": rng.uniform(0.004, 0.07, count),
+        "inclination": rng.uniform(0, 1.7, count),
+        "last_update": "2025-06-01 12:00:00",
+        "country": rng.choice(np.array(["US", "PRC", None], dtype=object), count),
+    }
+    lon = rng.uniform(-180, 170, count)
+    lat = rng.uniform(-60, 60, count)
+    points = gpd.GeoDataFrame(attributes, geometry=gpd.points_from_xy(lon, lat, attributes["altitude_km"] * 1000),
+                              crs="EPSG:4326")
+    steps = np.linspace(0, 10, vertices)
+    coords = np.stack((lon[:, None] + steps, lat[:, None] + np.sin(steps)), axis=2)
+    lines = gpd.GeoDataFrame(dict(attributes), geometry=shapely.linestrings(coords), crs="EPSG:4326")
+    return points, lines
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--features", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'features':>9} {'kind':>6} {'legacy s':>9} {'columnar s':>10} {'speedup':>8}")
+    for count in args.features:
+        points, lines = synthetic_frames(count)
+        for kind, gdf, is_point in (("point", points, True), ("line", lines, False)):
+            legacy = timed(legacy_gdf_to_features, gdf, is_point)
+            columnar = timed(gdf_to_features, gdf, is_point)
+            print(f"{count:>9} {kind:>6} {legacy:>9.3f} {columnar:>10.3f} {legacy / columnar:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import datetime
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pyarrow.parquet as pq
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from propagation import propagate_catalog  # noqa: E402
+from snapshot_store import SnapshotStore  # noqa: E402
+from synthetic import parse_mix, synthetic_gp  # noqa: E402
+
+# snapshot_store.py with a week of hourly runs: append time and size per run,
+# then "one satellite over the last week" and "everything over Arkansas for
+# an afternoon" against reading every file and filtering, before and after
+# compaction.  Each run re-uses one propagation shifted in time, so building
+# the history doesn't take a week of SGP4.
+#   python benchmarks/bench_snapshots.py --satellites 5000 --runs 168
+
+# Rough outline of Arkansas (lon, lat)
+ARKANSAS = shapely.Polygon([(-94.62, 36.50), (-90.15, 36.50), (-90.08, 35.96), (-89.65, 35.96), (-90.10, 35.10),
+                            (-91.15, 33.00), (-94.04, 33.02), (-94.04, 33.55), (-94.48, 33.64), (-94.43, 35.40)])
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def full_scan(path, kind, keep):
+    table = pq.read_table(sorted(glob.glob(os.path.join(path, kind, "date=*", "*.parquet"))))
+    return table.filter(keep(table))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--satellites", type=int, default=5000)
+    parser.add_argument("--mix", type=parse_mix, default=None, help="orbit regime shares, e.g. leo=0.8,geo=0.2")
+    parser.add_argument("--runs", type=int, default=168, help="hourly runs (168 = a week)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    first_run = datetime.datetime(2025, 6, 1, 0, 17)
+    offsets = np.arange(0, 3600, 30)
+    tle_data = synthetic_gp(args.satellites, epoch=first_run, mix=args.mix)
+    catalog, lon, lat, alt_km = propagate_catalog(tle_data, first_run, offsets)
+    norad_id = catalog.norad_ids[len(catalog) // 2]
+    last_run = first_run + datetime.timedelta(hours=args.runs - 1)
+    week = (last_run - datetime.timedelta(days=7), last_run + datetime.timedelta(hours=1))
+    afternoon = (last_run.replace(hour=12, minute=0), last_run.replace(hour=18, minute=0))
+
+    with tempfile.TemporaryDirectory() as folder:
+        store = SnapshotStore(folder)
+        append_s = 0.0
+        written = 0
+        for k in range(args.runs):
+            run_time = first_run + datetime.timedelta(hours=k)
+            start = time.perf_counter()
+            writer = store.writer(run_time)
+            writer.append(catalog, lon, lat, alt_km, run_time, offsets)
+            written += writer.close()
+            append_s += time.perf_counter() - start
+        rows = writer.rows * args.runs
+        print(f"{args.runs} runs x {args.satellites} satellites: {rows} rows, {written / 1e6:.1f} MB "
+              f"({written / rows:.1f} bytes/row), {append_s / args.runs * 1000:.0f} ms per run")
+
+        def queries(label):
+            files = len(glob.glob(os.path.join(folder, "*", "date=*", "*.parquet")))
+            print(f"  {label} ({files} files)")
+            seconds, table = best_of(args.repeat, lambda: store.query("tracks", *week, norad_ids=[norad_id]))
+            scan_s, scanned = best_of(args.repeat, lambda: full_scan(folder, "tracks", lambda t: (
+                (t["norad_id"].to_numpy() == norad_id) & (t["time"].to_numpy() >= np.datetime64(week[0]))
+            )))
+            print(f"    satellite {norad_id}, last week:  {seconds:7.3f} s  {table.num_rows:>8} rows   "
+                  f"(read everything: {scan_s:7.3f} s, {scanned.num_rows} rows)")
+            seconds, table = best_of(args.repeat, lambda: store.query("tracks", *afternoon, area=ARKANSAS))
+            scan_s, scanned = best_of(args.repeat, lambda: full_scan(folder, "tracks", lambda t: (
+                (t["time"].to_numpy() >= np.datetime64(afternoon[0])) & (t["time"].to_numpy() < np.datetime64(afternoon[1]))
+                & shapely.contains_xy(ARKANSAS, t["lon"].to_numpy(), t["lat"].to_numpy())
+            )))
+            print(f"    over Arkansas, 12-18 UTC:  {seconds:7.3f} s  {table.num_rows:>8} rows   "
+                  f"(read everything: {scan_s:7.3f} s, {scanned.num_rows} rows)")
+
+        queries("hourly files")
+        start = time.perf_counter()
+        store.compact(max_files=1)
+        print(f"  compacted in {time.perf_counter() - start:.2f} s")
+        queries("compacted")
+
+
+if __name__ == "__main__":
+    main()
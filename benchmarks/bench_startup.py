@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+# Cold start: a fresh interpreter imports one of the scripts and runs its
+# first propagation (timescale included), with socket connects turned into
+# errors so anything reaching for the network at startup shows up.  Compare
+# the working tree against an earlier commit with --baseline:
+#   python benchmarks/bench_startup.py --baseline HEAD~1 --repeat 5
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = ("update_ground_tracks", "upload_satellites", "phase_two")
+
+CHILD = r"""
+import json, socket, sys, time
+start = time.perf_counter()
+attempts = []
+
+def refuse(self, address):
+    attempts.append(str(address))
+    raise OSError("network disabled by bench_startup")
+
+socket.socket.connect = refuse
+sys.path.insert(0, {tree!r})
+import importlib
+importlib.import_module({script!r})
+imported = time.perf_counter()
+
+import datetime
+import numpy as np
+from propagation import propagate_catalog
+sys.path.append({benchmarks!r})
+from synthetic import synthetic_gp
+now = datetime.datetime(2025, 6, 1, 12, 30)
+tle_data = synthetic_gp({satellites}, epoch=datetime.datetime(2025, 6, 1, 12))
+ready = time.perf_counter()
+propagate_catalog(tle_data, now, np.arange(0, 3600, 30))
+propagated = time.perf_counter()
+
+print(json.dumps({{
+    "import_s": imported - start,
+    "first_propagation_s": propagated - ready,
+    "import_to_first_propagation_s": (imported - start) + (propagated - ready),
+    "modules": len(sys.modules),
+    "network_attempts": attempts,
+}}))
+"""
+
+
+def run_child(tree, script, satellites):
+    code = CHILD.format(tree=tree, script=script, benchmarks=BENCHMARKS, satellites=satellites)
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", code], cwd=tree, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_wall_s"] = wall
+    return result
+
+
+def measure(tree, scripts, satellites, repeat):
+    results = {}
+    for script in scripts:
+        runs = [run_child(tree, script, satellites) for _ in range(repeat)]
+        errors = [r["error"] for r in runs if "error" in r]
+        if errors:
+            results[script] = {"error": errors[0]}
+            continue
+        summary = {key: round(statistics.median(r[key] for r in runs), 4)
+                   for key in ("import_s", "first_propagation_s", "import_to_first_propagation_s",
+                               "process_wall_s")}
+        # The first run also builds any cache it finds missing
+        summary["first_run_s"] = round(runs[0]["import_to_first_propagation_s"], 4)
+        summary["modules"] = runs[-1]["modules"]
+        summary["network_attempts"] = sorted({a for r in runs for a in r["network_attempts"]})
+        results[script] = summary
+    return results
+
+
+def export_tree(ref, directory):
+    archive = os.path.join(directory, "tree.tar")
+    with open(archive, "wb") as f:
+        subprocess.run(["git", "archive", ref], cwd=REPO, stdout=f, check=True)
+    tree = os.path.join(directory, "tree")
+    with tarfile.open(archive) as tar:
+        tar.extractall(tree)
+    return tree
+
+
+def print_table(label, results):
+    print(f"{label}")
+    print(f"{'script':>22} {'import s':>9} {'1st prop s':>10} {'total s':>8} {'wall s':>7} {'modules':>8} network")
+    for script, r in results.items():
+        if "error" in r:
+            print(f"{script:>22} error: {r['error']}")
+            continue
+        print(f"{script:>22} {r['import_s']:>9.3f} {r['first_propagation_s']:>10.3f} "
+              f"{r['import_to_first_propagation_s']:>8.3f} {r['process_wall_s']:>7.3f} {r['modules']:>8} "
+              f"{len(r['network_attempts'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scripts", nargs="+", choices=SCRIPTS, default=list(SCRIPTS))
+    parser.add_argument("--satellites", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", help="git ref to compare against, e.g. HEAD~1")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    report = {"current": measure(os.path.abspath(REPO), args.scripts, args.satellites, args.repeat)}
+    print_table("working tree", report["current"])
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as directory:
+            tree = export_tree(args.baseline, directory)
+            report["baseline"] = measure(tree, args.scripts, args.satellites, args.repeat)
+        report["baseline_ref"] = args.baseline
+        print_table(f"baseline {args.baseline}", report["baseline"])
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
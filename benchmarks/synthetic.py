@@ -0,0 +1,80 @@
+import datetime
+import math
+
+import numpy as np
+from sgp4.api import Satrec, WGS72
+from sgp4.exporter import export_tle
+
+# Synthetic but valid GP/TLE records shaped like the Space-Track gp class JSON,
+# so the scripts can be exercised without credentials.
+
+SGP4_EPOCH = datetime.datetime(1949, 12, 31)
+
+# Orbit regimes: (mean motion rev/day, eccentricity, inclination deg, bstar) ranges
+REGIMES = {
+    "leo": ((14.0, 16.0), (0.0, 0.01), (0.0, 100.0), (0.0, 1e-4)),
+    "meo": ((1.95, 2.05), (0.0, 0.02), (50.0, 65.0), (0.0, 0.0)),
+    "geo": ((1.0020, 1.0030), (0.0, 0.001), (0.0, 5.0), (0.0, 0.0)),
+    # Molniya-type: 12 h period, perigee a few hundred km up
+    "heo": ((2.0050, 2.0070), (0.70, 0.74), (63.0, 64.0), (0.0, 0.0)),
+}
+
+
+# "leo=0.7,meo=0.2,geo=0.1" -> {"leo": 0.7, "meo": 0.2, "geo": 0.1}
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, share = part.partition("=")
+        name = name.strip().lower()
+        if name not in REGIMES:
+            raise ValueError(f"Unknown orbit regime {name!r}; expected one of {', '.join(REGIMES)}")
+        mix[name] = float(share) if share else 1.0
+    return mix
+
+
+def synthetic_gp(count, epoch=None, seed=0, first_norad_id=90000, first_gp_id=1, mix=None):
+    rng = np.random.default_rng(seed)
+    epoch = epoch or datetime.datetime.utcnow()
+    epoch_days = (epoch - SGP4_EPOCH).total_seconds() / 86400.0
+
+    # Regimes are drawn from their own generator so an all-LEO catalog is the
+    # same as before mixes existed
+    mix = mix or {"leo": 1.0}
+    names = list(mix)
+    shares = np.array([mix[name] for name in names], dtype=float)
+    regimes = np.random.default_rng(seed + 1).choice(len(names), size=count, p=shares / shares.sum())
+
+    records = []
+    for i in range(count):
+        norad_id = first_norad_id + i
+        motion, ecc, inc, drag = REGIMES[names[regimes[i]]]
+        mean_motion = rng.uniform(*motion)  # rev/day
+        satrec = Satrec()
+        satrec.sgp4init(
+            WGS72, "i", norad_id, epoch_days,
+            rng.uniform(*drag),                          # bstar
+            0.0, 0.0,                                    # ndot, nddot
+            rng.uniform(*ecc),                           # ecco
+            math.radians(rng.uniform(0.0, 360.0)),       # argpo
+            math.radians(rng.uniform(*inc)),             # inclo
+            math.radians(rng.uniform(0.0, 360.0)),       # mo
+            mean_motion * 2 * math.pi / 1440.0,          # no_kozai, rad/min
+            math.radians(rng.uniform(0.0, 360.0)),       # nodeo
+        )
+        satrec.classification = "U"
+        satrec.intldesg = f"{epoch.year % 100:02d}{i % 999 + 1:03d}A"
+        line1, line2 = export_tle(satrec)
+        records.append({
+            "OBJECT_NAME": f"SYNTH-{norad_id}",
+            "OBJECT_ID": f"{epoch.year}-{i % 999 + 1:03d}A",
+            "NORAD_CAT_ID": str(norad_id),
+            "GP_ID": str(first_gp_id + i),
+            "EPOCH": epoch.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+            "MEAN_MOTION": f"{mean_motion:.8f}",
+            "OBJECT_TYPE": "PAYLOAD",
+            "DECAY_DATE": None,
+            "TLE_LINE0": f"0 SYNTH-{norad_id}",
+            "TLE_LINE1": line1,
+            "TLE_LINE2": line2,
+        })
+    return records
@@ -0,0 +1,81 @@
+import os
+import json
+import numpy as np
+import shapely
+
+# ------------------ Config ------------------
+BUFFER_CACHE_PATH = "buffer_cache.json"
+
+# Local Arkansas-buffer filter.  The buffer polygons are cached on disk (WKB)
+# together with the layer's last edit date and only re-downloaded when that
+# changes.  Points are tested against the prepared union of the polygons;
+# ground tracks go through an STR-tree for candidates and are clipped, so only
+# the segments inside the buffer are kept.
+
+
+class BufferFilter:
+    def __init__(self, polygons):
+        self.polygons = np.asarray(polygons, dtype=object)
+        self.tree = shapely.STRtree(self.polygons)
+        self.union = shapely.union_all(self.polygons)
+        shapely.prepare(self.union)
+
+    def points_mask(self, lon, lat):
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        mask = np.zeros(lon.shape, dtype=bool)
+        finite = np.isfinite(lon) & np.isfinite(lat)
+        mask[finite] = shapely.intersects_xy(self.union, lon[finite], lat[finite])
+        return mask
+
+    # lines: array of shapely (Multi)LineStrings, None allowed.  Returns the
+    # clipped geometry for each (None where nothing lies inside the buffer).
+    def clip_lines(self, lines):
+        lines = np.asarray(lines, dtype=object)
+        clipped = np.full(len(lines), None, dtype=object)
+        present = np.nonzero(shapely.is_geometry(lines))[0]
+        if not len(present):
+            return clipped
+
+        hits = np.unique(self.tree.query(lines[present], predicate="intersects")[0])
+        candidates = present[hits]
+        for i, geom in zip(candidates, shapely.intersection(lines[candidates], self.union)):
+            parts = [g for g in shapely.get_parts(geom) if g.geom_type == "LineString" and g.length > 0]
+            if parts:
+                clipped[i] = parts[0] if len(parts) == 1 else shapely.MultiLineString(parts)
+        return clipped
+
+
+def layer_version(layer):
+    editing_info = getattr(layer.properties, "editingInfo", None)
+    last_edit = getattr(editing_info, "lastEditDate", None) if editing_info is not None else None
+    return str(last_edit) if last_edit is not None else None
+
+
+def load_buffer(layer, layer_id, cache_path=BUFFER_CACHE_PATH):
+    version = layer_version(layer)
+    if version is not None and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("layer_id") == layer_id and cached.get("version") == version:
+                polygons = shapely.from_wkb([bytes.fromhex(h) for h in cached["wkb"]])
+                print(f"Loaded {len(polygons)} cached buffer features (version {version}).")
+                return BufferFilter(polygons)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable buffer cache {cache_path}: {e}")
+
+    # Only needed when the cache is stale
+    from arcgis.geometry import Geometry
+
+    print("Loading buffer layer...")
+    buffer_features = layer.query(where="1=1", return_geometry=True).features
+    polygons = [Geometry(f.geometry).as_shapely for f in buffer_features]
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "layer_id": layer_id,
+            "version": version,
+            "wkb": [shapely.to_wkb(p, hex=True) for p in polygons],
+        }, f)
+    print(f"Loaded {len(polygons)} buffer features.")
+    return BufferFilter(polygons)
@@ -0,0 +1,139 @@
+import os
+import numpy as np
+
+# ------------------ Config ------------------
+TILE_SIZE = 1024
+
+# Depth rasters for the NumPy flood engines, read memory-mapped so a raster
+# never has to fit in RAM: only the tile being worked on is paged in.
+#
+# Two on-disk layouts are understood, both a raw grid plus an ESRI header:
+#   <name>.flt + <name>.hdr   ESRI float grid, as written by
+#                             arcpy.conversion.RasterToFloat
+#   <name>.npy + <name>.hdr   a 2D NumPy array (e.g. from a synthetic run)
+# The .hdr is the ESRI ASCII header (ncols, nrows, xllcorner, yllcorner,
+# cellsize, NODATA_value, byteorder); for .npy only the georeferencing keys
+# are needed.  A <name>.prj next to the grid is picked up as the CRS.  Other
+# formats (file geodatabase rasters, GeoTIFF) can be exported with
+# RasterToFloat first.
+#
+# Geometry is built in pixel coordinates -- x = column, y = row from the top
+# edge, both integers and so exact -- and only moved to map coordinates
+# (to_map) at the end, so pieces computed from neighbouring tiles share
+# edges bit for bit.
+
+
+def read_header(path):
+    header = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2:
+                header[parts[0].lower()] = parts[1]
+    return header
+
+
+def sidecar(path, extension):
+    return os.path.splitext(path)[0] + extension
+
+
+class Raster:
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        hdr_path = sidecar(path, ".hdr")
+        header = read_header(hdr_path) if os.path.exists(hdr_path) else {}
+
+        if path.lower().endswith(".npy"):
+            self.data = np.load(path, mmap_mode="r")
+            if self.data.ndim != 2:
+                raise ValueError(f"{path}: expected a 2D array, got shape {self.data.shape}")
+        elif path.lower().endswith(".flt"):
+            if not header:
+                raise ValueError(f"{path}: missing header {hdr_path}")
+            byteorder = ">" if header.get("byteorder", "lsbfirst").lower() == "msbfirst" else "<"
+            shape = (int(header["nrows"]), int(header["ncols"]))
+            self.data = np.memmap(path, dtype=byteorder + "f4", mode="r", shape=shape)
+        else:
+            raise ValueError(f"{path}: unsupported raster format (export it with RasterToFloat)")
+
+        self.nrows, self.ncols = self.data.shape
+        self.cell = float(header.get("cellsize", 1.0))
+        self.nodata = float(header["nodata_value"]) if "nodata_value" in header else None
+        # xll/yll are corners unless the header gives cell centres
+        if "xllcenter" in header:
+            self.left = float(header["xllcenter"]) - self.cell / 2
+            bottom = float(header["yllcenter"]) - self.cell / 2
+        else:
+            self.left = float(header.get("xllcorner", 0.0))
+            bottom = float(header.get("yllcorner", 0.0))
+        self.top = bottom + self.nrows * self.cell
+
+        prj_path = sidecar(path, ".prj")
+        self.crs = None
+        if os.path.exists(prj_path):
+            with open(prj_path, "r", encoding="utf-8") as f:
+                self.crs = f.read().strip() or None
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    # (row0, col0, row1, col1) windows covering the raster, row-major
+    def tiles(self, tile_size=TILE_SIZE):
+        return [(r, c, min(r + tile_size, self.nrows), min(c + tile_size, self.ncols))
+                for r in range(0, self.nrows, tile_size)
+                for c in range(0, self.ncols, tile_size)]
+
+    # One window as float64, with NODATA cells turned into NaN
+    def read(self, window):
+        row0, col0, row1, col1 = window
+        values = np.array(self.data[row0:row1, col0:col1], dtype=float)
+        if self.nodata is not None:
+            values[values == self.nodata] = np.nan
+        return values
+
+    # (n, 4) map bounds (minx, miny, maxx, maxy) -> row0, col0, row1, col1
+    # arrays of the cells they touch, clipped to the raster (empty when outside)
+    def windows(self, bounds):
+        bounds = np.asarray(bounds, dtype=float).reshape(-1, 4)
+        col0 = np.clip(np.floor((bounds[:, 0] - self.left) / self.cell), 0, self.ncols).astype(np.int64)
+        col1 = np.clip(np.ceil((bounds[:, 2] - self.left) / self.cell), 0, self.ncols).astype(np.int64)
+        row0 = np.clip(np.floor((self.top - bounds[:, 3]) / self.cell), 0, self.nrows).astype(np.int64)
+        row1 = np.clip(np.ceil((self.top - bounds[:, 1]) / self.cell), 0, self.nrows).astype(np.int64)
+        return row0, col0, np.maximum(row0, row1), np.maximum(col0, col1)
+
+    # Map coordinates of cell centres
+    def centres(self, rows, cols):
+        return self.left + (np.asarray(cols) + 0.5) * self.cell, self.top - (np.asarray(rows) + 0.5) * self.cell
+
+    # Pixel (x = column, y = row) geometry -> map coordinates
+    def to_map(self, geometry):
+        # Imported here so reading rasters doesn't need shapely
+        import shapely
+
+        scale = np.array([self.cell, -self.cell])
+        offset = np.array([self.left, self.top])
+        return shapely.transform(geometry, lambda xy: xy * scale + offset)
+
+
+# New ESRI float grid (.flt + .hdr) -- the format RasterToFloat produces, so
+# synthetic rasters go through the same reader.  Returns the writable memmap;
+# fill it (in blocks, for grids larger than RAM) and flush.
+def create_float_grid(path, nrows, ncols, left=0.0, bottom=0.0, cell=1.0, nodata=-9999.0, crs=None):
+    with open(sidecar(path, ".hdr"), "w", encoding="utf-8") as f:
+        f.write(f"ncols {ncols}\nnrows {nrows}\n"
+                f"xllcorner {left!r}\nyllcorner {bottom!r}\ncellsize {cell!r}\n"
+                f"NODATA_value {nodata!r}\nbyteorder LSBFIRST\n")
+    if crs:
+        with open(sidecar(path, ".prj"), "w", encoding="utf-8") as f:
+            f.write(crs)
+    return np.memmap(path, dtype="<f4", mode="w+", shape=(nrows, ncols))
+
+
+# NaN cells are written as nodata
+def write_float_grid(path, array, left=0.0, bottom=0.0, cell=1.0, nodata=-9999.0, crs=None):
+    array = np.asarray(array, dtype="<f4")
+    out = create_float_grid(path, array.shape[0], array.shape[1], left, bottom, cell, nodata, crs)
+    out[:] = np.where(np.isnan(array), np.float32(nodata), array)
+    out.flush()
@@ -0,0 +1,178 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import shapely
+from flood_raster import Raster, TILE_SIZE
+
+# ------------------ Config ------------------
+# The RemapRange of Flood_Depth_Raster_Reclassification_Conversion_to_Poly_then_Dissolve.py:
+# (from, to, class) depth ranges, contiguous and ascending
+REMAP_RANGES = ((0, 1, 1), (1, 2, 2), (2, 3, 3), (3, 4, 4), (4, 5, 5), (5, 10, 6), (10, 100, 7))
+WORKERS = os.cpu_count() or 1
+OUTPUT_PATH = "flood_depth_classes.gpkg"
+
+# NumPy replacement for the arcpy Reclassify -> RasterToPolygon -> Dissolve
+# chain.  Each depth raster (see flood_raster.py for the formats) is cut into
+# TILE_SIZE x TILE_SIZE tiles; every tile is read from the memory map,
+# binned against REMAP_RANGES in one vectorized pass, and turned straight into
+# one polygon per class, and the tiles' pieces are dissolved per class into
+# the final regions.  No intermediate raster or polygon feature class is
+# written.
+#
+# Binning follows RemapRange: ranges are closed on the right, so a depth
+# exactly on a break goes to the lower class (1.0 -> 1, 1.0001 -> 2), the
+# first range also includes its lower bound (0.0 -> 1), and anything outside
+# 0..100, NaN or NODATA gets no class ("NODATA" for missing values).
+#
+# Tiles to polygons.  A classified tile is split into horizontal runs of
+# equal class per row; runs with the same columns and class in consecutive
+# rows are merged into one rectangle, and each class's rectangles are
+# unioned.  Everything stays in integer pixel coordinates until the end, so
+# pieces from neighbouring tiles meet exactly and dissolve cleanly.
+#
+# Dissolve is per class (one multipolygon per gridcode), which is what the
+# classes are for; the arcpy script's Dissolve had no dissolve field and
+# merged every class into a single feature.
+#
+# Memory.  Tiles of every raster go through one process pool, each worker
+# holding a single tile at a time (TILE_SIZE^2 x 9 bytes, ~9.4 MB at 1024),
+# so a raster much larger than RAM is fine.  What grows with the raster is
+# only the class geometry, which scales with the length of the class
+# boundaries rather than the number of cells.
+
+
+def reclassify(depth, remap=REMAP_RANGES):
+    depth = np.asarray(depth, dtype=float)
+    upper = np.array([hi for _, hi, _ in remap], dtype=float)
+    classes = np.array([value for _, _, value in remap] + [0], dtype=np.uint8)
+    binned = classes[np.searchsorted(upper, depth, side="left")]
+    with np.errstate(invalid="ignore"):
+        outside = ~((depth >= remap[0][0]) & (depth <= upper[-1]))
+    binned[outside] = 0
+    return binned
+
+
+# (class, col0, row0, col1, row1) rectangles covering the classified cells,
+# offset to the tile's position in the raster
+def class_rectangles(classes, row0=0, col0=0):
+    height, width = classes.shape
+    if not classes.size:
+        return np.empty((0, 5), dtype=np.int64)
+    starts = np.ones(classes.shape, dtype=bool)
+    starts[:, 1:] = classes[:, 1:] != classes[:, :-1]
+    flat = np.flatnonzero(starts)
+    # Every row begins with a run, so the next start is either later in the
+    # same row or the first cell of the next one
+    row = flat // width
+    start = flat - row * width
+    end = np.append(flat[1:], height * width) - row * width
+    value = classes.ravel()[flat]
+    keep = value > 0
+    row, start, end, value = row[keep], start[keep], end[keep], value[keep]
+    if not len(row):
+        return np.empty((0, 5), dtype=np.int64)
+
+    # Stack identical runs of consecutive rows into one rectangle
+    order = np.lexsort((row, end, start, value))
+    row, start, end, value = row[order], start[order], end[order], value[order]
+    continues = np.zeros(len(row), dtype=bool)
+    continues[1:] = ((value[1:] == value[:-1]) & (start[1:] == start[:-1]) &
+                     (end[1:] == end[:-1]) & (row[1:] == row[:-1] + 1))
+    first = np.flatnonzero(~continues)
+    last = np.append(first[1:], len(row)) - 1
+    return np.column_stack((value[first], col0 + start[first], row0 + row[first],
+                            col0 + end[first], row0 + row[last] + 1)).astype(np.int64)
+
+
+# {class: polygon or multipolygon} in pixel coordinates
+def class_regions(classes, row0=0, col0=0):
+    rectangles = class_rectangles(classes, row0, col0)
+    regions = {}
+    for value in np.unique(rectangles[:, 0]):
+        selected = rectangles[rectangles[:, 0] == value]
+        boxes = shapely.box(selected[:, 1], selected[:, 2], selected[:, 3], selected[:, 4])
+        regions[int(value)] = shapely.union_all(boxes)
+    return regions
+
+
+# Worker: one tile of one raster -> its class regions and cell counts
+def process_tile(path, window, remap=REMAP_RANGES):
+    raster = Raster(path)
+    classes = reclassify(raster.read(window), remap)
+    counts = np.bincount(classes.ravel(), minlength=max(value for _, _, value in remap) + 1)
+    return class_regions(classes, window[0], window[1]), counts
+
+
+# {raster path: [{"gridcode", "pixels", "area", "geometry"}, ...]} with the
+# geometry in map coordinates.  With workers > 1 the tiles of all rasters
+# share one process pool.
+def reclassify_rasters(paths, tile_size=TILE_SIZE, workers=WORKERS, remap=REMAP_RANGES):
+    rasters = {path: Raster(path) for path in paths}
+    tasks = [(path, window) for path, raster in rasters.items() for window in raster.tiles(tile_size)]
+    pieces = {path: {} for path in paths}
+    counts = {path: 0 for path in paths}
+
+    def collect(path, result):
+        regions, tile_counts = result
+        for value, geometry in regions.items():
+            pieces[path].setdefault(value, []).append(geometry)
+        counts[path] = counts[path] + tile_counts
+
+    if workers <= 1 or len(tasks) <= 1:
+        for path, window in tasks:
+            collect(path, process_tile(path, window, remap))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(process_tile, [t[0] for t in tasks], [t[1] for t in tasks],
+                               [remap] * len(tasks), chunksize=max(1, len(tasks) // (workers * 4)))
+            for (path, _), result in zip(tasks, results):
+                collect(path, result)
+
+    output = {}
+    for path, raster in rasters.items():
+        rows = []
+        for value in sorted(pieces[path]):
+            geometry = raster.to_map(shapely.union_all(pieces[path][value]))
+            pixels = int(counts[path][value])
+            rows.append({"gridcode": value, "pixels": pixels, "area": pixels * raster.cell ** 2,
+                         "geometry": geometry})
+        output[path] = rows
+    return output
+
+
+# One <raster>_dissolved layer per raster, like the arcpy script's outputs
+def write_regions(output_path, raster, rows):
+    # Imported here so the engine itself doesn't need geopandas
+    import geopandas as gpd
+
+    frame = gpd.GeoDataFrame(rows, columns=["gridcode", "pixels", "area", "geometry"],
+                             geometry="geometry", crs=raster.crs)
+    frame.to_file(output_path, layer=f"{raster.name}_dissolved", driver="GPKG")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reclassify flood depth rasters into dissolved depth-class polygons.")
+    parser.add_argument("rasters", nargs="+", help="depth rasters (.flt or .npy, each with a .hdr)")
+    parser.add_argument("--output", default=OUTPUT_PATH, help=f"GeoPackage to write (default: {OUTPUT_PATH})")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    start_time = time.time()
+    print(f"Processing {len(args.rasters)} rasters in {args.tile_size}-cell tiles with {args.workers} workers...")
+    results = reclassify_rasters(args.rasters, tile_size=args.tile_size, workers=args.workers)
+    print(f"Reclassified and dissolved in {time.time() - start_time:.2f} seconds.")
+
+    for path, rows in results.items():
+        write_regions(args.output, Raster(path), rows)
+        classes = ", ".join(f"{row['gridcode']}: {row['area']:.0f}" for row in rows)
+        print(f"  {os.path.basename(path)} -> {len(rows)} classes ({classes})")
+
+    print(f"All rasters reclassified, converted to polygons, and dissolved in {time.time() - start_time:.2f} seconds.")
+
+
+if __name__ == "__main__":
+    main()
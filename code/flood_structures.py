@@ -0,0 +1,343 @@
+import time
+import sqlite3
+import argparse
+
+import numpy as np
+import shapely
+from flood_raster import Raster
+
+# ------------------ Config ------------------
+# The tables of Flood_Depth_Statistic_to_Structures.py: Flood_*Yr field ->
+# ZonalStatisticsAsTable output for that return period
+EVENT_TABLES = {
+    "Flood_2Yr": "ZonalSt_Buildin2",
+    "Flood_5Yr": "ZonalSt_Buildin5",
+    "Flood_10Yr": "ZonalSt_Buildin10",
+    "Flood_25Yr": "ZonalSt_Buildin25",
+    "Flood_50Yr": "ZonalSt_Buildin50",
+    "Flood_100Yr": "ZonalSt_Buildin100",
+    "Flood_500Yr": "ZonalSt_Buildin500"
+}
+BUILDINGS = "500 Year Buildings"
+KEY_FIELD = "OBJECTID"
+JOIN_FIELD = "OBJECTID_1"
+VALUE_FIELD = "MAX"
+# Candidate cells (footprint bounding boxes) tested per batch when the zonal
+# max is computed from a raster, ~100 MB of working arrays
+CHUNK_CELLS = 2_000_000
+
+# Flood depth -> structures join.  Every zonal-statistics table is read once
+# into a column of one (buildings x events) float array, aligned on the
+# building key, and all the Flood_*Yr fields are then written in a single
+# pass over the buildings instead of one full update pass per return period.
+# Buildings with no row in a table get NULL for that event, as before.
+#
+# Missing tables.  An event without a table can be given a depth raster
+# (flood_raster.py formats), and its zonal max is computed from the building
+# footprints directly: the maximum depth over the cells whose centre falls
+# inside the footprint, which is how ZonalStatisticsAsTable rasterizes
+# polygon zones.  A footprint too small to contain any cell centre takes the
+# cell under its representative point rather than being dropped.  An event
+# with neither a table nor a raster is left out of the write, so whatever its
+# Flood_*Yr field already holds stays as it is.
+#
+# Backends.  Where the buildings and tables live is behind a small interface
+#   has_table(name), read_table(name, key_field, value_field) -> (ids, values),
+#   footprints(key_field) -> (ids, shapely geometries),
+#   write_fields(key_field, fields, ids, values)
+# with ArcpyBackend for file geodatabases, GeoPackageBackend (sqlite3 only,
+# no arcpy or GDAL) and MemoryBackend for offline runs and benchmarks.
+
+
+# ------------------ Join ------------------
+# (ids, values) per event -> sorted union of ids and an (ids x events) array,
+# NaN where an event has no value; a repeated id keeps its last value, as
+# the dict in the arcpy script did
+def align_columns(columns, events):
+    ids = [np.asarray(columns[event][0], dtype=np.int64) for event in events]
+    union = np.sort(np.concatenate(ids)) if ids else np.empty(0, dtype=np.int64)
+    union = union[np.append(True, union[1:] != union[:-1])] if len(union) else union
+    values = np.full((len(union), len(events)), np.nan)
+    for j, event in enumerate(events):
+        values[np.searchsorted(union, ids[j]), j] = np.asarray(columns[event][1], dtype=float)
+    return union, values
+
+
+def join_flood_depths(backend, event_tables=EVENT_TABLES, rasters=None, key_field=KEY_FIELD,
+                      join_field=JOIN_FIELD, value_field=VALUE_FIELD):
+    rasters = rasters or {}
+    events = []
+    columns = {}
+    from_rasters = []
+    for event, table in event_tables.items():
+        if backend.has_table(table):
+            columns[event] = backend.read_table(table, join_field, value_field)
+            print(f"Read table: {table} for field: {event} ({len(columns[event][0])} rows)")
+        elif event in rasters:
+            from_rasters.append(event)
+        else:
+            print(f"No table {table} or depth raster for {event}; leaving {event} unchanged")
+            continue
+        events.append(event)
+
+    if from_rasters:
+        ids, footprints = backend.footprints(key_field)
+        for event in from_rasters:
+            start = time.time()
+            columns[event] = (ids, zonal_max(Raster(rasters[event]), footprints))
+            print(f"Computed {event} from {rasters[event]} for {len(ids)} buildings in {time.time() - start:.2f} seconds")
+
+    ids, values = align_columns(columns, events)
+    if events:
+        backend.write_fields(key_field, events, ids, values)
+    print(f"Wrote {len(events)} fields in one pass.")
+    return events, ids, values
+
+
+# ------------------ Zonal max from a raster ------------------
+def zonal_max(raster, footprints, chunk_cells=CHUNK_CELLS):
+    footprints = np.asarray(footprints, dtype=object)
+    result = np.full(len(footprints), np.nan)
+    if not len(footprints):
+        return result
+    row0, col0, row1, col1 = raster.windows(shapely.bounds(footprints))
+    height, width = row1 - row0, col1 - col0
+    counts = height * width
+    # Nearby buildings together, so the memory map is read roughly in order
+    order = np.lexsort((col0, row0 // 256))
+    order = order[counts[order] > 0]
+    ends = np.cumsum(counts[order])
+
+    first = 0
+    while first < len(order):
+        last = max(first + 1, int(np.searchsorted(ends, ends[first] - counts[order[first]] + chunk_cells, side="right")))
+        batch = order[first:last]
+        first = last
+
+        # Every cell of every bounding box in the batch, grouped by building
+        n = counts[batch]
+        building = np.repeat(np.arange(len(batch)), n)
+        k = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        rows = row0[batch][building] + k // width[batch][building]
+        cols = col0[batch][building] + k % width[batch][building]
+        x, y = raster.centres(rows, cols)
+        inside = shapely.contains_xy(footprints[batch][building], x, y)
+
+        depth = np.asarray(raster.data[rows[inside], cols[inside]], dtype=float)
+        if raster.nodata is not None:
+            depth[depth == raster.nodata] = np.nan
+        hit, starts = np.unique(building[inside], return_index=True)
+        if len(hit):
+            result[batch[hit]] = np.fmax.reduceat(depth, starts)
+
+        missed = batch[~np.isin(np.arange(len(batch)), hit)]
+        if len(missed):
+            result[missed] = cell_under(raster, shapely.point_on_surface(footprints[missed]))
+    return result
+
+
+def cell_under(raster, points):
+    x, y = shapely.get_x(points), shapely.get_y(points)
+    cols = np.floor((x - raster.left) / raster.cell).astype(np.int64)
+    rows = np.floor((raster.top - y) / raster.cell).astype(np.int64)
+    valid = (rows >= 0) & (rows < raster.nrows) & (cols >= 0) & (cols < raster.ncols)
+    values = np.full(len(points), np.nan)
+    values[valid] = raster.data[rows[valid], cols[valid]]
+    if raster.nodata is not None:
+        values[values == raster.nodata] = np.nan
+    return values
+
+
+# ------------------ Backends ------------------
+def nullable(row):
+    return [None if value != value else float(value) for value in row]
+
+
+class MemoryBackend:
+    def __init__(self, ids=None, footprints=None, tables=None):
+        self.ids = np.asarray(ids if ids is not None else [], dtype=np.int64)
+        self.geometries = footprints
+        # name -> {field: array}
+        self.tables = tables or {}
+        # field -> array aligned with ids
+        self.fields = {}
+
+    def has_table(self, name):
+        return name in self.tables
+
+    def read_table(self, name, key_field, value_field):
+        table = self.tables[name]
+        return np.asarray(table[key_field], dtype=np.int64), np.asarray(table[value_field], dtype=float)
+
+    def footprints(self, key_field):
+        return self.ids, self.geometries
+
+    def write_fields(self, key_field, fields, ids, values):
+        rows = np.minimum(np.searchsorted(ids, self.ids), max(len(ids) - 1, 0))
+        found = ids[rows] == self.ids if len(ids) else np.zeros(len(self.ids), dtype=bool)
+        for j, field in enumerate(fields):
+            column = np.full(len(self.ids), np.nan)
+            column[found] = values[rows[found], j]
+            self.fields[field] = column
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+# GeoPackage geometry blob -> WKB (GeoPackage spec 2.1.3: 8-byte header plus
+# an envelope whose size is in bits 1-3 of the flags byte)
+def gpkg_wkb(blob):
+    if blob is None or blob[3] & 0x10:
+        return None
+    envelope = (0, 32, 48, 48, 64)[(blob[3] >> 1) & 0x07]
+    return bytes(blob[8 + envelope:])
+
+
+# The SQL functions GeoPackage R-tree triggers call; sqlite3 doesn't have them,
+# and any UPDATE of a feature table compiles the triggers that use them
+def register_gpkg_functions(connection):
+    def bound(k):
+        def function(blob):
+            wkb = gpkg_wkb(blob)
+            return None if wkb is None else float(shapely.bounds(shapely.from_wkb(wkb))[k])
+        return function
+
+    connection.create_function("ST_IsEmpty", 1, lambda blob: int(gpkg_wkb(blob) is None), deterministic=True)
+    for k, name in enumerate(("ST_MinX", "ST_MinY", "ST_MaxX", "ST_MaxY")):
+        connection.create_function(name, 1, bound(k), deterministic=True)
+
+
+class GeoPackageBackend:
+    def __init__(self, path, buildings=BUILDINGS):
+        self.path = path
+        self.buildings = buildings
+        self.connection = sqlite3.connect(path)
+        register_gpkg_functions(self.connection)
+
+    def has_table(self, name):
+        row = self.connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                      (name,)).fetchone()
+        return row is not None
+
+    def read_table(self, name, key_field, value_field):
+        rows = self.connection.execute(f"SELECT {quote(key_field)}, {quote(value_field)} FROM {quote(name)}").fetchall()
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        values = np.fromiter((np.nan if row[1] is None else row[1] for row in rows), dtype=float, count=len(rows))
+        return ids, values
+
+    def geometry_column(self):
+        row = self.connection.execute("SELECT column_name FROM gpkg_geometry_columns WHERE table_name = ?",
+                                      (self.buildings,)).fetchone()
+        if row is None:
+            raise ValueError(f"{self.path}: {self.buildings} is not a feature table")
+        return row[0]
+
+    def footprints(self, key_field):
+        rows = self.connection.execute(
+            f"SELECT {quote(key_field)}, {quote(self.geometry_column())} FROM {quote(self.buildings)}").fetchall()
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        return ids, shapely.from_wkb([gpkg_wkb(row[1]) for row in rows])
+
+    def write_fields(self, key_field, fields, ids, values):
+        table = quote(self.buildings)
+        existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+        with self.connection:
+            for field in fields:
+                if field not in existing:
+                    print(f"Adding field: {field}")
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {quote(field)} REAL")
+            # Staged in a keyed temporary table, then one UPDATE over the
+            # buildings sets every field (NULL where the key has no row)
+            self.connection.execute("DROP TABLE IF EXISTS temp.flood_depths")
+            self.connection.execute("CREATE TEMP TABLE flood_depths (key INTEGER PRIMARY KEY, "
+                                    + ", ".join(f"v{j} REAL" for j in range(len(fields))) + ")")
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO temp.flood_depths VALUES (" + ", ".join("?" * (len(fields) + 1)) + ")",
+                ([int(key)] + nullable(row) for key, row in zip(ids.tolist(), values.tolist())))
+            self.connection.execute(
+                f"UPDATE {table} SET (" + ", ".join(quote(f) for f in fields) + ") = "
+                "(SELECT " + ", ".join(f"v{j}" for j in range(len(fields))) +
+                f" FROM temp.flood_depths WHERE key = {table}.{quote(key_field)})")
+            self.connection.execute("DROP TABLE temp.flood_depths")
+
+    def close(self):
+        self.connection.close()
+
+
+class ArcpyBackend:
+    def __init__(self, workspace, buildings=BUILDINGS):
+        # Imported here so the other backends work without ArcGIS Pro
+        import arcpy
+
+        self.arcpy = arcpy
+        arcpy.env.workspace = workspace
+        self.buildings = buildings
+
+    def has_table(self, name):
+        return self.arcpy.Exists(name)
+
+    def read_table(self, name, key_field, value_field):
+        ids, values = [], []
+        with self.arcpy.da.SearchCursor(name, [key_field, value_field]) as cursor:
+            for key, value in cursor:
+                ids.append(key)
+                values.append(np.nan if value is None else value)
+        return np.array(ids, dtype=np.int64), np.array(values, dtype=float)
+
+    def footprints(self, key_field):
+        ids, wkbs = [], []
+        with self.arcpy.da.SearchCursor(self.buildings, [key_field, "SHAPE@WKB"]) as cursor:
+            for key, wkb in cursor:
+                ids.append(key)
+                wkbs.append(bytes(wkb) if wkb else None)
+        return np.array(ids, dtype=np.int64), shapely.from_wkb(wkbs)
+
+    def write_fields(self, key_field, fields, ids, values):
+        existing = {field.name for field in self.arcpy.ListFields(self.buildings)}
+        for field in fields:
+            if field not in existing:
+                print(f"Adding field: {field}")
+                self.arcpy.AddField_management(self.buildings, field, "DOUBLE")
+        lookup = dict(zip(ids.tolist(), (nullable(row) for row in values.tolist())))
+        empty = [None] * len(fields)
+        with self.arcpy.da.UpdateCursor(self.buildings, [key_field] + list(fields)) as cursor:
+            for row in cursor:
+                cursor.updateRow([row[0]] + lookup.get(row[0], empty))
+
+    def close(self):
+        pass
+
+
+def open_backend(path, buildings=BUILDINGS):
+    if path.lower().endswith(".gpkg"):
+        return GeoPackageBackend(path, buildings)
+    return ArcpyBackend(path, buildings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Join flood depth zonal maxima to building footprints in one pass.")
+    parser.add_argument("workspace", help="file geodatabase (arcpy) or GeoPackage holding the buildings and tables")
+    parser.add_argument("--buildings", default=BUILDINGS)
+    parser.add_argument("--key-field", default=KEY_FIELD)
+    parser.add_argument("--raster", action="append", default=[], metavar="EVENT=PATH",
+                        help="depth raster for an event whose zonal statistics table is missing, "
+                             "e.g. Flood_2Yr=depth_2yr.flt (repeatable)")
+    args = parser.parse_args()
+
+    rasters = dict(item.split("=", 1) for item in args.raster)
+    unknown = set(rasters) - set(EVENT_TABLES)
+    if unknown:
+        parser.error(f"unknown events: {', '.join(sorted(unknown))}")
+
+    start_time = time.time()
+    backend = open_backend(args.workspace, args.buildings)
+    try:
+        join_flood_depths(backend, rasters=rasters, key_field=args.key_field)
+    finally:
+        backend.close()
+    print(f"Script completed successfully in {time.time() - start_time:.2f} seconds.")
+
+
+if __name__ == "__main__":
+    main()
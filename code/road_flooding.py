@@ -0,0 +1,191 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import shapely
+
+# ------------------ Config ------------------
+METERS_TO_FEET = 3.28084
+OUTPUT_TABLE = "FloodedRoadsSummary.csv"
+WORKERS = os.cpu_count() or 1
+# Summary row covering every road of an event
+ALL_ROADS = "All"
+# Road class for roads with an empty --class-field value
+UNCLASSIFIED = "Unclassified"
+
+# Road flooding statistics for any number of flood events at once, the
+# NumPy/shapely version of Road_Flooding_Statistic.py, with no arcpy needed:
+# layers are read with geopandas (GeoPackage, shapefile, GeoJSON, file
+# geodatabase through GDAL's OpenFileGDB driver).
+#
+# The road network is clipped to the boundary once and an STRtree is built
+# over the clipped roads once.  Each event's flood polygons are dissolved and
+# split back into non-overlapping parts, the tree is queried with the parts,
+# and the flooded length of a road is the length of its intersection with
+# the parts it touches -- nothing needs computing for roads a part contains
+# outright (their whole length is flooded) or doesn't touch at all.  There is
+# no split/intersect round trip and no AddField/CalculateField passes:
+# lengths come straight off the intersection geometry, in metres and feet.
+#
+# Lengths are in metres whatever the input: a geographic CRS is projected to
+# its local UTM zone first, and a projected CRS in feet is converted.
+#
+# Events run in a process pool; each worker receives the clipped roads once
+# (pool initializer) and builds its own tree.  The summary has one row per
+# event and road class plus an "All" row per event: total, flooded and
+# percentage flooded.
+
+
+def read_layer(spec):
+    # Imported here so the engine itself doesn't need geopandas
+    import geopandas as gpd
+
+    path, _, layer = spec.partition("|")
+    return gpd.read_file(path, layer=layer or None)
+
+
+def metric(frame):
+    if frame.crs is None:
+        return frame, 1.0
+    if frame.crs.is_geographic:
+        return frame.to_crs(frame.estimate_utm_crs()), 1.0
+    return frame, frame.crs.axis_info[0].unit_conversion_factor
+
+
+# Geometry array of a layer in the roads' CRS
+def geometries(frame, crs):
+    if crs is not None and frame.crs is not None and frame.crs != crs:
+        frame = frame.to_crs(crs)
+    return frame.geometry.to_numpy()
+
+
+# Roads (shapely array) clipped to the boundary polygon(s), with their classes
+# (or None); roads outside the boundary are dropped
+def clip_roads(roads, classes, boundary):
+    boundary = shapely.union_all(boundary)
+    shapely.prepare(boundary)
+    touching = shapely.intersects(boundary, roads)
+    inside = shapely.contains_properly(boundary, roads)
+    clipped = np.array(roads, dtype=object)
+    edge = touching & ~inside
+    clipped[edge] = shapely.intersection(roads[edge], boundary)
+    keep = touching & (shapely.length(clipped) > 0)
+    return clipped[keep], None if classes is None else np.asarray(classes, dtype=object)[keep]
+
+
+# Length (CRS units) of each road inside the flood polygons
+def flooded_lengths(roads, tree, flood):
+    parts = shapely.get_parts(shapely.union_all(flood))
+    flooded = np.zeros(len(roads))
+    if not len(parts):
+        return flooded
+    shapely.prepare(parts)
+    part, road = tree.query(parts, predicate="intersects")
+    whole = shapely.contains_properly(parts[part], roads[road])
+    np.add.at(flooded, road[whole], shapely.length(roads[road[whole]]))
+    partial = ~whole
+    pieces = shapely.intersection(roads[road[partial]], parts[part[partial]])
+    np.add.at(flooded, road[partial], shapely.length(pieces))
+    return flooded
+
+
+_worker_roads = None
+_worker_tree = None
+
+
+def init_worker(roads):
+    global _worker_roads, _worker_tree
+    _worker_roads = roads
+    _worker_tree = shapely.STRtree(roads)
+
+
+def event_worker(flood):
+    return flooded_lengths(_worker_roads, _worker_tree, flood)
+
+
+# classes is None for no per-class rows
+def summarize(event, classes, total_m, flooded_m):
+    rows = []
+    groups = [(ALL_ROADS, np.ones(len(total_m), dtype=bool))]
+    if classes is not None:
+        groups += [(name, classes == name) for name in sorted(set(classes))]
+    for name, selected in groups:
+        total = float(total_m[selected].sum())
+        flooded = float(flooded_m[selected].sum())
+        rows.append({"Event": event, "Road_Class": name,
+                     "Total_Length_m": total, "Flooded_Length_m": flooded,
+                     "Total_Length_ft": total * METERS_TO_FEET, "Flooded_Length_ft": flooded * METERS_TO_FEET,
+                     "Percentage_Flooded": flooded / total * 100 if total else 0.0})
+    return rows
+
+
+# events: {name: shapely array of flood polygons}; lengths are multiplied by
+# unit_m to get metres.  Returns the summary rows.
+def road_flooding(roads, classes, boundary, events, workers=WORKERS, unit_m=1.0):
+    roads, classes = clip_roads(np.asarray(roads, dtype=object), classes, boundary)
+    total_m = shapely.length(roads) * unit_m
+    names = list(events)
+    if workers <= 1 or len(names) <= 1:
+        init_worker(roads)
+        results = [event_worker(events[name]) for name in names]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(names)), initializer=init_worker,
+                                 initargs=(roads,)) as pool:
+            results = list(pool.map(event_worker, [events[name] for name in names]))
+
+    rows = []
+    for name, flooded in zip(names, results):
+        rows.extend(summarize(name, classes, total_m, flooded * unit_m))
+    return rows
+
+
+def write_summary(path, rows):
+    # Imported here so the engine itself doesn't need pandas
+    import pandas as pd
+
+    frame = pd.DataFrame(rows)
+    if path.lower().endswith(".gpkg"):
+        import pyogrio
+
+        pyogrio.write_dataframe(frame, path, layer="FloodedRoadsSummary")
+    else:
+        frame.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flooded road length for one or more flood events.")
+    parser.add_argument("roads", help="road network, PATH or PATH|LAYER")
+    parser.add_argument("boundary", help="boundary polygons, PATH or PATH|LAYER")
+    parser.add_argument("--event", action="append", required=True, metavar="NAME=PATH[|LAYER]",
+                        help="flood event polygons (repeatable)")
+    parser.add_argument("--class-field", help="road attribute to break the summary down by")
+    parser.add_argument("--output", default=OUTPUT_TABLE, help=f"CSV or GeoPackage (default: {OUTPUT_TABLE})")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    start_time = time.time()
+    roads, unit_m = metric(read_layer(args.roads))
+    classes = None
+    if args.class_field:
+        values = roads[args.class_field].astype("string").fillna("").str.strip()
+        classes = values.mask(values == "", UNCLASSIFIED).to_numpy(dtype=object)
+    boundary = geometries(read_layer(args.boundary), roads.crs)
+    events = {}
+    for item in args.event:
+        name, _, spec = item.partition("=")
+        events[name] = geometries(read_layer(spec), roads.crs)
+    print(f"Read {len(roads)} roads and {len(events)} flood events in {time.time() - start_time:.2f} seconds.")
+
+    rows = road_flooding(roads.geometry.to_numpy(), classes, boundary, events, workers=args.workers, unit_m=unit_m)
+    write_summary(args.output, rows)
+    for row in rows:
+        if row["Road_Class"] == ALL_ROADS:
+            print(f"{row['Event']}: {row['Flooded_Length_ft']:.2f} of {row['Total_Length_ft']:.2f} feet flooded "
+                  f"({row['Percentage_Flooded']:.2f}%)")
+    print(f"Summary table written to {args.output} in {time.time() - start_time:.2f} seconds.")
+
+
+if __name__ == "__main__":
+    main()
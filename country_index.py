@@ -0,0 +1,150 @@
+import os
+import csv
+import json
+import hashlib
+import numpy as np
+
+# ------------------ Config ------------------
+CSV_PATH = "sat_names.csv"
+INDEX_DTYPE = np.dtype([("satid", "<i8"), ("country", "<u2")])
+
+# sat_names.csv compiled once into a sorted binary index:
+#   sat_names.idx.npy   structured array of (satid, country code), sorted by satid,
+#                       memory-mapped on load
+#   sat_names.idx.json  interned country names plus the source CSV's size, mtime and
+#                       SHA-1, so the index rebuilds itself whenever the CSV changes
+#
+# The CSV is only hashed when its mtime differs from the recorded one (a fresh
+# checkout, as on every CI run); a matching hash just records the new mtime.
+# Both files are written to temporaries first and the .json replaced last, so
+# an interrupted compile leaves metadata that doesn't describe the CSV and the
+# next load compiles again.
+
+
+def index_paths(csv_path):
+    base = os.path.splitext(csv_path)[0] + ".idx"
+    return base + ".npy", base + ".json"
+
+
+def read_csv_text(csv_path):
+    # The CSV has been delivered as cp1252 before; it is decoded as such in
+    # memory and the file itself is left as it is.
+    with open(csv_path, "rb") as f:
+        raw = f.read()
+    try:
+        return raw.decode("utf-8-sig"), raw
+    except UnicodeDecodeError:
+        print(f"Reading {csv_path} as cp1252 (not valid UTF-8).")
+        return raw.decode("cp1252"), raw
+
+
+def compile_country_index(csv_path=CSV_PATH):
+    text, raw = read_csv_text(csv_path)
+    npy_path, meta_path = index_paths(csv_path)
+
+    ids = []
+    names = []
+    countries = {}
+    reader = csv.DictReader(text.splitlines())
+    for row in reader:
+        try:
+            satid = int(row["satid"].strip())
+            country = row["country"].strip()
+        except Exception as e:
+            print(f"Skipping row: {e}, data: {row}")
+            continue
+        ids.append(satid)
+        names.append(countries.setdefault(country, len(countries)))
+
+    ids = np.array(ids, dtype=np.int64)
+    codes = np.array(names, dtype=np.uint16)
+    order = np.argsort(ids, kind="stable")
+    ids, codes = ids[order], codes[order]
+    # Same as the old dict: the last row for a satid wins
+    last = np.append(ids[1:] != ids[:-1], True)
+
+    index = np.empty(int(last.sum()), dtype=INDEX_DTYPE)
+    index["satid"] = ids[last]
+    index["country"] = codes[last]
+    npy_tmp = f"{npy_path}.{os.getpid()}.tmp"
+    meta_tmp = f"{meta_path}.{os.getpid()}.tmp"
+    with open(npy_tmp, "wb") as f:
+        np.save(f, index)
+    with open(meta_tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "source_size": len(raw),
+            "source_mtime_ns": os.stat(csv_path).st_mtime_ns,
+            "source_sha1": hashlib.sha1(raw).hexdigest(),
+            "countries": list(countries),
+        }, f)
+    os.replace(npy_tmp, npy_path)
+    os.replace(meta_tmp, meta_path)
+    print(f"Compiled {len(index)} satellite-country entries into {npy_path}.")
+
+
+class CountryIndex:
+    def __init__(self, index, countries):
+        self.ids = index["satid"]
+        self.codes = index["country"]
+        # Object array so a fancy index returns names directly; the extra slot
+        # at the end is the "not found" answer
+        self.countries = np.array(list(countries) + [None], dtype=object)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, norad_ids):
+        norad_ids = np.asarray(norad_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(norad_ids.shape, None, dtype=object)
+        pos = np.searchsorted(self.ids, norad_ids)
+        pos = np.minimum(pos, len(self.ids) - 1)
+        found = self.ids[pos] == norad_ids
+        codes = np.where(found, self.codes[pos], len(self.countries) - 1)
+        return self.countries[codes]
+
+    def get(self, norad_id, default=None):
+        try:
+            country = self.lookup([norad_id])[0]
+        except (TypeError, ValueError):
+            return default
+        return default if country is None else country
+
+
+def index_is_current(csv_path):
+    npy_path, meta_path = index_paths(csv_path)
+    if not (os.path.exists(npy_path) and os.path.exists(meta_path)):
+        return False
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    stat = os.stat(csv_path)
+    if meta.get("source_size") != stat.st_size:
+        return False
+    if meta.get("source_mtime_ns") == stat.st_mtime_ns:
+        return True
+    with open(csv_path, "rb") as f:
+        if meta.get("source_sha1") != hashlib.sha1(f.read()).hexdigest():
+            return False
+    meta["source_mtime_ns"] = stat.st_mtime_ns
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+    return True
+
+
+def load_country_index(csv_path=CSV_PATH):
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+    if not index_is_current(csv_path):
+        compile_country_index(csv_path)
+
+    npy_path, meta_path = index_paths(csv_path)
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    index = CountryIndex(np.load(npy_path, mmap_mode="r"), meta["countries"])
+    print(f"Loaded {len(index)} satellite-country entries.")
+    return index
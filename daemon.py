@@ -0,0 +1,259 @@
+import time
+import argparse
+import datetime
+from country_index import load_country_index
+from ephemeris import Ephemeris, EPHEMERIS_PATH
+from feature_sync import LayerSync, state_path_for
+from gp_cache import GPStore, GP_CACHE_PATH, spacetrack_login
+from ground_tracks import SIMPLIFY_TOLERANCE_KM
+from instrumentation import RunReport, default_report_path
+from propagation import load_catalog, time_grid, propagate_subpoints, itrs_to_geodetic, build_point_features
+from timescale import load_timescale
+from update_ground_tracks import (
+    POINT_LAYER_ID, LINE_LAYER_ID, CSV_PATH, PREDICTION_MINUTES, AGOL_USERNAME, AGOL_PASSWORD,
+    SPACETRACK_USERNAME, SPACETRACK_PASSWORD, process_tle_data,
+)
+
+# ------------------ Config ------------------
+POINT_INTERVAL_S = 60
+# Space-Track asks for GP queries no more often than once an hour
+ELEMENT_INTERVAL_S = 3600
+# Tracks cover PREDICTION_MINUTES from when they were generated; after this
+# long they are regenerated even if no element set changed
+TRACK_MAX_AGE_S = 15 * 60
+# Until the first catalog has loaded there is nothing to publish, so a failed
+# refresh is retried after this long, doubling up to STARTUP_RETRY_MAX_S,
+# instead of waiting out ELEMENT_INTERVAL_S
+STARTUP_RETRY_S = 30
+STARTUP_RETRY_MAX_S = 600
+
+# Resident mode for update_ground_tracks.py.  The GIS and Space-Track
+# sessions, the timescale, the GP store with its parsed Satrecs and the layers'
+# key -> OBJECTID maps stay in memory between cycles, so a cycle is only the
+# work itself.  Three jobs share one loop:
+#   elements  GP delta fetch every ELEMENT_INTERVAL_S (re-login on failure;
+#             retried within seconds until the first catalog has loaded)
+#   points    current positions every POINT_INTERVAL_S (one SGP4 step)
+#   tracks    the hour-long tracks, regenerated in full once they are
+#             TRACK_MAX_AGE_S old, and only for the satellites whose
+#             elements changed (or that were dropped) in between
+# With an ephemeris.Ephemeris, the elements job also brings its table up to
+# date and points and tracks are interpolated from it instead of running SGP4.
+# Time comes from a clock object, so the FakeClock and RecordedSession in
+# tests/doubles.py plus a FakeFeatureLayer run the whole schedule offline
+# (tests/test_daemon.py).
+
+
+class SystemClock:
+    def now(self):
+        return datetime.datetime.utcnow()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class Daemon:
+    def __init__(self, store, login, point_sync, line_sync, countries, clock=None, ts=None, report=None,
+                 point_interval=POINT_INTERVAL_S, element_interval=ELEMENT_INTERVAL_S,
+                 track_max_age=TRACK_MAX_AGE_S, workers=1, track_tolerance_km=SIMPLIFY_TOLERANCE_KM,
+                 ephemeris=None, startup_retry=STARTUP_RETRY_S, startup_retry_max=STARTUP_RETRY_MAX_S):
+        self.store = store
+        # () -> logged-in Space-Track session
+        self.login = login
+        self.session = None
+        self.point_sync = point_sync
+        self.line_sync = line_sync
+        self.countries = countries
+        self.clock = clock or SystemClock()
+        self.ts = ts or load_timescale()
+        self.report = report or RunReport("daemon", path="")
+        self.point_interval = datetime.timedelta(seconds=point_interval)
+        self.element_interval = datetime.timedelta(seconds=element_interval)
+        self.track_max_age = datetime.timedelta(seconds=track_max_age)
+        self.startup_retry = startup_retry
+        self.startup_retry_max = startup_retry_max
+        self.startup_failures = 0
+        self.workers = workers
+        self.track_tolerance_km = track_tolerance_km
+        self.ephemeris = ephemeris
+
+        self.catalog = None
+        self.satrec_array = None
+        self.next_elements = None
+        self.next_points = None
+        # Start time of the published tracks and what changed since
+        self.tracks_start = None
+        self.stale_tracks = set()
+        self.dropped_tracks = set()
+
+    # ------------------ Jobs ------------------
+    def refresh_elements(self, now):
+        if self.session is None:
+            self.session = self.login()
+        try:
+            self.store.refresh(self.session, now=now)
+        except (RuntimeError, OSError) as e:
+            # Usually an expired session cookie
+            print(f"GP refresh failed ({e}); logging in again.")
+            self.session = self.login()
+            self.store.refresh(self.session, now=now)
+        self.report.add_bytes("fetch", self.store.received_bytes)
+
+        if self.catalog is None or self.store.changed or self.store.dropped:
+            self.catalog = load_catalog(self.store.tle_data(), satrec_cache=self.store.satrec_cache,
+                                        report=self.report)
+            self.satrec_array = self.catalog.array()
+            if self.tracks_start is not None:
+                self.stale_tracks |= self.store.changed
+                self.dropped_tracks |= self.store.dropped
+            print(f"Catalog: {len(self.catalog)} satellites "
+                  f"({len(self.store.changed)} changed, {len(self.store.dropped)} dropped).")
+
+        if self.ephemeris is not None:
+            # Has to last until the next refresh, for tracks as old as track_max_age
+            horizon = self.element_interval + self.track_max_age + datetime.timedelta(minutes=PREDICTION_MINUTES)
+            self.ephemeris.update(self.store.tle_data(), now, horizon_s=horizon.total_seconds(),
+                                  satrec_cache=self.store.satrec_cache, report=self.report)
+
+    def update_points(self, now):
+        t, jd, fr = time_grid(self.ts, now, [0.0])
+        if self.ephemeris is not None:
+            lon, lat, alt_km = itrs_to_geodetic(self.ephemeris.itrs(self.catalog, now, [0.0], t, jd, fr))
+        else:
+            lon, lat, alt_km = propagate_subpoints(self.satrec_array, t, jd, fr)
+        points = build_point_features(self.catalog, lon, lat, alt_km, now.strftime("%Y-%m-%d %H:%M:%S"),
+                                      self.countries, report=self.report)
+        self.report.record_sync("points", self.point_sync.sync(points, reload=False))
+
+    def tracks_due(self, now):
+        return (self.tracks_start is None or now - self.tracks_start >= self.track_max_age
+                or bool(self.stale_tracks or self.dropped_tracks))
+
+    def update_tracks(self, now):
+        if self.tracks_start is None or now - self.tracks_start >= self.track_max_age:
+            _, lines = self.build_tracks(self.store.tle_data(), now)
+            self.report.record_sync("lines", self.line_sync.sync(lines, reload=False))
+            self.tracks_start = now
+        else:
+            # Same window as the published tracks, just for the changed satellites
+            changed = [self.store.records[i] for i in sorted(self.stale_tracks) if i in self.store.records]
+            _, lines = self.build_tracks(changed, self.tracks_start)
+            self.line_sync.begin(reload=False)
+            self.line_sync.push(lines)
+            self.line_sync.remove(self.dropped_tracks)
+            self.line_sync.save_state()
+            self.report.record_sync("lines", self.line_sync.totals)
+        self.stale_tracks = set()
+        self.dropped_tracks = set()
+
+    def build_tracks(self, tle_data, start):
+        return process_tle_data(tle_data, start, self.countries, workers=self.workers,
+                                satrec_cache=self.store.satrec_cache,
+                                track_tolerance_km=self.track_tolerance_km, report=self.report,
+                                ephemeris=self.ephemeris)
+
+    # ------------------ Scheduler ------------------
+    def run_job(self, name, job, now):
+        with self.report.stage(name):
+            try:
+                job(now)
+                self.report.count(f"{name}_runs")
+                return True
+            except Exception as e:
+                # A failed cycle is retried on the job's next turn; the daemon keeps going
+                print(f"{name} failed: {e}")
+                self.report.count(f"{name}_errors")
+                return False
+
+    # Runs whatever is due and returns the seconds until something is due next
+    def tick(self):
+        now = self.clock.now()
+        if self.next_elements is None or now >= self.next_elements:
+            self.run_job("refresh_elements", self.refresh_elements, now)
+            if self.catalog is None:
+                delay = min(self.startup_retry * 2 ** self.startup_failures, self.startup_retry_max)
+                self.startup_failures += 1
+                print(f"No catalog loaded yet; retrying in {delay:.0f}s.")
+                self.next_elements = now + datetime.timedelta(seconds=delay)
+            else:
+                self.startup_failures = 0
+                self.next_elements = now + self.element_interval
+
+        if self.catalog is not None:
+            if self.next_points is None or now >= self.next_points:
+                self.run_job("update_points", self.update_points, now)
+                self.next_points = now + self.point_interval
+            if self.tracks_due(now):
+                self.run_job("update_tracks", self.update_tracks, now)
+
+        due = [self.next_elements]
+        if self.catalog is not None:
+            due.append(self.next_points)
+            if self.tracks_start is not None:
+                due.append(self.tracks_start + self.track_max_age)
+        return max(0.0, (min(due) - self.clock.now()).total_seconds())
+
+    def run(self, ticks=None):
+        count = 0
+        while ticks is None or count < ticks:
+            delay = self.tick()
+            self.report.write()
+            count += 1
+            if ticks is None or count < ticks:
+                self.clock.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep satellite points and ground tracks current on ArcGIS Online.")
+    parser.add_argument("--point-interval", type=float, default=POINT_INTERVAL_S,
+                        help="seconds between point refreshes (default: %(default)s)")
+    parser.add_argument("--element-interval", type=float, default=ELEMENT_INTERVAL_S,
+                        help="seconds between Space-Track GP fetches (default: %(default)s)")
+    parser.add_argument("--track-max-age", type=float, default=TRACK_MAX_AGE_S,
+                        help="seconds before ground tracks are regenerated in full (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes for full track regeneration (default: 1)")
+    parser.add_argument("--gp-cache", default=GP_CACHE_PATH,
+                        help=f"local GP element store (default: {GP_CACHE_PATH})")
+    parser.add_argument("--track-tolerance-km", type=float, default=SIMPLIFY_TOLERANCE_KM,
+                        help=f"ground track simplification tolerance (default: {SIMPLIFY_TOLERANCE_KM})")
+    parser.add_argument("--ephemeris", nargs="?", const=EPHEMERIS_PATH, metavar="PATH",
+                        help=f"interpolate positions from a cached ephemeris table (default path: {EPHEMERIS_PATH})")
+    parser.add_argument("--report", default=default_report_path("daemon"),
+                        help="JSON run report path, rewritten every cycle (default: %(default)s)")
+    args = parser.parse_args()
+
+    if not all([AGOL_USERNAME, AGOL_PASSWORD, SPACETRACK_USERNAME, SPACETRACK_PASSWORD]):
+        raise EnvironmentError("Missing required environment variables.")
+
+    from arcgis.gis import GIS
+
+    with RunReport("daemon", args.report) as report:
+        countries = load_country_index(CSV_PATH)
+        print("Logging into ArcGIS Online...")
+        gis = GIS("https://www.arcgis.com", AGOL_USERNAME, AGOL_PASSWORD)
+        point_layer = gis.content.get(POINT_LAYER_ID).layers[0]
+        line_layer = gis.content.get(LINE_LAYER_ID).layers[0]
+
+        daemon = Daemon(
+            GPStore(args.gp_cache),
+            lambda: spacetrack_login(SPACETRACK_USERNAME, SPACETRACK_PASSWORD),
+            LayerSync(point_layer, "norad_cat_id", state_path_for(POINT_LAYER_ID)),
+            LayerSync(line_layer, "norad_cat_id", state_path_for(LINE_LAYER_ID)),
+            countries,
+            report=report,
+            point_interval=args.point_interval,
+            element_interval=args.element_interval,
+            track_max_age=args.track_max_age,
+            workers=args.workers,
+            track_tolerance_km=args.track_tolerance_km,
+            ephemeris=Ephemeris(args.ephemeris) if args.ephemeris else None,
+        )
+        try:
+            daemon.run()
+        except KeyboardInterrupt:
+            print("Stopping.")
+
+
+if __name__ == "__main__":
+    main()
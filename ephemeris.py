@@ -0,0 +1,291 @@
+import os
+import json
+import argparse
+import datetime
+import numpy as np
+from sgp4.api import SatrecArray, jday
+from propagation import load_catalog, norad_sort_key, teme_to_itrs_matrices, propagate_itrs
+
+# ------------------ Config ------------------
+EPHEMERIS_PATH = "ephemeris_cache"
+WINDOW_HOURS = 24
+STEP_SECONDS = 120
+# A rebuilt window starts this far before "now", so passes that reuse an
+# earlier start time (the daemon's partial track updates) stay inside it
+BACKFILL_SECONDS = 30 * 60
+# Satellites propagated per SGP4 call while filling the table
+FILL_CHUNK = 500
+# Satellites checked against direct SGP4 after each update
+ERROR_SAMPLE = 200
+
+# Ephemeris table.  Each satellite is propagated once per element-set update
+# over a WINDOW_HOURS window at STEP_SECONDS, and the TEME positions (km) and
+# velocities (km/s) are kept in ephemeris_cache/states.*.npy, shaped
+# (satellites, samples, 6) and read memory-mapped, next to an index.json with
+# the window start, the NORAD id of every row and the TLE lines it was built
+# from.  An update re-propagates only rows whose lines changed (or the whole
+# table once the window runs out); everything else is copied across into a
+# new states.<generation>.npy, and replacing index.json is what switches
+# readers over, so an interrupted update leaves the previous table in use.
+# Queries only use a row while its lines are the ones the caller's catalog
+# holds; a satellite whose elements changed since the last update is
+# propagated directly until the next one.
+#
+# Positions in between samples are cubic Hermite interpolations of the
+# bracketing positions and velocities, then rotated TEME -> ITRS exactly as
+# propagation.propagate_itrs does, so the points, the ground tracks and the
+# observer query can all be answered from the table instead of SGP4.
+#
+# Error bound.  Hermite error grows with step^4 and peaks near mid-step.
+# Against direct SGP4 (benchmarks/bench_ephemeris.py, 200 satellites per
+# regime over 24 h) the worst position error at 120 s is about
+#   LEO 8 m, MEO/GEO 3 m, Molniya-type HEO 40 m (at perigee)
+# where the MEO/GEO figure is the float32 storage floor (7 significant digits
+# of a 42,000 km radius), not the interpolation.  At 60 s LEO drops to ~1 m
+# and HEO to ~5 m; at 300 s LEO is ~280 m.  At 120 s it is well inside the
+# 1 km ground-track simplification tolerance and close to the 4-decimal
+# (~11 m) point coordinates.  Every update checks ERROR_SAMPLE of the
+# propagated satellites at mid-step and records the worst in index.json as
+# max_error_km.
+#
+# The table pays off where it persists: the daemon, and repeated local runs
+# of update_ground_tracks.py / upload_satellites.py --ephemeris.  The
+# workflows don't cache it (nor pass --ephemeris): for the full catalog it is
+# ~490 MB of float32 that barely compresses, so restoring and re-saving it
+# every run would cost about what the ~17 s rebuild saves and would push the
+# GP cache entries out of the repository's Actions cache quota.
+
+
+# jd, fr arrays for start + offsets_s seconds, as time_grid builds them
+def julian_dates(start, offsets_s):
+    offsets_s = np.asarray(offsets_s, dtype=float)
+    second = start.second + start.microsecond / 1e6
+    jd, fr = jday(start.year, start.month, start.day, start.hour, start.minute, second)
+    return np.full(offsets_s.shape, jd), fr + offsets_s / 86400.0
+
+
+def teme_states(satrec_array, jd, fr):
+    # (n, T, 6) of r km, v km/s; samples SGP4 rejects are NaN
+    errors, r, v = satrec_array.sgp4(jd, fr)
+    states = np.concatenate((r, v), axis=2)
+    states[errors != 0] = np.nan
+    return states
+
+
+# Cubic Hermite on a uniform grid: p0/p1 the bracketing (..., 6) states, s the
+# fraction of the step (0..1), h the step in seconds.  Returns (..., 6) with
+# the interpolated position and its derivative (the velocity).
+def hermite(p0, p1, s, h):
+    s = s[..., None]
+    s2 = s * s
+    s3 = s2 * s
+    r0, v0 = p0[..., :3], p0[..., 3:] * h
+    r1, v1 = p1[..., :3], p1[..., 3:] * h
+    r = ((2 * s3 - 3 * s2 + 1) * r0 + (s3 - 2 * s2 + s) * v0
+         + (-2 * s3 + 3 * s2) * r1 + (s3 - s2) * v1)
+    v = ((6 * s2 - 6 * s) * r0 + (3 * s2 - 4 * s + 1) * v0
+         + (-6 * s2 + 6 * s) * r1 + (3 * s2 - 2 * s) * v1) / h
+    return np.concatenate((r, v), axis=-1)
+
+
+class Ephemeris:
+    def __init__(self, path=EPHEMERIS_PATH, step_s=STEP_SECONDS, window_hours=WINDOW_HOURS):
+        self.path = path
+        self.step_s = step_s
+        self.samples = int(window_hours * 3600 // step_s) + 1
+        self.start = None
+        self.norad_ids = []
+        self.lines = []
+        self.rows = {}
+        self.generation = 0
+        self.states = None
+        self.max_error_km = None
+        self.load()
+
+    def __len__(self):
+        return len(self.norad_ids)
+
+    def states_path(self, generation):
+        return os.path.join(self.path, f"states.{generation}.npy")
+
+    @property
+    def index_path(self):
+        return os.path.join(self.path, "index.json")
+
+    @property
+    def end(self):
+        return self.start + datetime.timedelta(seconds=(self.samples - 1) * self.step_s)
+
+    def load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            states = np.load(self.states_path(index["generation"]), mmap_mode="r")
+            if (index["step_s"] != self.step_s or states.shape != (len(index["norad_ids"]), self.samples, 6)):
+                raise ValueError("table does not match the configured window")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unusable ephemeris cache {self.path}: {e}")
+            return
+        self.start = datetime.datetime.strptime(index["start"], "%Y-%m-%dT%H:%M:%S")
+        self.norad_ids = index["norad_ids"]
+        self.lines = [tuple(lines) for lines in index["lines"]]
+        self.rows = {norad_id: row for row, norad_id in enumerate(self.norad_ids)}
+        self.generation = index["generation"]
+        self.max_error_km = index.get("max_error_km")
+        self.states = states
+
+    def save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "start": self.start.strftime("%Y-%m-%dT%H:%M:%S"),
+                "step_s": self.step_s,
+                "generation": self.generation,
+                "norad_ids": self.norad_ids,
+                "lines": self.lines,
+                "max_error_km": self.max_error_km,
+            }, f)
+        os.replace(tmp_path, self.index_path)
+
+    def covers(self, start, end):
+        return self.start is not None and self.start <= start and end <= self.end
+
+    # ------------------ Update ------------------
+    # Brings the table in line with tle_data so that [now, now + horizon_s] is
+    # covered.  Returns the number of satellites propagated.
+    def update(self, tle_data, now, horizon_s=3600, satrec_cache=None, report=None):
+        catalog = load_catalog(sorted(tle_data, key=norad_sort_key), verbose=False, satrec_cache=satrec_cache)
+        lines = list(catalog.lines)
+
+        start = self.start
+        if not self.covers(now, now + datetime.timedelta(seconds=horizon_s)):
+            start = now - datetime.timedelta(seconds=BACKFILL_SECONDS)
+            start = start.replace(microsecond=0) - datetime.timedelta(
+                seconds=(start.hour * 3600 + start.minute * 60 + start.second) % self.step_s)
+        rebuild = start != self.start
+
+        keep = {}
+        if not rebuild:
+            for i, norad_id in enumerate(catalog.norad_ids):
+                row = self.rows.get(norad_id)
+                if row is not None and self.lines[row] == lines[i]:
+                    keep[i] = row
+        stale = [i for i in range(len(catalog)) if i not in keep]
+        if not stale and catalog.norad_ids == self.norad_ids:
+            return 0
+
+        os.makedirs(self.path, exist_ok=True)
+        generation = self.generation + 1
+        table = np.lib.format.open_memmap(self.states_path(generation), mode="w+", dtype=np.float32,
+                                          shape=(len(catalog), self.samples, 6))
+        for i, row in keep.items():
+            table[i] = self.states[row]
+        jd, fr = julian_dates(start, np.arange(self.samples) * float(self.step_s))
+        for first in range(0, len(stale), FILL_CHUNK):
+            chunk = stale[first:first + FILL_CHUNK]
+            table[chunk] = teme_states(SatrecArray([catalog.satrecs[i] for i in chunk]), jd, fr)
+        table.flush()
+        del table
+
+        previous = self.generation
+        self.generation = generation
+        self.start = start
+        self.norad_ids = list(catalog.norad_ids)
+        self.lines = lines
+        self.rows = {norad_id: row for row, norad_id in enumerate(self.norad_ids)}
+        self.states = np.load(self.states_path(generation), mmap_mode="r")
+
+        sample = np.linspace(0, len(stale) - 1, min(ERROR_SAMPLE, len(stale))).astype(int)
+        if len(sample):
+            error_km = round(self.interpolation_error_km(catalog, [stale[k] for k in sample]), 6)
+            # Rows kept from the previous table keep their earlier measurement
+            self.max_error_km = error_km if rebuild or self.max_error_km is None else max(error_km, self.max_error_km)
+        self.save_index()
+        try:
+            os.remove(self.states_path(previous))
+        except OSError:
+            # Never written, or still mapped by another reader (Windows)
+            pass
+
+        print(f"Ephemeris: {len(stale)} of {len(catalog)} satellites propagated "
+              f"({'new window from ' + start.strftime('%Y-%m-%d %H:%M:%S') if rebuild else 'changed elements'}); "
+              f"worst interpolation error {self.max_error_km} km.")
+        if report is not None:
+            report.count("ephemeris_propagated", len(stale))
+            report.count("ephemeris_reused", len(keep))
+        return len(stale)
+
+    # Worst distance (km) between interpolated and directly propagated
+    # positions at the middle of every step, where Hermite error peaks
+    def interpolation_error_km(self, catalog, indexes):
+        offsets = (np.arange(self.samples - 1) + 0.5) * self.step_s
+        norad_ids = [catalog.norad_ids[i] for i in indexes]
+        interpolated, _ = self.states_at(norad_ids, self.start, offsets)
+        jd, fr = julian_dates(self.start, offsets)
+        direct = teme_states(SatrecArray([catalog.satrecs[i] for i in indexes]), jd, fr)
+        error = np.linalg.norm(interpolated[..., :3] - direct[..., :3], axis=2)
+        return float(np.nanmax(error)) if np.isfinite(error).any() else 0.0
+
+    # ------------------ Queries ------------------
+    # TEME states (n, T, 6) for norad_ids at start + offsets_s, and an (n,)
+    # mask of the satellites the table could answer for every time asked.
+    # With lines (the (line1, line2) per satellite), a row built from any other
+    # element set (the GP store has moved on since the last update) doesn't
+    # count as an answer.
+    def states_at(self, norad_ids, start, offsets_s, lines=None):
+        offsets_s = np.asarray(offsets_s, dtype=float)
+        states = np.full((len(norad_ids), len(offsets_s), 6), np.nan)
+        rows = np.array([self.rows.get(norad_id, -1) for norad_id in norad_ids], dtype=np.int64)
+        if lines is not None:
+            rows = np.array([row if row < 0 or self.lines[row] == tuple(lines[i]) else -1
+                             for i, row in enumerate(rows)], dtype=np.int64)
+        if self.start is None or not len(offsets_s):
+            return states, np.zeros(len(norad_ids), dtype=bool)
+
+        x = ((start - self.start).total_seconds() + offsets_s) / self.step_s
+        inside = bool(((x >= 0) & (x <= self.samples - 1)).all())
+        found = (rows >= 0) & inside
+        if found.any():
+            k = np.clip(np.floor(x).astype(np.int64), 0, self.samples - 2)
+            r = rows[found][:, None]
+            p0 = self.states[r, k[None, :]].astype(np.float64)
+            p1 = self.states[r, k[None, :] + 1].astype(np.float64)
+            states[found] = hermite(p0, p1, np.broadcast_to(x - k, p0.shape[:2]), float(self.step_s))
+        return states, found
+
+    # Drop-in for propagation.propagate_itrs: ITRS km (n, T, 3) for a catalog,
+    # interpolated where the table holds the satellite's current element set
+    # and SGP4 for the rest (new objects, elements newer than the table, or
+    # times outside the window).  t, jd, fr come from
+    # propagation.time_grid(ts, start, offsets_s).
+    def itrs(self, catalog, start, offsets_s, t, jd, fr):
+        states, found = self.states_at(catalog.norad_ids, start, offsets_s, catalog.lines)
+        r = np.empty((len(catalog), len(jd), 3))
+        if found.any():
+            r[found] = np.einsum("ijt,ntj->nti", teme_to_itrs_matrices(t), states[found, :, :3])
+        if not found.all():
+            missing = np.nonzero(~found)[0]
+            r[missing] = propagate_itrs(SatrecArray([catalog.satrecs[i] for i in missing]), t, jd, fr)
+        return r
+
+
+def main():
+    from gp_cache import GPStore, GP_CACHE_PATH
+
+    parser = argparse.ArgumentParser(description="Build or update the ephemeris table from the local GP store.")
+    parser.add_argument("--path", default=EPHEMERIS_PATH)
+    parser.add_argument("--gp-cache", default=GP_CACHE_PATH,
+                        help=f"local GP element store (default: {GP_CACHE_PATH})")
+    parser.add_argument("--step", type=int, default=STEP_SECONDS,
+                        help=f"seconds between stored samples (default: {STEP_SECONDS})")
+    args = parser.parse_args()
+
+    store = GPStore(args.gp_cache)
+    ephemeris = Ephemeris(args.path, step_s=args.step)
+    ephemeris.update(store.tle_data(), datetime.datetime.utcnow(), satrec_cache=store.satrec_cache)
+
+
+if __name__ == "__main__":
+    main()
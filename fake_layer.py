@@ -0,0 +1,121 @@
+import re
+import copy
+import json
+from types import SimpleNamespace
+
+# ------------------ In-memory FeatureLayer ------------------
+# Stand-in for arcgis.features.FeatureLayer covering the calls the scripts
+# make (query, edit_features, delete_features).  It keeps the features in a
+# dict keyed by OBJECTID and counts every call and every edit applied, so sync
+# and upload code can be exercised without ArcGIS Online.  Payload sizes are
+# the JSON the real REST call would carry: the request for edits and deletes,
+# the response for queries.  Queries understand "1=1" and "<field> IN (...)".
+
+
+class FakeFeatureLayer:
+    def __init__(self, features=None, object_id_field="OBJECTID"):
+        self.properties = SimpleNamespace(objectIdField=object_id_field)
+        self.object_id_field = object_id_field
+        self.features = {}
+        self.next_oid = 1
+        self.calls = {"query": 0, "edit_features": 0, "delete_features": 0}
+        self.edits = {"adds": 0, "updates": 0, "deletes": 0}
+        self.payload_bytes = {"query": 0, "edit_features": 0, "delete_features": 0}
+        # (call, items, bytes) per request, in order
+        self.log = []
+        # edit_features calls still to apply and then fail with a timeout, as
+        # if the response had been lost after the service committed the edits
+        self.lost_responses = 0
+        for feature in features or []:
+            self._add(feature)
+
+    def _add(self, feature):
+        oid = self.next_oid
+        self.next_oid += 1
+        feature = copy.deepcopy(feature)
+        feature.setdefault("attributes", {})[self.object_id_field] = oid
+        self.features[oid] = feature
+        return oid
+
+    def _record(self, call, items, payload):
+        size = len(json.dumps(payload, default=str))
+        self.payload_bytes[call] += size
+        self.log.append((call, items, size))
+
+    def matches(self, where):
+        if where.strip() == "1=1":
+            return lambda attributes: True
+        match = re.fullmatch(r"\s*(\w+)\s+IN\s*\((.*)\)\s*", where, re.IGNORECASE | re.DOTALL)
+        if not match:
+            raise ValueError(f"FakeFeatureLayer can't evaluate where={where!r}")
+        field = match.group(1)
+        values = {v[1:-1].replace("''", "'") if v.startswith("'") else v
+                  for v in re.findall(r"'(?:[^']|'')*'|[^,\s]+", match.group(2))}
+        return lambda attributes: str(attributes.get(field)) in values
+
+    def query(self, where="1=1", out_fields="*", return_geometry=True, **kwargs):
+        self.calls["query"] += 1
+        fields = None if out_fields == "*" else [f.strip() for f in out_fields.split(",")]
+        keep = self.matches(where)
+        rows = []
+        for feature in self.features.values():
+            attributes = feature["attributes"]
+            if not keep(attributes):
+                continue
+            if fields is not None:
+                attributes = {k: v for k, v in attributes.items() if k in fields}
+            rows.append(SimpleNamespace(
+                attributes=dict(attributes),
+                geometry=copy.deepcopy(feature.get("geometry")) if return_geometry else None,
+            ))
+        self._record("query", len(rows), [{"attributes": r.attributes, "geometry": r.geometry} for r in rows])
+        return SimpleNamespace(features=rows)
+
+    def edit_features(self, adds=None, updates=None, deletes=None, **kwargs):
+        self.calls["edit_features"] += 1
+        if isinstance(deletes, str):
+            deletes = [int(oid) for oid in deletes.split(",") if oid.strip()]
+        self._record("edit_features", len(adds or []) + len(updates or []) + len(deletes or []),
+                     {"adds": adds or [], "updates": updates or [], "deletes": deletes or []})
+        result = self._edit(adds, updates, deletes)
+        if self.lost_responses:
+            self.lost_responses -= 1
+            raise TimeoutError("edit_features: the read operation timed out")
+        return result
+
+    def _edit(self, adds, updates, deletes):
+        result = {"addResults": [], "updateResults": [], "deleteResults": []}
+
+        for feature in adds or []:
+            oid = self._add(feature)
+            self.edits["adds"] += 1
+            result["addResults"].append({"objectId": oid, "success": True})
+
+        for feature in updates or []:
+            oid = feature["attributes"].get(self.object_id_field)
+            if oid not in self.features:
+                result["updateResults"].append({"objectId": oid, "success": False})
+                continue
+            current = self.features[oid]
+            current["attributes"].update(copy.deepcopy(feature["attributes"]))
+            if feature.get("geometry") is not None:
+                current["geometry"] = copy.deepcopy(feature["geometry"])
+            self.edits["updates"] += 1
+            result["updateResults"].append({"objectId": oid, "success": True})
+
+        for oid in deletes or []:
+            success = self.features.pop(oid, None) is not None
+            self.edits["deletes"] += success
+            result["deleteResults"].append({"objectId": oid, "success": success})
+
+        return result
+
+    def delete_features(self, where=None, deletes=None, **kwargs):
+        self.calls["delete_features"] += 1
+        if where == "1=1":
+            deletes = list(self.features)
+        elif isinstance(deletes, str):
+            deletes = [int(oid) for oid in deletes.split(",") if oid.strip()]
+        self._record("delete_features", len(deletes or []), {"where": where, "deletes": deletes or []})
+        result = self._edit(None, None, deletes)
+        return {"deleteResults": result["deleteResults"]}
@@ -0,0 +1,95 @@
+import math
+import numpy as np
+import pandas as pd
+import shapely
+
+# ------------------ Config ------------------
+CHUNK_SIZE = 5000
+SPATIAL_REFERENCE = {"wkid": 4326}
+
+# Columnar GeoDataFrame -> ArcGIS JSON features.  Coordinates come out of GEOS in
+# bulk (one get_coordinates call per chunk) and attributes are converted a
+# column at a time, with NumPy scalars turned into Python values and NaN/NaT
+# into None so the result is plain JSON.  Output is yielded in chunks so a large
+# frame never has to exist twice in memory.
+
+
+def drop_join_artifacts(gdf):
+    # sjoin repeats a row once per matching polygon and adds index_right
+    gdf = gdf[~gdf.index.duplicated(keep="first")]
+    artifacts = [c for c in gdf.columns if c in ("index_right", "index_left")]
+    return gdf.drop(columns=artifacts) if artifacts else gdf
+
+
+def json_safe(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return int(value.timestamp() * 1000)
+    return value
+
+
+def column_values(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # The unit depends on how the column was built (pandas 3 parses to us,
+        # numpy datetimes can be s), so convert to ms before taking integers
+        ms = series.dt.as_unit("ms").astype("int64")
+        return [None if missing else int(v) for v, missing in zip(ms.tolist(), series.isna().tolist())]
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype=float)
+        out = values.astype(object)
+        out[np.isnan(values)] = None
+        return out.tolist()
+    if pd.api.types.is_integer_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return series.tolist()
+    return [json_safe(v) for v in series.tolist()]
+
+
+def point_geometries(geoms):
+    x = shapely.get_x(geoms).tolist()
+    y = shapely.get_y(geoms).tolist()
+    z = shapely.get_z(geoms)
+    z = np.where(np.isnan(z), None, z).tolist() if len(z) else []
+    return [{"x": xi, "y": yi, "z": zi, "spatialReference": SPATIAL_REFERENCE} for xi, yi, zi in zip(x, y, z)]
+
+
+def line_geometries(geoms):
+    parts, owners = shapely.get_parts(geoms, return_index=True)
+    coords, part_index = shapely.get_coordinates(parts, return_index=True)
+    ends = np.cumsum(np.bincount(part_index, minlength=len(parts))).tolist()
+    # (x, y) tuples, like geom.coords gives; zipping two flat lists is much
+    # cheaper than ndarray.tolist() building a small list per vertex
+    coords = list(zip(coords[:, 0].tolist(), coords[:, 1].tolist()))
+
+    paths = [[] for _ in range(len(geoms))]
+    start = 0
+    for owner, end in zip(owners.tolist(), ends):
+        paths[owner].append(coords[start:end])
+        start = end
+    return [{"paths": p, "spatialReference": SPATIAL_REFERENCE} for p in paths]
+
+
+def iter_features(gdf, is_point=True, chunk_size=CHUNK_SIZE):
+    gdf = drop_join_artifacts(gdf)
+    geometry_column = gdf.geometry.name
+    columns = [c for c in gdf.columns if c != geometry_column]
+
+    for start in range(0, len(gdf), chunk_size):
+        chunk = gdf.iloc[start:start + chunk_size]
+        geoms = np.asarray(chunk.geometry.values, dtype=object)
+        geometries = point_geometries(geoms) if is_point else line_geometries(geoms)
+        values = [column_values(chunk[c]) for c in columns]
+        rows = zip(*values) if values else [()] * len(chunk)
+        yield [{"geometry": geometry, "attributes": dict(zip(columns, row))}
+               for geometry, row in zip(geometries, rows)]
+
+
+def gdf_to_features(gdf, is_point=True, chunk_size=CHUNK_SIZE):
+    features = []
+    for chunk in iter_features(gdf, is_point, chunk_size):
+        features.extend(chunk)
+    return features
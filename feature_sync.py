@@ -0,0 +1,237 @@
+import os
+import json
+import hashlib
+from batch_uploader import upload
+
+# ------------------ Config ------------------
+SYNC_STATE_DIR = "sync_state"
+# Keys per query when looking up adds whose request failed
+RECONCILE_CHUNK = 500
+# Fields that change on every run without the feature itself changing
+IGNORE_FIELDS = ("last_update",)
+
+
+def state_path_for(layer_id):
+    return os.path.join(SYNC_STATE_DIR, f"{layer_id}.json")
+
+
+def sql_literal(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def feature_hash(feature, ignore_fields=IGNORE_FIELDS, object_id_field="OBJECTID"):
+    attributes = {k: v for k, v in (feature.get("attributes") or {}).items()
+                  if k not in ignore_fields and k != object_id_field}
+    payload = json.dumps({"geometry": feature.get("geometry"), "attributes": attributes},
+                         sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# ------------------ Differential layer sync ------------------
+# Replaces delete_features(where="1=1") + re-add.  Features are keyed by an id
+# field (norad_cat_id / satid); only new keys are added, keys whose content
+# hash differs from the last published state are updated in place, and keys
+# that disappeared are deleted, all through edit_features.
+#
+# The published key -> OBJECTID map always comes from the layer itself (a cheap
+# query without geometry); the state file only remembers the content hash
+# published for each OBJECTID, so a stale or missing file just means more
+# updates, never wrong edits.
+class LayerSync:
+    def __init__(self, layer, key_field, state_path=None, ignore_fields=IGNORE_FIELDS,
+                 **upload_options):
+        self.layer = layer
+        self.key_field = key_field
+        self.state_path = state_path
+        self.ignore_fields = ignore_fields
+        # Passed through to batch_uploader.upload (max_bytes, workers, retries, ...)
+        self.upload_options = upload_options
+        self.uploads = []
+        self.object_id_field = getattr(layer.properties, "objectIdField", None) or "OBJECTID"
+        self.published = {}
+        self.duplicates = []
+        self.seen = set()
+        self.totals = {}
+        self.loaded = False
+        # state_stamp() as this object last read or wrote the state file
+        self.stamp = None
+
+    def load_published(self):
+        hashes = {}
+        if self.state_path and os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    hashes = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable sync state {self.state_path}: {e}")
+        self.stamp = self.state_stamp()
+
+        rows = self.layer.query(where="1=1", out_fields=f"{self.object_id_field},{self.key_field}",
+                                return_geometry=False).features
+        self.published = {}
+        self.duplicates = []
+        for row in rows:
+            oid = row.attributes[self.object_id_field]
+            key = str(row.attributes.get(self.key_field))
+            if key in self.published:
+                self.duplicates.append(oid)
+                continue
+            self.published[key] = {"oid": oid, "hash": hashes.get(str(oid))}
+        self.loaded = True
+        self.begin(reload=False)
+        return self.published
+
+    # (mtime, size) of the state file, None when there is none
+    def state_stamp(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return None
+        stat = os.stat(self.state_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    # Starts a new pass over the features.  A long-running caller (daemon.py)
+    # passes reload=False to keep the key -> OBJECTID map it already has: apply()
+    # keeps it current for every add and delete made through this object.  If
+    # the state file has gone or was rewritten by someone else since, the layer
+    # was probably edited behind this object's back and the map is read again.
+    def begin(self, reload=True):
+        if reload or not self.loaded or self.state_stamp() != self.stamp:
+            self.load_published()
+            return
+        self.seen = set()
+        self.totals = {"added": 0, "updated": 0, "deleted": 0, "failed": 0, "unchanged": 0, "bytes_sent": 0}
+
+    def save_state(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        hashes = {str(entry["oid"]): entry["hash"] for entry in self.published.values() if entry["hash"]}
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(hashes, f)
+        os.replace(tmp_path, self.state_path)
+        self.stamp = self.state_stamp()
+
+    def plan(self, features):
+        adds, updates, add_keys, update_keys = [], [], [], []
+        for feature in features:
+            key = str(feature["attributes"].get(self.key_field))
+            if key in self.seen:
+                continue
+            self.seen.add(key)
+
+            digest = feature_hash(feature, self.ignore_fields, self.object_id_field)
+            attributes = {k: v for k, v in feature["attributes"].items() if k != self.object_id_field}
+            entry = self.published.get(key)
+            if entry is None:
+                adds.append({"geometry": feature.get("geometry"), "attributes": attributes})
+                add_keys.append((key, digest))
+            elif entry["hash"] != digest:
+                attributes[self.object_id_field] = entry["oid"]
+                updates.append({"geometry": feature.get("geometry"), "attributes": attributes})
+                update_keys.append((key, digest))
+        return adds, add_keys, updates, update_keys
+
+    # batch_uploader reconcile callback for adds: finds which of the given adds
+    # already exist on the layer (a request that failed after the service had
+    # applied it), by key, and returns their edit results by index
+    def added_on_layer(self, adds):
+        def reconcile(indices):
+            wanted = {}
+            for i in indices:
+                wanted.setdefault(str(adds[i]["attributes"].get(self.key_field)), i)
+            found = {}
+            values = sorted({adds[i]["attributes"].get(self.key_field) for i in indices}, key=str)
+            for k in range(0, len(values), RECONCILE_CHUNK):
+                chunk = values[k:k + RECONCILE_CHUNK]
+                where = f"{self.key_field} IN ({','.join(sql_literal(v) for v in chunk)})"
+                rows = self.layer.query(where=where, out_fields=f"{self.object_id_field},{self.key_field}",
+                                        return_geometry=False).features
+                for row in rows:
+                    i = wanted.get(str(row.attributes.get(self.key_field)))
+                    if i is not None and i not in found:
+                        found[i] = {"objectId": row.attributes[self.object_id_field], "success": True}
+            return found
+        return reconcile
+
+    def stale(self):
+        return [entry["oid"] for key, entry in self.published.items() if key not in self.seen] + self.duplicates
+
+    def apply(self, adds, add_keys, updates, update_keys, deletes):
+        counts = {"added": 0, "updated": 0, "deleted": 0, "failed": 0}
+        self.uploads = []
+
+        result = upload(self.layer, "deletes", deletes, **self.upload_options)
+        self.uploads.append(result)
+        counts["deleted"] = result.succeeded
+        counts["failed"] += len(result.failed)
+        deleted = set(deletes)
+        self.published = {k: v for k, v in self.published.items() if v["oid"] not in deleted}
+        self.duplicates = [oid for oid in self.duplicates if oid not in deleted]
+
+        result = upload(self.layer, "updates", updates, **self.upload_options)
+        self.uploads.append(result)
+        for r, (key, digest) in zip(result.results, update_keys):
+            self.published[key]["hash"] = digest if r and r.get("success") else None
+        counts["updated"] = result.succeeded
+        counts["failed"] += len(result.failed)
+
+        result = upload(self.layer, "adds", adds, reconcile=self.added_on_layer(adds), **self.upload_options)
+        self.uploads.append(result)
+        for r, (key, digest) in zip(result.results, add_keys):
+            if r and r.get("success"):
+                self.published[key] = {"oid": r.get("objectId"), "hash": digest}
+        counts["added"] = result.succeeded
+        counts["failed"] += len(result.failed)
+        counts["bytes_sent"] = sum(r.bytes_sent for r in self.uploads)
+
+        return counts
+
+    def sync(self, features, reload=True):
+        self.begin(reload)
+        adds, add_keys, updates, update_keys = self.plan(features)
+        deletes = self.stale()
+        unchanged = len(self.seen) - len(adds) - len(updates)
+        print(f"Sync plan: {len(adds)} adds, {len(updates)} updates, {len(deletes)} deletes, "
+              f"{unchanged} unchanged.")
+
+        counts = self.apply(adds, add_keys, updates, update_keys, deletes)
+        counts["unchanged"] = unchanged
+        self.save_state()
+        if counts["failed"]:
+            print(f"Sync finished with {counts['failed']} failed edits.")
+        return counts
+
+    # Streaming variant of sync(): load_published() once, push() each chunk of
+    # features as it is produced (adds and updates go out immediately), then
+    # finish() deletes whatever no chunk contained.  Only the published key map
+    # and the keys seen so far are kept between chunks.
+    def push(self, features):
+        seen_before = len(self.seen)
+        adds, add_keys, updates, update_keys = self.plan(features)
+        counts = self.apply(adds, add_keys, updates, update_keys, [])
+        counts["unchanged"] = len(self.seen) - seen_before - len(adds) - len(updates)
+        for k, v in counts.items():
+            self.totals[k] += v
+        return counts
+
+    # Deletes the given keys only, for partial passes that never see the rest
+    def remove(self, keys):
+        deletes = [self.published[str(key)]["oid"] for key in keys if str(key) in self.published]
+        counts = self.apply([], [], [], [], deletes)
+        for k, v in counts.items():
+            self.totals[k] += v
+        return counts
+
+    def finish(self):
+        counts = self.apply([], [], [], [], self.stale())
+        for k, v in counts.items():
+            self.totals[k] += v
+        self.save_state()
+        totals = self.totals
+        print(f"Sync: {totals['added']} added, {totals['updated']} updated, {totals['deleted']} deleted, "
+              f"{totals['unchanged']} unchanged.")
+        if totals["failed"]:
+            print(f"Sync finished with {totals['failed']} failed edits.")
+        return totals
@@ -0,0 +1,201 @@
+import os
+import json
+import codecs
+import datetime
+
+# ------------------ Config ------------------
+SPACETRACK_URL = "https://www.space-track.org"
+GP_CACHE_PATH = "gp_cache.json"
+FULL_QUERY = (
+    "/basicspacedata/query/"
+    "class/gp/DECAY_DATE/null-val/EPOCH/>now-1/OBJECT_TYPE/PAYLOAD/"
+    "orderby/NORAD_CAT_ID/format/json"
+)
+# Element sets are not published in EPOCH order (a new set for one satellite can
+# carry an older epoch than the newest set already stored for another), so the
+# incremental cursor is GP_ID, which Space-Track assigns in publication order.
+# The delta keeps decayed objects in the result so they can be dropped locally.
+DELTA_QUERY = (
+    "/basicspacedata/query/"
+    "class/gp/GP_ID/>{gp_id}/OBJECT_TYPE/PAYLOAD/"
+    "orderby/GP_ID/format/json"
+)
+# Same window as the full query's EPOCH/>now-1
+MAX_EPOCH_AGE = datetime.timedelta(days=1)
+# Responses are read and parsed in pieces of this size rather than as one string
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+# session: anything with requests.Session's get/post (an http_client.HttpClient
+# by default, tests/doubles.RecordedSession offline)
+def spacetrack_login(username, password, session=None):
+    if session is None:
+        from http_client import HttpClient, HTTP_CACHE_PATH
+
+        session = HttpClient(cache_path=HTTP_CACHE_PATH)
+    login_payload = {
+        "identity": username,
+        "password": password
+    }
+    response = session.post(SPACETRACK_URL + "/ajaxauth/login", data=login_payload)
+    # A bad password still comes back 200, with {"Login": "Failed"}
+    if not response.ok or '"Failed"' in response.text[:200]:
+        raise RuntimeError(f"Space-Track login failed: {response.status_code} - {response.text[:200]}")
+    return session
+
+
+# ------------------ Incremental JSON ------------------
+# Yields the elements of a top-level JSON array as the bytes arrive, so a full
+# catalog response never has to be held as one string plus one parsed list.
+# Only the element currently being decoded (and whatever is left of the last
+# chunk) is buffered.
+def iter_json_array(chunks):
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    started = False
+    for chunk in chunks:
+        buffer += text.decode(chunk) if isinstance(chunk, bytes) else chunk
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"Expected a JSON array, got {buffer[pos:pos + 40]!r}")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                element, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Element continues in the next chunk
+                break
+            yield element
+        buffer = buffer[pos:]
+    # The closing bracket returns above
+    raise ValueError("Truncated JSON array")
+
+
+# ------------------ GP element store ------------------
+# On-disk copy of the active-payload GP catalog, keyed by NORAD_CAT_ID, holding
+# the newest EPOCH seen for each object.
+class GPStore:
+    def __init__(self, path=GP_CACHE_PATH):
+        self.path = path
+        self.records = {}
+        self.max_gp_id = 0
+        self.changed = set()
+        self.dropped = set()
+        # Size of the last Space-Track response
+        self.received_bytes = 0
+        # NORAD id -> (line1, line2, Satrec), reused by propagation.load_catalog.
+        # In memory only (Satrecs don't pickle, and parsing a whole catalog
+        # takes a fraction of a second): it spares the re-parse between stages
+        # of one run and between cycles of daemon.py, not between cron runs.
+        self.satrec_cache = {}
+        self.load()
+
+    def __len__(self):
+        return len(self.records)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.records = {int(k): v for k, v in data["records"].items()}
+            self.max_gp_id = int(data.get("max_gp_id", 0))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable GP cache {self.path}: {e}")
+            self.records = {}
+            self.max_gp_id = 0
+            return
+        print(f"Loaded {len(self.records)} cached GP records (max GP_ID {self.max_gp_id}).")
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"max_gp_id": self.max_gp_id, "records": self.records}, f)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self, session, now=None, full=False):
+        now = now or datetime.datetime.utcnow()
+        if full or not self.records:
+            print("🛰 Fetching full GP catalog from Space-Track...")
+            query = FULL_QUERY
+        else:
+            print(f"🛰 Fetching GP updates since GP_ID {self.max_gp_id} from Space-Track...")
+            query = DELTA_QUERY.format(gp_id=self.max_gp_id)
+
+        # Only the delta query is conditional: a 304 there means nothing was
+        # published since the cursor, while a full query has nothing to fall back on
+        response = session.get(SPACETRACK_URL + query, stream=True, conditional=query != FULL_QUERY)
+        self.received_bytes = 0
+        if response.status_code == 304:
+            count = self.merge([], now)
+            self.save()
+            print(f"GP catalog not modified: {len(self.dropped)} dropped, {len(self.records)} cached.")
+            return count
+        if not response.ok:
+            raise RuntimeError(f"Space-Track query failed: {response.status_code} - {response.text}")
+
+        def chunks():
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_BYTES):
+                self.received_bytes += len(chunk)
+                yield chunk
+
+        if full:
+            self.records = {}
+        count = self.merge(iter_json_array(chunks()), now)
+        self.save()
+        print(f"Retrieved {count} GP records ({self.received_bytes} bytes): "
+              f"{len(self.changed)} changed, {len(self.dropped)} dropped, {len(self.records)} cached.")
+        return count
+
+    # rows can be any iterable (e.g. iter_json_array over a streamed response);
+    # it is consumed once.  Returns the number of rows read.
+    def merge(self, rows, now):
+        self.changed = set()
+        self.dropped = set()
+        count = 0
+        for row in rows:
+            count += 1
+            try:
+                norad_id = int(row["NORAD_CAT_ID"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.max_gp_id = max(self.max_gp_id, int(row.get("GP_ID") or 0))
+
+            if row.get("DECAY_DATE"):
+                if self.records.pop(norad_id, None) is not None:
+                    self.dropped.add(norad_id)
+                continue
+
+            current = self.records.get(norad_id)
+            if current is None or row.get("EPOCH", "") >= current.get("EPOCH", ""):
+                if current != row:
+                    self.records[norad_id] = row
+                    self.changed.add(norad_id)
+
+        cutoff = (now - MAX_EPOCH_AGE).strftime("%Y-%m-%dT%H:%M:%S")
+        for norad_id, row in list(self.records.items()):
+            if row.get("EPOCH", "") <= cutoff:
+                del self.records[norad_id]
+                self.dropped.add(norad_id)
+
+        self.changed -= self.dropped
+        for norad_id in self.dropped:
+            self.satrec_cache.pop(norad_id, None)
+        return count
+
+    def tle_data(self):
+        return [self.records[norad_id] for norad_id in sorted(self.records)]
+
@@ -0,0 +1,102 @@
+import numpy as np
+import shapely
+
+# ------------------ Config ------------------
+SIMPLIFY_TOLERANCE_KM = 1.0
+KM_PER_DEGREE = 111.195
+# Widest a degree of longitude gets (at the equator); a tolerance converted with
+# this never lets the simplified track stray more than the km tolerance.
+MAX_KM_PER_DEGREE = 111.32
+
+# Ground tracks are drawn as straight segments in lon/lat, so errors are
+# measured the same way: the distance from each propagated sample to the
+# simplified polyline in a local equirectangular frame.
+#
+# Every propagated sample goes into the simplification; nothing is thinned by
+# orbital period beforehand.  Douglas-Peucker keeps every input vertex within
+# the tolerance of the output, so vertices end up where the track curves: a
+# Molniya perigee pass keeps its samples while the slow apogee arc and GEO
+# collapse to a few.  (Thinning by mean motion first put a Molniya track
+# >100 km off and MEO ~2 km off at a 1 km tolerance.)
+
+
+# Break a track where it wraps from +180 to -180 (or back), adding the
+# interpolated crossing point to both sides, so no segment spans the map.
+def split_antimeridian(lon, lat):
+    jumps = np.nonzero(np.abs(np.diff(lon)) > 180.0)[0]
+    if not len(jumps):
+        return [np.column_stack((lon, lat))]
+
+    parts = []
+    start = 0
+    head = np.empty((0, 2))
+    for j in jumps:
+        edge = 180.0 if lon[j] > 0 else -180.0
+        f = (edge - lon[j]) / (lon[j + 1] + 2 * edge - lon[j])
+        lat_cross = lat[j] + f * (lat[j + 1] - lat[j])
+        parts.append(np.vstack((head, np.column_stack((lon[start:j + 1], lat[start:j + 1])), [[edge, lat_cross]])))
+        head = np.array([[-edge, lat_cross]])
+        start = j + 1
+    parts.append(np.vstack((head, np.column_stack((lon[start:], lat[start:])))))
+    return [p for p in parts if len(p) >= 2]
+
+
+def track_error_km(dense, parts):
+    # Worst distance (km) from the dense samples to the nearest simplified segment
+    segments = np.concatenate([np.stack((p[:-1], p[1:]), axis=1) for p in parts])
+    a = segments[None, :, 0, :]
+    b = segments[None, :, 1, :]
+    p = dense[:, None, :]
+    scale = np.stack((np.cos(np.radians(dense[:, 1])), np.ones(len(dense))), axis=1)[:, None, :] * KM_PER_DEGREE
+    ab = (b - a) * scale
+    ap = (p - a) * scale
+    denom = np.einsum("...i,...i", ab, ab)
+    t = np.clip(np.einsum("...i,...i", ap, ab) / np.where(denom > 0, denom, 1.0), 0.0, 1.0)
+    d = ap - t[..., None] * ab
+    return float(np.sqrt(np.einsum("...i,...i", d, d)).min(axis=1).max())
+
+
+def build_track_paths(lon, lat, tolerance_km=SIMPLIFY_TOLERANCE_KM, measure_error=False):
+    valid = np.isfinite(lon) & np.isfinite(lat)
+    tolerance_deg = tolerance_km / MAX_KM_PER_DEGREE
+
+    paths = [None] * len(lon)
+    dense_parts = {}
+    lines = []
+    owners = []
+    vertices_before = 0
+    for i in range(len(lon)):
+        keep = np.nonzero(valid[i])[0]
+        if len(keep) < 2:
+            continue
+        vertices_before += len(keep)
+        dense_parts[i] = np.column_stack((lon[i][keep], lat[i][keep]))
+
+        parts = split_antimeridian(lon[i][keep], lat[i][keep])
+        if not parts:
+            continue
+        lines.append(shapely.MultiLineString(parts) if len(parts) > 1 else shapely.LineString(parts[0]))
+        owners.append(i)
+
+    simplified = shapely.simplify(np.array(lines, dtype=object), tolerance_deg, preserve_topology=False) \
+        if lines else []
+
+    vertices_after = 0
+    max_error_km = 0.0
+    for i, geom in zip(owners, simplified):
+        parts = [np.asarray(g.coords) for g in getattr(geom, "geoms", [geom])]
+        parts = [p for p in parts if len(p) >= 2]
+        if not parts:
+            continue
+        paths[i] = [p.tolist() for p in parts]
+        vertices_after += sum(len(p) for p in parts)
+        if measure_error:
+            max_error_km = max(max_error_km, track_error_km(dense_parts[i], parts))
+
+    stats = {
+        "vertices_before": vertices_before,
+        "vertices_after": vertices_after,
+        "max_error_km": round(max_error_km, 3) if measure_error else None,
+        "tolerance_km": tolerance_km,
+    }
+    return paths, stats
@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import time
+import asyncio
+import threading
+import email.utils
+from collections import Counter
+
+# ------------------ Config ------------------
+# (connect, read) seconds; the read timeout is per chunk, not for the whole
+# response, so a large streamed GP catalog is fine
+TIMEOUT_S = (10, 120)
+RETRIES = 3
+BACKOFF_S = 2.0
+# Longest Retry-After honoured before giving up on the request
+MAX_RETRY_AFTER_S = 120
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_SIZE = 8
+HTTP_CACHE_PATH = "http_cache.json"
+# Most validators kept in cache_path; the least recently stored go first
+MAX_VALIDATORS = 32
+SECRET_PARAMS = ("apiKey", "password")
+
+# Shared HTTP layer for Space-Track and N2YO.  One requests.Session per client
+# keeps connections (and the Space-Track login cookie) alive across calls;
+# every request gets a timeout, and connection errors, timeouts and 429/5xx
+# answers are retried RETRIES times with exponential backoff (or the server's
+# Retry-After).  gzip is always accepted.
+#
+# Conditional requests: get(url, conditional=True) sends the ETag and
+# Last-Modified the last 200 for that URL came with, and a 304 answer means
+# the caller's copy is still current -- no body is transferred.  The
+# validators persist in cache_path so they survive between scheduled runs.
+# Only the MAX_VALIDATORS most recently stored are kept: URLs that embed a
+# cursor (Space-Track's GP_ID/>N delta) only repeat until the cursor moves,
+# after which their entry can never be hit again.
+#
+# Concurrency: get_async() runs a request on a worker thread (the session's
+# connection pool is thread-safe), and get_many() fetches a list of URLs at
+# once, at most POOL_SIZE in flight.
+#
+# Query-string secrets (N2YO's apiKey) are masked in everything this module
+# prints or stores; use redact() for anything else that logs a URL.
+
+
+def redact(url):
+    return re.sub(rf"\b({'|'.join(SECRET_PARAMS)})=[^&]*", r"\1=***", url)
+
+
+def retry_after_s(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class HttpClient:
+    def __init__(self, timeout=TIMEOUT_S, retries=RETRIES, backoff=BACKOFF_S, pool_size=POOL_SIZE,
+                 cache_path=None, sleep=time.sleep):
+        # Imported here so importing the scripts stays cheap
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self.transient_errors = (requests.ConnectionError, requests.Timeout)
+
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.sleep = sleep
+        self.cache_path = cache_path
+        # redacted URL -> {"etag": ..., "last_modified": ...}
+        self.validators = {}
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.load_validators()
+
+    # ------------------ Validators ------------------
+    def load_validators(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                self.validators = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable HTTP cache {self.cache_path}: {e}")
+            self.validators = {}
+        self.prune_validators()
+
+    # Entries are in the order they were stored; drops all but the newest
+    def prune_validators(self):
+        for key in list(self.validators)[:-MAX_VALIDATORS]:
+            del self.validators[key]
+
+    def save_validators(self):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self.lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.validators, f)
+            os.replace(tmp_path, self.cache_path)
+
+    def conditional_headers(self, key):
+        with self.lock:
+            saved = self.validators.get(key, {})
+        headers = {}
+        if saved.get("etag"):
+            headers["If-None-Match"] = saved["etag"]
+        if saved.get("last_modified"):
+            headers["If-Modified-Since"] = saved["last_modified"]
+        return headers
+
+    def remember(self, key, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        with self.lock:
+            previous = self.validators.pop(key, None)
+            if not etag and not last_modified:
+                if previous is None:
+                    return
+            else:
+                self.validators[key] = {"etag": etag, "last_modified": last_modified}
+                self.prune_validators()
+        self.save_validators()
+
+    # ------------------ Requests ------------------
+    def request(self, method, url, conditional=False, **kwargs):
+        key = redact(url)
+        kwargs.setdefault("timeout", self.timeout)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if conditional:
+            headers.update(self.conditional_headers(key))
+
+        for attempt in range(self.retries + 1):
+            self.stats["requests"] += 1
+            try:
+                response = self.session.request(method, url, headers=headers, **kwargs)
+            except self.transient_errors as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                reason = type(e).__name__
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    break
+                delay = retry_after_s(response)
+                if delay is None:
+                    delay = self.backoff * 2 ** attempt
+                elif delay > MAX_RETRY_AFTER_S:
+                    break
+                reason = str(response.status_code)
+                response.close()
+            self.stats["retries"] += 1
+            print(f"{method} {key} failed ({reason}); retry {attempt + 1}/{self.retries} in {delay:.1f}s")
+            self.sleep(delay)
+
+        if response.status_code == 304:
+            self.stats["not_modified"] += 1
+        elif conditional and response.ok:
+            self.remember(key, response)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request("POST", url, data=data, **kwargs)
+
+    async def request_async(self, method, url, **kwargs):
+        return await asyncio.to_thread(self.request, method, url, **kwargs)
+
+    async def get_async(self, url, **kwargs):
+        return await self.request_async("GET", url, **kwargs)
+
+    # Responses in the order of urls; the first exception is raised
+    def get_many(self, urls, **kwargs):
+        async def fetch_all():
+            limit = asyncio.Semaphore(self.pool_size)
+
+            async def fetch(url):
+                async with limit:
+                    return await self.get_async(url, **kwargs)
+
+            return await asyncio.gather(*(fetch(url) for url in urls))
+
+        return asyncio.run(fetch_all())
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
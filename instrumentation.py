@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import datetime
+import contextlib
+from collections import Counter
+
+# ------------------ Config ------------------
+REPORT_DIR = "run_reports"
+# Example details kept per skip reason; the rest are only counted
+SKIP_EXAMPLES = 5
+PROFILE_TOP = 25
+
+# Structured run report shared by the three scripts.  Stages are timed with
+# stage(), features are counted with count(), per-object skips are aggregated
+# by reason with skip() instead of printed one by one, and request/response
+# sizes go through add_bytes().  Used as a context manager, the report is
+# written as JSON when the run ends, including when it fails:
+#
+#   report = RunReport("update_ground_tracks", args.report)
+#   with report:
+#       with report.stage("fetch"):
+#           ...
+#
+# Peak memory is the process's resident-set high-water mark after each stage
+# (getrusage), which costs nothing to read; it is None where the resource
+# module doesn't exist (Windows).
+
+
+def default_report_path(script):
+    return os.path.join(REPORT_DIR, f"{script}.json")
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class RunReport:
+    def __init__(self, script, path=None, profile=False):
+        self.script = script
+        self.path = path if path is not None else default_report_path(script)
+        # Enables profile() blocks; off by default since cProfile slows the
+        # profiled code down considerably
+        self.profile_enabled = profile
+        self.started = datetime.datetime.utcnow()
+        self.start_time = time.perf_counter()
+        self.stages = {}
+        self.counters = Counter()
+        self.skips = Counter()
+        self.skip_examples = {}
+        self.bytes = Counter()
+        self.profiles = {}
+        self.status = "running"
+        self.error = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            seconds = time.perf_counter() - start
+            # A stage entered more than once (e.g. per chunk) accumulates
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] = round(entry["seconds"] + seconds, 4)
+            entry["calls"] += 1
+            entry["peak_rss_mb"] = peak_rss_mb()
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def skip(self, reason, detail=None):
+        self.skips[reason] += 1
+        if detail is not None:
+            examples = self.skip_examples.setdefault(reason, [])
+            if len(examples) < SKIP_EXAMPLES:
+                examples.append(detail)
+
+    def add_bytes(self, name, n):
+        self.bytes[name] += n
+
+    # counts: what LayerSync.sync()/finish() returns
+    def record_sync(self, layer, counts):
+        for key in ("added", "updated", "deleted", "unchanged", "failed"):
+            self.count(f"{layer}_{key}", counts.get(key, 0))
+        self.add_bytes(f"upload_{layer}", counts.get("bytes_sent", 0))
+
+    # Opt-in cProfile hook around a hot section (the propagation loop).  Only the
+    # calling process is profiled, so with --workers > 1 the SGP4 work done in
+    # the worker processes shows up as time spent waiting on the pool.
+    @contextlib.contextmanager
+    def profile(self, name):
+        if not self.profile_enabled:
+            yield None
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            stats = pstats.Stats(profiler)
+            prof_path = os.path.splitext(self.path)[0] + f".{name}.prof"
+            os.makedirs(os.path.dirname(prof_path) or ".", exist_ok=True)
+            stats.dump_stats(prof_path)
+            top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+            self.profiles[name] = {
+                "path": prof_path,
+                "top_cumulative": [{
+                    "function": f"{os.path.basename(filename)}:{line}({function})",
+                    "calls": calls,
+                    "total_s": round(total, 4),
+                    "cumulative_s": round(cumulative, 4),
+                } for (filename, line, function), (_, calls, total, cumulative, _) in top],
+            }
+
+    def as_dict(self):
+        return {
+            "script": self.script,
+            "started": self.started.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "seconds": round(time.perf_counter() - self.start_time, 4),
+            "status": self.status,
+            "error": self.error,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+            "counters": dict(self.counters),
+            "skips": {reason: {"count": n, "examples": self.skip_examples.get(reason, [])}
+                      for reason, n in self.skips.most_common()},
+            "bytes": dict(self.bytes),
+            "profiles": self.profiles,
+        }
+
+    def write(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+    def print_summary(self):
+        stages = ", ".join(f"{name} {entry['seconds']:.2f}s" for name, entry in self.stages.items())
+        print(f"Run {self.status} in {time.perf_counter() - self.start_time:.2f}s ({stages}); "
+              f"peak RSS {peak_rss_mb()} MB")
+        for reason, n in self.skips.most_common():
+            print(f"Skipped {n} satellite(s): {reason}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.status = "ok"
+        else:
+            self.status = "failed"
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.print_summary()
+        self.write()
+        if self.path:
+            print(f"Run report written to {self.path}")
+        return False
@@ -0,0 +1,73 @@
+import numpy as np
+from propagation import EARTH_RADIUS_KM, EARTH_E2, time_grid, propagate_itrs, itrs_to_geodetic
+
+# ------------------ Config ------------------
+# The fixed Little Rock site upload_satellites.py has always published
+LITTLE_ROCK = (34.7465, -92.2896, 102.0)  # lat, lng, alt (m)
+SEARCH_RADIUS = 90  # degrees from zenith, as in the N2YO "above" endpoint
+
+# Local replacement for the N2YO satellite/above call: one vectorized SGP4 pass
+# over the cached catalog at a single instant gives ITRS positions, and the
+# topocentric elevation of every satellite from every observer is one matrix
+# product, so extra observers cost almost nothing on top of the propagation.
+
+
+# observers: (m, 3) of lat deg, lng deg, alt m -> ECEF km and local "up" unit vectors
+def observer_frames(observers):
+    observers = np.atleast_2d(np.asarray(observers, dtype=float))
+    lat = np.radians(observers[:, 0])
+    lng = np.radians(observers[:, 1])
+    alt_km = observers[:, 2] / 1000.0
+
+    sin_lat = np.sin(lat)
+    n = EARTH_RADIUS_KM / np.sqrt(1.0 - EARTH_E2 * sin_lat * sin_lat)
+    position = np.column_stack((
+        (n + alt_km) * np.cos(lat) * np.cos(lng),
+        (n + alt_km) * np.cos(lat) * np.sin(lng),
+        (n * (1.0 - EARTH_E2) + alt_km) * sin_lat,
+    ))
+    up = np.column_stack((np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), sin_lat))
+    return position, up
+
+
+# r_itrs: (n, 3) km -> elevation in degrees, shape (m observers, n satellites)
+def elevations(r_itrs, observers):
+    position, up = observer_frames(observers)
+    rho = r_itrs[None, :, :] - position[:, None, :]
+    distance = np.linalg.norm(rho, axis=2)
+    sin_el = np.einsum("mnk,mk->mn", rho, up) / distance
+    return np.degrees(np.arcsin(np.clip(sin_el, -1.0, 1.0)))
+
+
+def satellites_above(catalog, records, when, ts, observers=(LITTLE_ROCK,), search_radius=SEARCH_RADIUS,
+                     ephemeris=None):
+    # Returns one list per observer of N2YO-style "above" entries.  records maps
+    # NORAD id -> GP record, for the designator and launch date.  With an
+    # ephemeris.Ephemeris the positions are interpolated from its table.
+    t, jd, fr = time_grid(ts, when, [0.0])
+    if ephemeris is not None:
+        r = ephemeris.itrs(catalog, when, [0.0], t, jd, fr)[:, 0, :]
+    else:
+        r = propagate_itrs(catalog.array(), t, jd, fr)[:, 0, :]
+    lng, lat, alt_km = itrs_to_geodetic(r)
+    el = elevations(r, observers)
+
+    min_elevation = 90.0 - search_radius
+    visible = (el >= min_elevation) & np.isfinite(el)
+    results = []
+    for row in visible:
+        above = []
+        for i in np.nonzero(row)[0]:
+            norad_id = catalog.norad_ids[i]
+            record = records.get(norad_id, {})
+            above.append({
+                "satid": norad_id,
+                "satname": catalog.names[i],
+                "intDesignator": record.get("OBJECT_ID"),
+                "launchDate": record.get("LAUNCH_DATE"),
+                "satlat": round(float(lat[i]), 4),
+                "satlng": round(float(lng[i]), 4),
+                "satalt": round(float(alt_km[i]), 4),
+            })
+        results.append(above)
+    return results
@@ -1,106 +1,164 @@
 import os
-import geopandas as gpd
-from shapely.geometry import shape
-from arcgis.gis import GIS
-from arcgis.geometry import Geometry
+import argparse
+import datetime
+import itertools
+import numpy as np
+import shapely
+from buffer_filter import load_buffer
+from country_index import load_country_index
+from feature_sync import LayerSync, state_path_for
+from gp_cache import GPStore
+from ground_tracks import build_track_paths
+from instrumentation import RunReport, default_report_path
+from propagation import propagate_catalog
+from update_ground_tracks import PREDICTION_MINUTES, TIME_STEP_SECONDS, CSV_PATH, fetch_tle_data
+from update_ground_tracks import POINT_LAYER_ID as TRACK_POINT_LAYER_ID, LINE_LAYER_ID as TRACK_LINE_LAYER_ID
 
 # ------------------ Configuration ------------------
 BUFFER_LAYER_ID = "e8efba18ddca4419bc3b349196c16894"  # Arkansas buffer
-POINT_LAYER_ID = "f11fc63900c548da89a4656d538b2e56"
-LINE_LAYER_ID = "7dba0da43d22406898692bd1748bbb8b"
 
 # ------------------ Environment Variables ------------------
 AGOL_USERNAME = os.getenv("AGOL_USERNAME")
 AGOL_PASSWORD = os.getenv("AGOL_PASSWORD")
-
-if not all([AGOL_USERNAME, AGOL_PASSWORD]):
-    raise EnvironmentError("AGOL credentials missing.")
-
-# ------------------ Authenticate ------------------
-print("Logging into ArcGIS Online...")
-gis = GIS("https://www.arcgis.com", AGOL_USERNAME, AGOL_PASSWORD)
-
-# ------------------ Load Buffer ------------------
-print("Loading buffer layer...")
-buffer_layer = gis.content.get(BUFFER_LAYER_ID).layers[0]
-buffer_features = buffer_layer.query(where="1=1", return_geometry=True).features
-buffer_shapes = [Geometry(f.geometry).as_shapely for f in buffer_features]
-buffer_gdf = gpd.GeoDataFrame(geometry=buffer_shapes, crs="EPSG:4326")
-print(f"Loaded {len(buffer_gdf)} buffer features.")
-
-# ------------------ Load Point Layer ------------------
-print("Loading all AGOL point features...")
-point_layer = gis.content.get(POINT_LAYER_ID).layers[0]
-point_features = point_layer.query(where="1=1", out_fields="*", return_geometry=True).features
-
-point_records = []
-for f in point_features:
-    try:
-        geom = shape(f.geometry)
-        point_records.append({**f.attributes, "geometry": geom})
-    except Exception as e:
-        print(f"Skipping point due to error: {e}")
-
-points_gdf = gpd.GeoDataFrame(point_records, geometry="geometry", crs="EPSG:4326")
-print(f"Loaded {len(points_gdf)} point features.")
-
-# ------------------ Load Line Layer ------------------
-print("Loading all AGOL line features...")
-line_layer = gis.content.get(LINE_LAYER_ID).layers[0]
-line_features = line_layer.query(where="1=1", out_fields="*", return_geometry=True).features
-
-line_records = []
-for f in line_features:
-    try:
-        geom = shape(f.geometry)
-        line_records.append({**f.attributes, "geometry": geom})
-    except Exception as e:
-        print(f"Skipping line due to error: {e}")
-
-lines_gdf = gpd.GeoDataFrame(line_records, geometry="geometry", crs="EPSG:4326")
-print(f"Loaded {len(lines_gdf)} line features.")
-
-# ------------------ Spatial Join ------------------
-print("🔍 Filtering intersecting features...")
-intersect_points = gpd.sjoin(points_gdf, buffer_gdf, predicate="intersects", how="inner")
-intersect_lines = gpd.sjoin(lines_gdf, buffer_gdf, predicate="intersects", how="inner")
-print(f"Found {len(intersect_points)} intersecting point(s)")
-print(f"Found {len(intersect_lines)} intersecting line(s)")
-
-# ------------------ Convert for AGOL Upload ------------------
-def gdf_to_features(gdf, is_point=True):
-    features = []
-    for _, row in gdf.iterrows():
-        geom = row.geometry
-        if is_point:
-            geometry = {
-                "x": geom.x,
-                "y": geom.y,
-                "z": getattr(geom, "z", None),
-                "spatialReference": {"wkid": 4326}
-            }
-        else:
-            geometry = {
-                "paths": [list(geom.coords)],
-                "spatialReference": {"wkid": 4326}
-            }
-
-        attributes = {k: v for k, v in row.items() if k != "geometry"}
-        features.append({"geometry": geometry, "attributes": attributes})
-    return features
-
-point_agol_features = gdf_to_features(intersect_points, is_point=True)
-line_agol_features = gdf_to_features(intersect_lines, is_point=False)
-
-# ------------------ Update AGOL Layers ------------------
-print(f"Updating AGOL: {len(point_agol_features)} point(s), {len(line_agol_features)} line(s)")
-
-point_layer.delete_features(where="1=1")
-if point_agol_features:
-    point_layer.edit_features(adds=point_agol_features)
-
-line_layer.delete_features(where="1=1")
-if line_agol_features:
-    line_layer.edit_features(adds=line_agol_features)
-
-print("Upload complete.")
+# Point and line layers for the buffer subset. They must not be the layers
+# update_ground_tracks.py publishes the full catalog to: both jobs delete what
+# they didn't publish, and the sync state (sync_state/<layer id>.json) is per
+# layer, so sharing a layer makes the two jobs undo each other every run.
+POINT_LAYER_ID = os.getenv("PHASE_TWO_POINT_LAYER_ID")
+LINE_LAYER_ID = os.getenv("PHASE_TWO_LINE_LAYER_ID")
+# Elements come from Space-Track through update_ground_tracks.fetch_tle_data
+SPACETRACK_USERNAME = os.getenv("SPACETRACK_USERNAME")
+SPACETRACK_PASSWORD = os.getenv("SPACETRACK_PASSWORD")
+
+
+# ------------------ Propagated Frames ------------------
+# Point and line GeoDataFrames built straight from the propagation arrays, with
+# the same attributes update_ground_tracks.py publishes.
+def catalog_frames(catalog, lon, lat, alt_km, paths, last_update, countries):
+    import geopandas as gpd
+
+    norad_ids = np.asarray(catalog.norad_ids, dtype=np.int64)
+    country_names = countries.lookup(norad_ids)
+
+    points = np.isfinite(lon[:, 0]) & np.isfinite(lat[:, 0])
+    points_gdf = gpd.GeoDataFrame({
+        "sat_name": np.asarray(catalog.names, dtype=object)[points],
+        "norad_cat_id": norad_ids[points],
+        "epoch": np.asarray(catalog.epochs, dtype=object)[points],
+        "altitude_km": np.round(alt_km[points, 0], 2),
+        "mean_motion": np.asarray(catalog.mean_motion)[points],
+        "inclination": np.asarray(catalog.inclination)[points],
+        "last_update": last_update,
+        "country": country_names[points],
+    }, geometry=gpd.points_from_xy(lon[points, 0], lat[points, 0], alt_km[points, 0] * 1000), crs="EPSG:4326")
+
+    lines = [i for i, path in enumerate(paths) if path]
+    lines_gdf = gpd.GeoDataFrame({
+        "sat_name": [catalog.names[i] for i in lines],
+        "norad_cat_id": norad_ids[lines],
+        "epoch": [catalog.epochs[i] for i in lines],
+        "last_update": last_update,
+        "duration_min": PREDICTION_MINUTES,
+        "country": country_names[lines],
+    }, geometry=[shapely.MultiLineString(paths[i]) if len(paths[i]) > 1 else shapely.LineString(paths[i][0])
+                 for i in lines], crs="EPSG:4326")
+    return points_gdf, lines_gdf
+
+
+def run(report):
+    if not all([AGOL_USERNAME, AGOL_PASSWORD, SPACETRACK_USERNAME, SPACETRACK_PASSWORD,
+                POINT_LAYER_ID, LINE_LAYER_ID]):
+        raise EnvironmentError("Missing required environment variables.")
+    shared = {POINT_LAYER_ID, LINE_LAYER_ID} & {TRACK_POINT_LAYER_ID, TRACK_LINE_LAYER_ID}
+    if shared or POINT_LAYER_ID == LINE_LAYER_ID:
+        raise EnvironmentError("PHASE_TWO_POINT_LAYER_ID and PHASE_TWO_LINE_LAYER_ID must be two layers of their own, "
+                               "not the update_ground_tracks.py layers.")
+
+    # ------------------ Authenticate ------------------
+    print("Logging into ArcGIS Online...")
+    with report.stage("agol_login"):
+        # Imported here: arcgis alone takes seconds to load
+        from arcgis.gis import GIS
+
+        gis = GIS("https://www.arcgis.com", AGOL_USERNAME, AGOL_PASSWORD)
+
+    # ------------------ Load Buffer ------------------
+    # Cached locally; re-downloaded only when the layer's last edit date changes
+    with report.stage("load_buffer"):
+        buffer_layer = gis.content.get(BUFFER_LAYER_ID).layers[0]
+        buffer = load_buffer(buffer_layer, BUFFER_LAYER_ID)
+
+    # ------------------ Propagate ------------------
+    # Filter freshly propagated positions instead of downloading the full
+    # point and line layers back from AGOL.
+    with report.stage("load_countries"):
+        countries = load_country_index(CSV_PATH)
+    now = datetime.datetime.utcnow()
+    with report.stage("fetch"):
+        store = GPStore()
+        tle_data = fetch_tle_data(store, now, report)
+    offsets = np.arange(0, PREDICTION_MINUTES * 60, TIME_STEP_SECONDS)
+    with report.stage("propagate"), report.profile("propagate"):
+        catalog, lon, lat, alt_km = propagate_catalog(tle_data, now, offsets, satrec_cache=store.satrec_cache,
+                                                      report=report)
+    report.count("satellites", len(catalog))
+    with report.stage("tracks"):
+        paths, _ = build_track_paths(lon, lat)
+    with report.stage("frames"):
+        points_gdf, lines_gdf = catalog_frames(catalog, lon, lat, alt_km, paths,
+                                               now.strftime("%Y-%m-%d %H:%M:%S"), countries)
+    print(f"Propagated {len(points_gdf)} point(s) and {len(lines_gdf)} line(s).")
+
+    # ------------------ Spatial Filter ------------------
+    print("🔍 Filtering intersecting features...")
+    with report.stage("filter"):
+        intersect_points = points_gdf[buffer.points_mask(points_gdf.geometry.x, points_gdf.geometry.y)]
+        # Tracks are clipped to the buffer: only the segments inside it are kept
+        clipped = buffer.clip_lines(lines_gdf.geometry.values)
+        intersect_lines = lines_gdf[shapely.is_geometry(clipped)].copy()
+        intersect_lines.geometry = list(clipped[shapely.is_geometry(clipped)])
+    print(f"Found {len(intersect_points)} intersecting point(s)")
+    print(f"Found {len(intersect_lines)} intersecting line(s)")
+    report.count("point_features", len(intersect_points))
+    report.count("line_features", len(intersect_lines))
+
+    # ------------------ Convert for AGOL Upload ------------------
+    from feature_serializer import iter_features
+
+    # Serialized chunk by chunk as the sync consumes them, so serialization
+    # time is part of the upload stages
+    point_agol_features = itertools.chain.from_iterable(iter_features(intersect_points, is_point=True))
+    line_agol_features = itertools.chain.from_iterable(iter_features(intersect_lines, is_point=False))
+
+    # ------------------ Update AGOL Layers ------------------
+    print(f"Updating AGOL: {len(intersect_points)} point(s), {len(intersect_lines)} line(s)")
+
+    point_layer = gis.content.get(POINT_LAYER_ID).layers[0]
+    line_layer = gis.content.get(LINE_LAYER_ID).layers[0]
+
+    # Differential sync: features outside the buffer are deleted, the rest are
+    # left alone unless they changed
+    with report.stage("upload_points"):
+        counts = LayerSync(point_layer, "norad_cat_id", state_path_for(POINT_LAYER_ID)).sync(point_agol_features)
+        report.record_sync("points", counts)
+    with report.stage("upload_lines"):
+        counts = LayerSync(line_layer, "norad_cat_id", state_path_for(LINE_LAYER_ID)).sync(line_agol_features)
+        report.record_sync("lines", counts)
+
+    print("Upload complete.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the satellites and ground tracks over the Arkansas buffer.")
+    parser.add_argument("--report", default=default_report_path("phase_two"),
+                        help="JSON run report path (default: %(default)s)")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile the propagation step and add the hot spots to the run report")
+    args = parser.parse_args()
+
+    with RunReport("phase_two", args.report, profile=args.profile) as report:
+        run(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import queue
+import threading
+import contextlib
+import collections
+from concurrent.futures import ProcessPoolExecutor
+from ground_tracks import build_track_paths, SIMPLIFY_TOLERANCE_KM
+from propagation import propagate_shard, merge_shards, build_features, report_skips
+
+# ------------------ Config ------------------
+CHUNK_SIZE = 500
+QUEUE_SIZE = 4
+
+# Streaming fetch -> propagate -> serialize -> upload.  The catalog is cut into
+# NORAD_CAT_ID-ordered chunks; each chunk is propagated, turned into point and
+# line features and handed to an uploader thread through a bounded queue, so
+# the first edits go out while later chunks are still being computed and the
+# producer blocks instead of running ahead when uploads are slow.
+#
+# Memory ceiling.  Per satellite, a chunk in flight holds the propagated
+# lon/lat/alt grid (3 x 120 steps x 8 bytes, ~3 KB) and then its point and
+# simplified line features (~20 KB as Python dicts/tuples for a LEO track).
+# At most workers + QUEUE_SIZE + 2 chunks exist at once (being propagated,
+# being built, waiting in the queue, being uploaded), plus the uploader's
+# serialized batches (MAX_BATCH_BYTES x its WORKERS), so with the defaults
+# (1 worker, 4 queued, 500 per chunk) the pipeline itself stays under roughly
+#   (1 + 4 + 2) x 500 x 23 KB + 4 x 1 MB ~= 85 MB
+# however large the catalog is.  What still grows with the catalog is small
+# and flat: the GP store (~1.5 KB of element-set strings per satellite, itself
+# filled from an incrementally parsed response) and each layer's key -> OBJECTID
+# map (~200 bytes per satellite).
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Propagates chunks in order.  With workers > 1 at most `workers` chunks are
+# submitted ahead of the one being consumed, so the pool can't buffer the
+# whole catalog.
+def propagated_chunks(chunks, start, offsets_s, workers=1, satrec_cache=None, ephemeris=None):
+    if workers <= 1 or ephemeris is not None:
+        for entries in chunks:
+            yield propagate_shard(entries, start, offsets_s, satrec_cache, ephemeris)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        for entries in chunks:
+            pending.append(pool.submit(propagate_shard, entries, start, offsets_s))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# (point_features, line_features) per chunk -- the same features
+# process_tle_data builds for the whole catalog, just in pieces.
+# With a run report, stage times accumulate over the chunks; "propagate" is
+# only the time spent waiting for the next chunk when workers > 1.
+# snapshot: a snapshot_store.RunWriter that gets every propagated chunk.
+def feature_chunks(tle_data, start, offsets_s, duration_min, countries, chunk_size=CHUNK_SIZE,
+                   workers=1, satrec_cache=None, track_tolerance_km=SIMPLIFY_TOLERANCE_KM, report=None,
+                   ephemeris=None, snapshot=None):
+    last_update_str = start.strftime("%Y-%m-%d %H:%M:%S")
+    stage = report.stage if report is not None else (lambda name: contextlib.nullcontext())
+    stats = {"satellites": 0, "vertices_before": 0, "vertices_after": 0}
+    results = propagated_chunks(chunked(tle_data, chunk_size), start, offsets_s, workers, satrec_cache, ephemeris)
+    while True:
+        with stage("propagate"):
+            result = next(results, None)
+        if result is None:
+            break
+        catalog, lon, lat, alt_km = merge_shards([result], len(offsets_s))
+        report_skips(catalog.skipped, report)
+        if snapshot is not None:
+            with stage("snapshot"):
+                snapshot.append(catalog, lon, lat, alt_km, start, offsets_s)
+        with stage("tracks"):
+            paths, track_stats = build_track_paths(lon, lat, tolerance_km=track_tolerance_km)
+        with stage("features"):
+            points, lines = build_features(catalog, lon, lat, alt_km, last_update_str, duration_min, countries,
+                                           paths=paths, report=report)
+        stats["satellites"] += len(catalog)
+        stats["vertices_before"] += track_stats["vertices_before"]
+        stats["vertices_after"] += track_stats["vertices_after"]
+        if report is not None:
+            report.count("satellites", len(catalog))
+            report.count("point_features", len(points))
+            report.count("line_features", len(lines))
+        yield points, lines
+    print(f"Processed {stats['satellites']} satellites; track vertices: "
+          f"{stats['vertices_before']} -> {stats['vertices_after']}")
+
+
+def run_pipeline(chunks, point_sync, line_sync, queue_size=QUEUE_SIZE):
+    point_sync.load_published()
+    line_sync.load_published()
+
+    pending = queue.Queue(maxsize=queue_size)
+    errors = []
+
+    def uploader():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            if errors:
+                # Keep draining so the producer never blocks on a dead consumer
+                continue
+            points, lines = item
+            try:
+                point_sync.push(points)
+                line_sync.push(lines)
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=uploader, name="uploader", daemon=True)
+    thread.start()
+    try:
+        for item in chunks:
+            pending.put(item)
+            if errors:
+                break
+    finally:
+        pending.put(None)
+        thread.join()
+    if errors:
+        raise errors[0]
+
+    # Deletes only once every chunk has been seen
+    return point_sync.finish(), line_sync.finish()
@@ -0,0 +1,311 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sgp4.api import Satrec, SatrecArray, jday
+from sgp4.conveniences import sat_epoch_datetime
+from skyfield.framelib import itrs
+from skyfield.sgp4lib import TEME
+from timescale import load_timescale
+
+# IERS2010 ellipsoid, the same one skyfield's deprecated subpoint() uses
+EARTH_RADIUS_KM = 6378.1366
+EARTH_E2 = (2.0 - 1.0 / 298.25642) / 298.25642
+
+# Vectorized SGP4 for the whole catalog.  Compared against the old per-satellite
+# EarthSatellite.at(t).subpoint() loop this agrees to better than 1e-6 degrees in
+# latitude/longitude and 1 m in altitude (see benchmarks/bench_propagation.py).
+
+
+class Catalog:
+    def __init__(self):
+        self.names = []
+        self.norad_ids = []
+        self.epochs = []
+        self.mean_motion = []
+        self.inclination = []
+        self.satrecs = []
+        # (line1, line2) each Satrec was parsed from
+        self.lines = []
+        self.skipped = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, entry, satrec_cache=None):
+        name = entry.get("OBJECT_NAME", "UNKNOWN")
+        line1 = entry.get("TLE_LINE1")
+        line2 = entry.get("TLE_LINE2")
+        if not line1 or not line2:
+            return False
+
+        norad_id = int(entry["NORAD_CAT_ID"])
+        # satrec_cache maps NORAD id -> (line1, line2, Satrec) so unchanged
+        # element sets are not re-parsed (see gp_cache.GPStore)
+        cached = satrec_cache.get(norad_id) if satrec_cache is not None else None
+        if cached and cached[0] == line1 and cached[1] == line2:
+            satrec = cached[2]
+        else:
+            satrec = Satrec.twoline2rv(line1, line2)
+            if satrec_cache is not None:
+                satrec_cache[norad_id] = (line1, line2, satrec)
+        epoch = sat_epoch_datetime(satrec).strftime("%Y-%m-%d %H:%M:%S")
+
+        self.names.append(name)
+        self.norad_ids.append(norad_id)
+        self.epochs.append(epoch)
+        self.mean_motion.append(satrec.no_kozai)
+        self.inclination.append(satrec.inclo)
+        self.satrecs.append(satrec)
+        self.lines.append((line1, line2))
+        return True
+
+    def array(self):
+        return SatrecArray(self.satrecs)
+
+
+# catalog.skipped holds (reason, message) pairs; message is None for entries
+# that were always dropped silently
+def load_catalog(tle_data, verbose=True, satrec_cache=None, report=None):
+    catalog = Catalog()
+    for entry in tle_data:
+        try:
+            if not catalog.add(entry, satrec_cache):
+                catalog.skipped.append(("missing TLE lines", None))
+        except Exception as e:
+            message = f"Skipping satellite {entry.get('OBJECT_NAME', 'UNKNOWN')}: {e}"
+            catalog.skipped.append((type(e).__name__, message))
+    if verbose:
+        report_skips(catalog.skipped, report)
+    return catalog
+
+
+# Per-satellite skips are aggregated in the run report (instrumentation.RunReport)
+# when there is one, otherwise printed one by one
+def report_skips(skipped, report=None):
+    for reason, message in skipped:
+        if report is not None:
+            report.skip(reason, message)
+        elif message:
+            print(message)
+
+
+# (skyfield Time, jd, fr) for start + offsets_s seconds, UTC
+def time_grid(ts, start, offsets_s):
+    offsets_s = np.asarray(offsets_s, dtype=float)
+    second = start.second + start.microsecond / 1e6
+    jd, fr = jday(start.year, start.month, start.day, start.hour, start.minute, second)
+    t = ts.utc(start.year, start.month, start.day, start.hour, start.minute, second + offsets_s)
+    return t, np.full(offsets_s.shape, jd), fr + offsets_s / 86400.0
+
+
+def teme_to_itrs_matrices(t):
+    # (3, 3, T) rotations: GCRS->ITRS composed with TEME->GCRS
+    return np.einsum("ikt,jkt->ijt", itrs.rotation_at(t), TEME.rotation_at(t))
+
+
+def itrs_to_geodetic(r):
+    x, y, z = r[..., 0], r[..., 1], r[..., 2]
+    R = np.hypot(x, y)
+    lat = np.arctan2(z, R)
+    for _ in range(3):
+        sin_lat = np.sin(lat)
+        e2_sin_lat = EARTH_E2 * sin_lat
+        aC = EARTH_RADIUS_KM / np.sqrt(1.0 - e2_sin_lat * sin_lat)
+        hyp = z + aC * e2_sin_lat
+        lat = np.arctan2(hyp, R)
+    lon = (np.arctan2(y, x) - np.pi) % (2 * np.pi) - np.pi
+    alt_km = np.sqrt(hyp * hyp + R * R) - aC
+    return np.degrees(lon), np.degrees(lat), alt_km
+
+
+# Inverse of itrs_to_geodetic: degrees and km back to ITRS km, shape (..., 3)
+def geodetic_to_itrs(lon, lat, alt_km):
+    lon, lat = np.radians(lon), np.radians(lat)
+    sin_lat = np.sin(lat)
+    n = EARTH_RADIUS_KM / np.sqrt(1.0 - EARTH_E2 * sin_lat * sin_lat)
+    return np.stack((
+        (n + alt_km) * np.cos(lat) * np.cos(lon),
+        (n + alt_km) * np.cos(lat) * np.sin(lon),
+        (n * (1.0 - EARTH_E2) + alt_km) * sin_lat,
+    ), axis=-1)
+
+
+# Every satellite at every time step in one call; ITRS km, shape (n, T, 3)
+def propagate_itrs(satrec_array, t, jd, fr):
+    errors, r, _ = satrec_array.sgp4(jd, fr)
+    r[errors != 0] = np.nan
+    return np.einsum("ijt,ntj->nti", teme_to_itrs_matrices(t), r)
+
+
+# lon, lat (degrees) and altitude (km), each shaped (n, T)
+def propagate_subpoints(satrec_array, t, jd, fr):
+    return itrs_to_geodetic(propagate_itrs(satrec_array, t, jd, fr))
+
+
+def country_names(catalog, countries):
+    # countries is a country_index.CountryIndex (one vectorized lookup for the
+    # whole catalog) or any plain {norad_id: country} mapping
+    if hasattr(countries, "lookup"):
+        return countries.lookup(catalog.norad_ids).tolist()
+    return [countries.get(norad_id, None) for norad_id in catalog.norad_ids]
+
+
+def point_feature(catalog, i, lon, lat, alt_km, last_update, country):
+    altitude_km = float(alt_km)
+    return {
+        "geometry": {
+            "x": float(lon),
+            "y": float(lat),
+            "z": altitude_km * 1000,
+            "spatialReference": {"wkid": 4326}
+        },
+        "attributes": {
+            "sat_name": catalog.names[i],
+            "norad_cat_id": catalog.norad_ids[i],
+            "epoch": catalog.epochs[i],
+            "altitude_km": round(altitude_km, 2),
+            "mean_motion": catalog.mean_motion[i],
+            "inclination": catalog.inclination[i],
+            "last_update": last_update,
+            "country": country
+        }
+    }
+
+
+# Points come from the first time step, lines from all of them (or from the
+# per-satellite multi-part paths made by ground_tracks.build_track_paths)
+def build_features(catalog, lon, lat, alt_km, last_update, duration_min, countries, paths=None, report=None):
+    point_features = []
+    line_features = []
+
+    valid = np.isfinite(lon) & np.isfinite(lat)
+    countries_by_index = country_names(catalog, countries)
+
+    for i, name in enumerate(catalog.names):
+        norad_id = catalog.norad_ids[i]
+        epoch = catalog.epochs[i]
+        country = countries_by_index[i]
+
+        if paths is not None:
+            track = paths[i]
+        else:
+            valid_coords = np.column_stack((lon[i][valid[i]], lat[i][valid[i]])).tolist()
+            track = [valid_coords] if len(valid_coords) >= 2 else None
+        if not track:
+            if report is not None:
+                report.skip("insufficient coordinates", f"{name} (NORAD {norad_id})")
+            else:
+                print(f"Skipping satellite {name} (NORAD {norad_id}) due to insufficient coordinates.")
+            continue
+
+        line_features.append({
+            "geometry": {"paths": track, "spatialReference": {"wkid": 4326}},
+            "attributes": {
+                "sat_name": name,
+                "norad_cat_id": norad_id,
+                "epoch": epoch,
+                "last_update": last_update,
+                "duration_min": duration_min,
+                "country": country
+            }
+        })
+
+        if not valid[i, 0]:
+            continue
+        point_features.append(point_feature(catalog, i, lon[i, 0], lat[i, 0], alt_km[i, 0], last_update, country))
+
+    return point_features, line_features
+
+
+# Current-position points only (lon, lat, alt_km shaped (n,) or (n, T), first
+# step used), for callers that refresh points without regenerating tracks
+def build_point_features(catalog, lon, lat, alt_km, last_update, countries, report=None):
+    if not len(catalog):
+        return []
+    lon, lat, alt_km = (np.asarray(a, dtype=float).reshape(len(catalog), -1)[:, 0] for a in (lon, lat, alt_km))
+    valid = np.isfinite(lon) & np.isfinite(lat)
+    countries_by_index = country_names(catalog, countries)
+    point_features = []
+    for i in range(len(catalog)):
+        if not valid[i]:
+            if report is not None:
+                report.skip("propagation error", f"{catalog.names[i]} (NORAD {catalog.norad_ids[i]})")
+            continue
+        point_features.append(point_feature(catalog, i, lon[i], lat[i], alt_km[i], last_update,
+                                            countries_by_index[i]))
+    return point_features
+
+
+# ------------------ Sharded propagation ------------------
+# Shards are contiguous NORAD_CAT_ID ranges.  Workers send back plain arrays
+# (plus the few strings needed for attributes) rather than feature dicts, and
+# the parent stitches them together in shard order, so a --workers N run prints
+# the same skip messages and builds the same features as a single-process run.
+
+
+def norad_sort_key(entry):
+    try:
+        return (0, int(entry["NORAD_CAT_ID"]))
+    except (KeyError, TypeError, ValueError):
+        return (1, 0)
+
+
+def make_shards(tle_data, count):
+    ordered = sorted(tle_data, key=norad_sort_key)
+    count = max(1, min(count, len(ordered)))
+    bounds = np.linspace(0, len(ordered), count + 1).astype(int)
+    return [ordered[bounds[i]:bounds[i + 1]] for i in range(count)]
+
+
+# ephemeris: an ephemeris.Ephemeris table to interpolate from instead of
+# running SGP4 (only in-process; the table is memory-mapped, not shipped to workers)
+def propagate_shard(entries, start, offsets_s, satrec_cache=None, ephemeris=None):
+    catalog = load_catalog(entries, verbose=False, satrec_cache=satrec_cache)
+    t, jd, fr = time_grid(load_timescale(), start, offsets_s)
+    if ephemeris is not None:
+        lon, lat, alt_km = itrs_to_geodetic(ephemeris.itrs(catalog, start, offsets_s, t, jd, fr))
+    else:
+        lon, lat, alt_km = propagate_subpoints(catalog.array(), t, jd, fr)
+    return {
+        "names": np.array(catalog.names, dtype=object),
+        "norad_ids": np.array(catalog.norad_ids, dtype=np.int64),
+        "epochs": np.array(catalog.epochs, dtype="U19"),
+        "mean_motion": np.array(catalog.mean_motion, dtype=np.float64),
+        "inclination": np.array(catalog.inclination, dtype=np.float64),
+        "lon": lon,
+        "lat": lat,
+        "alt_km": alt_km,
+        "skipped": catalog.skipped,
+    }
+
+
+def merge_shards(results, n_times):
+    catalog = Catalog()
+    for result in results:
+        catalog.names.extend(result["names"].tolist())
+        catalog.norad_ids.extend(result["norad_ids"].tolist())
+        catalog.epochs.extend(result["epochs"].tolist())
+        catalog.mean_motion.extend(result["mean_motion"].tolist())
+        catalog.inclination.extend(result["inclination"].tolist())
+        catalog.skipped.extend(result["skipped"])
+
+    def stack(key):
+        arrays = [r[key] for r in results if len(r[key])]
+        return np.concatenate(arrays) if arrays else np.empty((0, n_times))
+
+    return catalog, stack("lon"), stack("lat"), stack("alt_km")
+
+
+def propagate_catalog(tle_data, start, offsets_s, workers=1, satrec_cache=None, report=None, ephemeris=None):
+    offsets_s = np.asarray(offsets_s, dtype=float)
+    shards = make_shards(tle_data, workers)
+    if workers <= 1 or len(shards) <= 1 or ephemeris is not None:
+        results = [propagate_shard(shard, start, offsets_s, satrec_cache, ephemeris) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(propagate_shard, shards,
+                                    [start] * len(shards), [offsets_s] * len(shards)))
+
+    catalog, lon, lat, alt_km = merge_shards(results, len(offsets_s))
+    report_skips(catalog.skipped, report)
+    return catalog, lon, lat, alt_km
@@ -0,0 +1,309 @@
+import os
+import glob
+import json
+import time
+import argparse
+import datetime
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+
+# ------------------ Config ------------------
+SNAPSHOT_PATH = "snapshots"
+KINDS = ("points", "tracks")
+COMPRESSION = "zstd"
+# Rows are sorted by NORAD id inside a file, so row groups this size let a
+# single-satellite query skip most of a file on the row-group statistics
+ROW_GROUP_ROWS = 128 * 1024
+# A day partition with more files than this is compacted after a run
+COMPACT_MAX_FILES = 24
+# Leftover .tmp files and compaction journals belong to the process whose id is
+# in their name; they are cleared once it is gone, or after this long
+STALE_AFTER_S = 6 * 3600
+
+# History of every run, as Parquet (zstd) under snapshots/:
+#   points/date=YYYY-MM-DD/run-<run time>.parquet   position at the run time
+#   tracks/date=YYYY-MM-DD/run-<run time>.parquet   every propagated sample
+# with columns norad_id (int32), run_time and time (timestamp[s], UTC like
+# the rest of the scripts), lon, lat (float32 degrees) and alt_km (float32).
+# The date partition is the date of each sample's time, so a run that crosses
+# midnight writes into both days.
+#
+# Queries (query(), or `python snapshot_store.py query`) prune day partitions
+# from the time range first, then row groups on the norad_id / time / lon /
+# lat statistics, read only the columns asked for, and read the files
+# memory-mapped.  An optional shapely area (e.g. a state outline) is applied
+# after the bounding-box filter.
+#
+# Files are written as hidden .tmp files and renamed into place, so a reader
+# never sees a half-written run.  Compaction merges a day's files into one,
+# sorted by NORAD id and time; it records what it is replacing in a hidden
+# _compacting-*.json first, so one interrupted between the rename and the
+# deletes is finished (not duplicated) later.  Opening the store clears up
+# after writers and compactions that died: their .tmp files and journals carry
+# the process id, and only those of processes that are no longer running (or
+# older than STALE_AFTER_S) are touched, so another run, a CLI query or a
+# compaction can open the store while an update is still writing.
+
+SCHEMA = pa.schema([
+    ("norad_id", pa.int32()),
+    ("run_time", pa.timestamp("s")),
+    ("time", pa.timestamp("s")),
+    ("lon", pa.float32()),
+    ("lat", pa.float32()),
+    ("alt_km", pa.float32()),
+])
+
+
+def run_stamp(run_time):
+    return run_time.strftime("%Y%m%dT%H%M%S")
+
+
+def process_running(pid):
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # os.kill would terminate the process there; leave it to the age limit
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# .run-<stamp>.<pid>.tmp, .compacted-<stamp>.<pid>.tmp, _compacting-<stamp>.<pid>.json:
+# left behind by a process that is gone (or too long ago to still be working)
+def abandoned(path, now=None):
+    try:
+        age = (now or time.time()) - os.path.getmtime(path)
+    except FileNotFoundError:
+        return False
+    if age > STALE_AFTER_S:
+        return True
+    pid = os.path.basename(path).rsplit(".", 2)[-2]
+    return pid.isdigit() and not process_running(int(pid))
+
+
+class RunWriter:
+    def __init__(self, store, run_time):
+        self.store = store
+        self.run_time = run_time.replace(microsecond=0)
+        # (kind, date) -> (ParquetWriter, tmp path, final path)
+        self.writers = {}
+        self.rows = 0
+
+    def writer(self, kind, date):
+        key = (kind, date)
+        if key not in self.writers:
+            folder = os.path.join(self.store.path, kind, f"date={date}")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"run-{run_stamp(self.run_time)}.parquet")
+            tmp_path = os.path.join(folder, f".run-{run_stamp(self.run_time)}.{os.getpid()}.tmp")
+            self.writers[key] = (pq.ParquetWriter(tmp_path, SCHEMA, compression=COMPRESSION), tmp_path, path)
+        return self.writers[key][0]
+
+    def write(self, kind, norad_ids, times, lon, lat, alt_km):
+        order = np.lexsort((times, norad_ids))
+        norad_ids, times = norad_ids[order], times[order]
+        columns = {"norad_id": norad_ids, "time": times, "lon": lon[order], "lat": lat[order], "alt_km": alt_km[order]}
+        dates = times.astype("datetime64[D]")
+        for date in np.unique(dates):
+            selected = dates == date
+            table = pa.table({
+                "norad_id": pa.array(columns["norad_id"][selected], pa.int32()),
+                "run_time": pa.array(np.full(selected.sum(), np.datetime64(self.run_time, "s")), pa.timestamp("s")),
+                "time": pa.array(columns["time"][selected], pa.timestamp("s")),
+                "lon": pa.array(columns["lon"][selected], pa.float32()),
+                "lat": pa.array(columns["lat"][selected], pa.float32()),
+                "alt_km": pa.array(columns["alt_km"][selected], pa.float32()),
+            }, schema=SCHEMA)
+            self.writer(kind, str(date)).write_table(table, row_group_size=ROW_GROUP_ROWS)
+            self.rows += len(table)
+
+    # One propagated chunk (or the whole catalog): (satellites, samples)
+    # lon/lat/alt at start + offsets_s.  NaN samples (SGP4 errors) are left out.
+    def append(self, catalog, lon, lat, alt_km, start, offsets_s):
+        if not len(catalog):
+            return
+        norad_ids = np.asarray(catalog.norad_ids, dtype=np.int32)
+        times = np.datetime64(start.replace(microsecond=0), "s") + np.asarray(offsets_s).astype("timedelta64[s]")
+        valid = np.isfinite(lon) & np.isfinite(lat)
+        rows, cols = np.nonzero(valid)
+        self.write("tracks", norad_ids[rows], times[cols], lon[valid], lat[valid], alt_km[valid])
+        now = valid[:, 0]
+        self.write("points", norad_ids[now], np.full(now.sum(), times[0]),
+                   lon[now, 0], lat[now, 0], alt_km[now, 0])
+
+    def close(self):
+        written = 0
+        for writer, tmp_path, path in self.writers.values():
+            writer.close()
+            os.replace(tmp_path, path)
+            written += os.path.getsize(path)
+        self.writers = {}
+        return written
+
+
+class SnapshotStore:
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self.filesystem = pyarrow.fs.LocalFileSystem(use_mmap=True)
+        self.recover()
+
+    def writer(self, run_time):
+        return RunWriter(self, run_time)
+
+    def partitions(self, kind):
+        return sorted(glob.glob(os.path.join(self.path, kind, "date=*")))
+
+    # ------------------ Queries ------------------
+    # pyarrow Table of the rows with start <= time < end (naive UTC
+    # datetimes, either may be None), optionally only for some NORAD ids,
+    # inside bbox (min_lon, min_lat, max_lon, max_lat; min_lon > max_lon
+    # crosses the antimeridian) and/or a shapely area in lon/lat
+    def query(self, kind="tracks", start=None, end=None, norad_ids=None, bbox=None, area=None, columns=None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown snapshot kind {kind!r}; expected one of {KINDS}")
+        if area is not None:
+            bbox = area.bounds if bbox is None else bbox
+        names = list(columns or SCHEMA.names)
+        folder = os.path.join(self.path, kind)
+        if not os.path.isdir(folder):
+            return SCHEMA.empty_table().select(names)
+        partitioning = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+        dataset = ds.dataset(folder, schema=SCHEMA.append(pa.field("date", pa.string())), format="parquet",
+                             partitioning=partitioning, filesystem=self.filesystem)
+
+        conditions = []
+        if start is not None:
+            conditions += [ds.field("date") >= start.date().isoformat(),
+                           ds.field("time") >= pa.scalar(start, pa.timestamp("s"))]
+        if end is not None:
+            conditions += [ds.field("date") <= end.date().isoformat(),
+                           ds.field("time") < pa.scalar(end, pa.timestamp("s"))]
+        if norad_ids is not None:
+            ids = sorted(int(n) for n in norad_ids)
+            conditions.append(ds.field("norad_id").isin(pa.array(ids, pa.int32())))
+            if ids:
+                conditions += [ds.field("norad_id") >= ids[0], ds.field("norad_id") <= ids[-1]]
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            conditions += [ds.field("lat") >= min_lat, ds.field("lat") <= max_lat]
+            if min_lon <= max_lon:
+                conditions += [ds.field("lon") >= min_lon, ds.field("lon") <= max_lon]
+            else:
+                conditions.append((ds.field("lon") >= min_lon) | (ds.field("lon") <= max_lon))
+
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        read = names + [c for c in ("lon", "lat") if area is not None and c not in names]
+        table = dataset.to_table(columns=read, filter=expression)
+
+        if area is not None and len(table):
+            # Imported here: only area queries need it
+            import shapely
+
+            inside = shapely.contains_xy(area, table["lon"].to_numpy(), table["lat"].to_numpy())
+            table = table.filter(pa.array(inside)).select(names)
+        return table
+
+    # ------------------ Compaction ------------------
+    def files(self, partition):
+        return sorted(glob.glob(os.path.join(partition, "*.parquet")))
+
+    # Merges every day partition with more than max_files files (all of them
+    # with max_files=1) into one file; returns how many files were replaced
+    def compact(self, kinds=KINDS, max_files=COMPACT_MAX_FILES):
+        replaced = 0
+        for kind in kinds:
+            for partition in self.partitions(kind):
+                sources = self.files(partition)
+                if len(sources) <= max(1, max_files):
+                    continue
+                table = pq.read_table(sources, schema=SCHEMA, memory_map=True)
+                table = table.sort_by([("norad_id", "ascending"), ("time", "ascending")])
+                stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+                path = os.path.join(partition, f"compacted-{stamp}.parquet")
+                tmp_path = os.path.join(partition, f".compacted-{stamp}.{os.getpid()}.tmp")
+                pq.write_table(table, tmp_path, compression=COMPRESSION, row_group_size=ROW_GROUP_ROWS)
+                journal = os.path.join(partition, f"_compacting-{stamp}.{os.getpid()}.json")
+                with open(journal, "w", encoding="utf-8") as f:
+                    json.dump({"target": os.path.basename(path), "sources": [os.path.basename(s) for s in sources]}, f)
+                os.replace(tmp_path, path)
+                self.finish_compaction(partition, journal)
+                replaced += len(sources)
+                print(f"Compacted {len(sources)} files ({len(table)} rows) in {kind}/{os.path.basename(partition)}")
+        return replaced
+
+    def finish_compaction(self, partition, journal):
+        with open(journal, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        # Only once the merged file is in place are the sources redundant
+        if os.path.exists(os.path.join(partition, entry["target"])):
+            for name in entry["sources"]:
+                source = os.path.join(partition, name)
+                if os.path.exists(source):
+                    os.remove(source)
+        os.remove(journal)
+
+    def recover(self):
+        now = time.time()
+        for journal in glob.glob(os.path.join(self.path, "*", "date=*", "_compacting-*.json")):
+            if not abandoned(journal, now):
+                continue
+            print(f"Finishing interrupted compaction {journal}")
+            try:
+                self.finish_compaction(os.path.dirname(journal), journal)
+            except FileNotFoundError:
+                # Another process opening the store got there first
+                pass
+        for tmp_path in glob.glob(os.path.join(self.path, "*", "date=*", ".*.tmp")):
+            if abandoned(tmp_path, now):
+                try:
+                    os.remove(tmp_path)
+                except FileNotFoundError:
+                    pass
+
+
+def parse_time(value):
+    return datetime.datetime.fromisoformat(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or compact the run snapshot store.")
+    parser.add_argument("--path", default=SNAPSHOT_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact = commands.add_parser("compact", help="merge each day's run files into one")
+    compact.add_argument("--max-files", type=int, default=1,
+                         help="only compact days with more files than this (default: 1)")
+
+    query = commands.add_parser("query", help="print matching rows as CSV")
+    query.add_argument("--kind", choices=KINDS, default="tracks")
+    query.add_argument("--since", type=parse_time, help="UTC, e.g. 2025-06-01T00:00")
+    query.add_argument("--until", type=parse_time, help="UTC, exclusive")
+    query.add_argument("--days", type=float, help="the last N days (instead of --since)")
+    query.add_argument("--norad", type=int, action="append", help="NORAD id (repeatable)")
+    query.add_argument("--bbox", type=float, nargs=4, metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"))
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.path)
+    if args.command == "compact":
+        print(f"Replaced {store.compact(max_files=args.max_files)} files.")
+        return
+
+    since = args.since
+    if args.days is not None:
+        since = datetime.datetime.utcnow() - datetime.timedelta(days=args.days)
+    table = store.query(args.kind, since, args.until, norad_ids=args.norad, bbox=args.bbox)
+    print(table.to_pandas().to_csv(index=False), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import json
+import datetime
+
+# Stand-ins for the network the scripts talk to and for daemon.py's clock, so
+# they run offline in the tests and in benchmarks/.  The ArcGIS layer
+# stand-in is fake_layer.py.
+
+
+# ------------------ Offline replay ------------------
+# requests.Session stand-in that answers from a recorded-response fixture, e.g.
+# fixtures/spacetrack_gp.json:
+#   {"responses": [{"match": "<substring of the URL>", "status": 200, "body": [...]}]}
+class RecordedResponse:
+    def __init__(self, body, status_code=200):
+        self.text = body if isinstance(body, str) else json.dumps(body)
+        self.content = self.text.encode("utf-8")
+        self.status_code = status_code
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class RecordedSession:
+    def __init__(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            self.responses = json.load(f)["responses"]
+        self.requests = []
+
+    def post(self, url, data=None, **kwargs):
+        self.requests.append(("POST", url))
+        return RecordedResponse("", 200)
+
+    def get(self, url, **kwargs):
+        self.requests.append(("GET", url))
+        for recorded in self.responses:
+            if recorded["match"] in url:
+                return RecordedResponse(recorded["body"], recorded.get("status", 200))
+        return RecordedResponse(f"No recorded response for {url}", 404)
+
+
+# ------------------ Clock ------------------
+# daemon.SystemClock stand-in: sleeping only moves the time forward
+class FakeClock:
+    def __init__(self, start):
+        self.current = start
+        self.slept = []
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.current += datetime.timedelta(seconds=seconds)
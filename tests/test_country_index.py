@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import country_index  # noqa: E402
+from country_index import index_is_current, index_paths, load_country_index  # noqa: E402
+
+# country_index: sat_names.csv compiled into sat_names.idx.npy/.json, rebuilt
+# when the CSV changes, never touching the CSV itself.
+
+ROWS = [(25544, "ISS"), (20580, "United States"), (44713, "Côte d'Ivoire"), (25544, "Russia")]
+
+
+def write_csv(path, rows=ROWS, encoding="utf-8"):
+    text = "satid,country\n" + "".join(f"{satid},{country}\n" for satid, country in rows)
+    with open(path, "wb") as f:
+        f.write(text.encode(encoding))
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = str(tmp_path / "sat_names.csv")
+    write_csv(path)
+    return path
+
+
+def test_lookup(csv_path):
+    index = load_country_index(csv_path)
+    assert len(index) == 3
+    # The last row for a satid wins, unknown ids come back as None
+    assert index.lookup([25544, 20580, 44713, 1]).tolist() == ["Russia", "United States", "Côte d'Ivoire", None]
+    assert index.get(1, "") == ""
+
+
+def test_cp1252_csv_is_left_alone(tmp_path):
+    path = str(tmp_path / "sat_names.csv")
+    write_csv(path, encoding="cp1252")
+    with open(path, "rb") as f:
+        before = f.read()
+
+    assert load_country_index(path).get(44713) == "Côte d'Ivoire"
+    with open(path, "rb") as f:
+        assert f.read() == before
+    # Nothing was rewritten, so the index stays current
+    assert index_is_current(path)
+
+
+def test_changed_csv_rebuilds(csv_path):
+    load_country_index(csv_path)
+    write_csv(csv_path, ROWS + [(48274, "China")])
+    assert not index_is_current(csv_path)
+    assert load_country_index(csv_path).get(48274) == "China"
+
+
+def test_new_mtime_same_content_is_current(csv_path):
+    load_country_index(csv_path)
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert index_is_current(csv_path)
+    with open(index_paths(csv_path)[1], "r", encoding="utf-8") as f:
+        assert json.load(f)["source_mtime_ns"] == stat.st_mtime_ns + 10**9
+
+
+def test_interrupted_compile_is_redone(csv_path, monkeypatch):
+    load_country_index(csv_path)
+    npy_path, meta_path = index_paths(csv_path)
+    write_csv(csv_path, ROWS + [(48274, "China")])
+
+    # Dies after the .npy is in place, before the metadata is
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if dst == meta_path:
+            raise KeyboardInterrupt
+        real_replace(src, dst)
+
+    monkeypatch.setattr(country_index.os, "replace", replace)
+    with pytest.raises(KeyboardInterrupt):
+        load_country_index(csv_path)
+    monkeypatch.setattr(country_index.os, "replace", real_replace)
+
+    # The old metadata doesn't match the new CSV, so the index is compiled again
+    assert len(np.load(npy_path)) == 4
+    assert not index_is_current(csv_path)
+    assert load_country_index(csv_path).get(48274) == "China"
@@ -0,0 +1,198 @@
+import datetime
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from daemon import Daemon  # noqa: E402
+from doubles import FakeClock, RecordedSession  # noqa: E402
+from fake_layer import FakeFeatureLayer  # noqa: E402
+from feature_sync import LayerSync  # noqa: E402
+from gp_cache import GPStore  # noqa: E402
+from synthetic import synthetic_gp  # noqa: E402
+
+# daemon.Daemon on a FakeClock: which jobs run when, the retry backoff until
+# the first catalog loads, and track updates limited to the satellites whose
+# elements changed.  Space-Track is a RecordedSession, the layers are
+# FakeFeatureLayers.
+
+EPOCH = datetime.datetime(2025, 6, 1, 12, 0)
+START = datetime.datetime(2025, 6, 1, 12, 30)
+SATELLITES = 12
+NO_WAIT = {"workers": 1, "backoff": 0.0}
+
+
+# Records (job, time) for every job run
+class RecordingDaemon(Daemon):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ran = []
+
+    def run_job(self, name, job, now):
+        self.ran.append((name, now))
+        return super().run_job(name, job, now)
+
+    def times(self, name):
+        return [(now - START).total_seconds() for job, now in self.ran if job == name]
+
+
+# Keeps timescale_cache.npz and the sync state out of the working tree
+@pytest.fixture(autouse=True)
+def in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+# The full query answers the synthetic catalog, the delta query whatever the
+# test puts in responses[0]
+@pytest.fixture
+def session(tmp_path):
+    path = str(tmp_path / "gp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"responses": [
+            {"match": "/GP_ID/>", "body": []},
+            {"match": "/DECAY_DATE/", "body": synthetic_gp(SATELLITES, epoch=EPOCH)},
+        ]}, f)
+    return RecordedSession(path)
+
+
+def make_daemon(session, login=None, **options):
+    layers = {"points": FakeFeatureLayer(), "lines": FakeFeatureLayer()}
+    daemon = RecordingDaemon(
+        GPStore(None),
+        login or (lambda: session),
+        LayerSync(layers["points"], "norad_cat_id", "sync_state/points.json", **NO_WAIT),
+        LayerSync(layers["lines"], "norad_cat_id", "sync_state/lines.json", **NO_WAIT),
+        {},
+        clock=FakeClock(START),
+        **options,
+    )
+    return daemon, layers
+
+
+def run_until(daemon, seconds):
+    while (daemon.clock.now() - START).total_seconds() < seconds:
+        daemon.clock.sleep(daemon.tick())
+
+
+# ------------------ Cadence ------------------
+def test_cadence(session):
+    daemon, layers = make_daemon(session, point_interval=60, element_interval=1800, track_max_age=900)
+    run_until(daemon, 3600)
+    assert daemon.times("refresh_elements") == [0, 1800]
+    assert daemon.times("update_points") == list(range(0, 3600, 60))
+    assert daemon.times("update_tracks") == [0, 900, 1800, 2700]
+    # Never sleeps past the next job
+    assert max(daemon.clock.slept) == 60
+    assert daemon.report.counters["refresh_elements_errors"] == 0
+    assert daemon.report.counters["update_points_errors"] == 0
+    assert daemon.report.counters["update_tracks_errors"] == 0
+
+    assert len(layers["points"].features) == len(layers["lines"].features) == SATELLITES
+    # One full catalog download, then deltas
+    gets = [url for method, url in session.requests if method == "GET"]
+    assert "/DECAY_DATE/" in gets[0] and all("/GP_ID/>" in url for url in gets[1:])
+
+
+def test_points_move_between_cycles(session):
+    daemon, layers = make_daemon(session, point_interval=60)
+    daemon.tick()
+    before = {f["attributes"]["norad_cat_id"]: f["geometry"]["x"] for f in layers["points"].features.values()}
+    daemon.clock.sleep(60)
+    daemon.tick()
+    after = {f["attributes"]["norad_cat_id"]: f["geometry"]["x"] for f in layers["points"].features.values()}
+    assert before.keys() == after.keys()
+    assert all(before[k] != after[k] for k in before)
+    # Moved in place, not re-added
+    assert layers["points"].edits["adds"] == SATELLITES
+
+
+# ------------------ Startup ------------------
+def test_startup_retry_backoff(session):
+    attempts = []
+
+    def login():
+        attempts.append(None)
+        if len(attempts) <= 7:
+            raise OSError("Space-Track unreachable")
+        return session
+
+    daemon, layers = make_daemon(session, login=login, startup_retry=30, startup_retry_max=600)
+    daemon.run(ticks=9)
+    # Doubling from 30 s, capped at 600 s, then the normal cadence
+    assert daemon.clock.slept[:7] == [30, 60, 120, 240, 480, 600, 600]
+    assert daemon.report.counters["refresh_elements_errors"] == 7
+    assert daemon.report.counters["refresh_elements_runs"] == 1
+    assert daemon.startup_failures == 0
+    loaded = START + datetime.timedelta(seconds=sum(daemon.clock.slept[:7]))
+    assert daemon.times("refresh_elements")[-1] == (loaded - START).total_seconds()
+    assert daemon.next_elements == loaded + daemon.element_interval
+    assert len(layers["points"].features) == SATELLITES
+    # Nothing is published before the catalog has loaded
+    assert {job for job, _ in daemon.ran[:7]} == {"refresh_elements"}
+
+
+def test_failed_refresh_after_startup_keeps_the_cadence(session):
+    logins = []
+
+    def login():
+        logins.append(None)
+        if len(logins) > 1:
+            raise OSError("Space-Track unreachable")
+        return session
+
+    daemon, _ = make_daemon(session, login=login, element_interval=1800)
+    daemon.tick()
+    daemon.session = None
+    run_until(daemon, 1801)
+    assert daemon.times("refresh_elements") == [0, 1800]
+    assert daemon.report.counters["refresh_elements_errors"] == 1
+    assert daemon.next_elements == START + datetime.timedelta(seconds=3600)
+
+
+# ------------------ Partial track updates ------------------
+def test_only_changed_tracks_are_updated(session):
+    daemon, layers = make_daemon(session, element_interval=600, track_max_age=3600)
+    daemon.tick()
+    lines = layers["lines"]
+    oids = {f["attributes"]["norad_cat_id"]: oid for oid, f in lines.features.items()}
+    paths = {oid: f["geometry"]["paths"] for oid, f in lines.features.items()}
+    edits = dict(lines.edits)
+
+    # The next delta: new elements for two satellites, one decayed
+    newer = synthetic_gp(SATELLITES, epoch=EPOCH + datetime.timedelta(minutes=20), seed=7,
+                         first_gp_id=SATELLITES + 1)
+    decayed = dict(daemon.store.records[90005], GP_ID=str(2 * SATELLITES + 1), DECAY_DATE="2025-06-01")
+    session.responses[0]["body"] = [newer[1], newer[3], decayed]
+    run_until(daemon, 601)
+
+    assert daemon.times("update_tracks") == [0, 600]
+    assert lines.edits["updates"] - edits["updates"] == 2
+    assert lines.edits["deletes"] - edits["deletes"] == 1
+    assert lines.edits["adds"] == edits["adds"]
+    assert sorted(f["attributes"]["norad_cat_id"] for f in lines.features.values()) == \
+        sorted(set(oids) - {90005})
+    for norad_id, oid in oids.items():
+        if norad_id == 90005:
+            continue
+        changed = lines.features[oid]["geometry"]["paths"] != paths[oid]
+        assert changed == (norad_id in (90001, 90003))
+        assert lines.features[oid]["attributes"]["epoch"] == (
+            "2025-06-01 12:20:00" if norad_id in (90001, 90003) else "2025-06-01 12:00:00")
+    # Same window as the tracks already published
+    assert daemon.tracks_start == START
+    assert not daemon.stale_tracks and not daemon.dropped_tracks
+
+
+def test_tracks_regenerate_in_full_when_old(session):
+    daemon, layers = make_daemon(session, element_interval=3600, track_max_age=900)
+    daemon.tick()
+    updates = layers["lines"].edits["updates"]
+    run_until(daemon, 901)
+    assert daemon.tracks_start == START + datetime.timedelta(seconds=900)
+    # Every track now covers the new window
+    assert layers["lines"].edits["updates"] - updates == SATELLITES
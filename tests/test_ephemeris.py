@@ -0,0 +1,84 @@
+import datetime
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from ephemeris import Ephemeris  # noqa: E402
+from propagation import load_catalog, propagate_itrs, time_grid  # noqa: E402
+from synthetic import synthetic_gp  # noqa: E402
+from timescale import load_timescale  # noqa: E402
+
+# ephemeris.Ephemeris: interpolated positions against direct SGP4, and rows
+# that stop being used once the GP store holds newer elements than the table.
+
+EPOCH = datetime.datetime(2025, 6, 1, 12, 0)
+NOW = datetime.datetime(2025, 6, 1, 12, 30)
+OFFSETS = np.arange(0, 3600, 30)
+
+
+@pytest.fixture(autouse=True)
+def in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def positions(ephemeris, tle_data):
+    catalog = load_catalog(tle_data, verbose=False)
+    grid = time_grid(load_timescale(), NOW, OFFSETS)
+    return ephemeris.itrs(catalog, NOW, OFFSETS, *grid), propagate_itrs(catalog.array(), *grid)
+
+
+def test_interpolation_matches_sgp4(tmp_path):
+    tle_data = synthetic_gp(20, epoch=EPOCH, mix={"leo": 0.5, "meo": 0.2, "geo": 0.2, "heo": 0.1})
+    ephemeris = Ephemeris(str(tmp_path / "ephemeris"))
+    assert ephemeris.update(tle_data, NOW) == 20
+    interpolated, direct = positions(ephemeris, tle_data)
+    assert np.abs(interpolated - direct).max() < 0.1
+    assert ephemeris.max_error_km < 0.1
+
+    # Read back from disk by another process
+    again, _ = positions(Ephemeris(str(tmp_path / "ephemeris")), tle_data)
+    assert np.array_equal(again, interpolated)
+
+
+def test_superseded_rows_are_propagated(tmp_path):
+    tle_data = synthetic_gp(10, epoch=EPOCH)
+    ephemeris = Ephemeris(str(tmp_path / "ephemeris"))
+    ephemeris.update(tle_data, NOW)
+
+    # A GP update the table hasn't seen yet: satellite 3 has a new element set
+    newer = synthetic_gp(10, epoch=EPOCH + datetime.timedelta(minutes=20), seed=5)
+    current = tle_data[:3] + [newer[3]] + tle_data[4:]
+    interpolated, direct = positions(ephemeris, current)
+
+    # Satellite 3 comes from SGP4 on its new elements, the others from the table
+    assert np.array_equal(interpolated[3], direct[3])
+    old, _ = positions(ephemeris, tle_data)
+    assert np.abs(old[3] - direct[3]).max() > 100
+    others = [i for i in range(10) if i != 3]
+    assert not np.array_equal(interpolated[others], direct[others])
+    assert np.abs(interpolated[others] - direct[others]).max() < 0.1
+
+    # Once the table is updated, only that row is propagated and it is used again
+    assert ephemeris.update(current, NOW) == 1
+    interpolated, direct = positions(ephemeris, current)
+    assert not np.array_equal(interpolated[3], direct[3])
+    assert np.abs(interpolated[3] - direct[3]).max() < 0.1
+
+
+def test_new_satellites_and_times_outside_the_window(tmp_path):
+    tle_data = synthetic_gp(6, epoch=EPOCH)
+    ephemeris = Ephemeris(str(tmp_path / "ephemeris"))
+    ephemeris.update(tle_data[:5], NOW)
+    interpolated, direct = positions(ephemeris, tle_data)
+    assert np.array_equal(interpolated[5], direct[5])
+
+    catalog = load_catalog(tle_data[:5], verbose=False)
+    later = NOW + datetime.timedelta(days=2)
+    grid = time_grid(load_timescale(), later, OFFSETS)
+    assert np.array_equal(ephemeris.itrs(catalog, later, OFFSETS, *grid), propagate_itrs(catalog.array(), *grid))
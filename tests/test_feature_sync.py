@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fake_layer import FakeFeatureLayer  # noqa: E402
+from feature_sync import LayerSync  # noqa: E402
+
+# feature_sync.LayerSync against fake_layer.FakeFeatureLayer: what the plan
+# adds, updates and deletes, adds whose response was lost, and what happens
+# when the state file is missing or was rewritten elsewhere.
+
+# No real waiting between retries
+UPLOAD_OPTIONS = {"workers": 1, "backoff": 0.0}
+
+
+def satellite(norad_id, lon=0.0, name=None):
+    return {
+        "geometry": {"x": lon, "y": 10.0, "spatialReference": {"wkid": 4326}},
+        "attributes": {"norad_cat_id": norad_id, "name": name or f"SAT {norad_id}", "last_update": "now"},
+    }
+
+
+def catalog(ids, lon=0.0):
+    return [satellite(i, lon) for i in ids]
+
+
+def on_layer(layer):
+    return sorted(f["attributes"]["norad_cat_id"] for f in layer.features.values())
+
+
+@pytest.fixture
+def layer():
+    return FakeFeatureLayer()
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / "sync_state" / "layer.json")
+
+
+def make_sync(layer, state_path, **options):
+    return LayerSync(layer, "norad_cat_id", state_path, **{**UPLOAD_OPTIONS, **options})
+
+
+# ------------------ Plan ------------------
+def test_first_sync_adds_everything(layer, state_path):
+    counts = make_sync(layer, state_path).sync(catalog(range(1, 6)))
+    assert (counts["added"], counts["updated"], counts["deleted"], counts["failed"]) == (5, 0, 0, 0)
+    assert on_layer(layer) == [1, 2, 3, 4, 5]
+    with open(state_path, "r", encoding="utf-8") as f:
+        assert sorted(json.load(f)) == sorted(str(oid) for oid in layer.features)
+
+
+def test_unchanged_resync_is_a_no_op(layer, state_path):
+    make_sync(layer, state_path).sync(catalog(range(1, 6)))
+    edits = dict(layer.edits)
+    calls = layer.calls["edit_features"]
+
+    # A fresh run, as the next cron job would start it; last_update is ignored
+    features = catalog(range(1, 6))
+    for feature in features:
+        feature["attributes"]["last_update"] = "later"
+    counts = make_sync(layer, state_path).sync(features)
+    assert counts["unchanged"] == 5
+    assert (counts["added"], counts["updated"], counts["deleted"]) == (0, 0, 0)
+    assert layer.edits == edits
+    assert layer.calls["edit_features"] == calls
+
+
+def test_changed_hash_becomes_an_update(layer, state_path):
+    make_sync(layer, state_path).sync(catalog(range(1, 6)))
+    oids = {f["attributes"]["norad_cat_id"]: oid for oid, f in layer.features.items()}
+
+    features = catalog(range(1, 6))
+    features[2] = satellite(3, lon=45.0)
+    counts = make_sync(layer, state_path).sync(features)
+    assert (counts["added"], counts["updated"], counts["deleted"], counts["unchanged"]) == (0, 1, 0, 4)
+    # Updated in place, under the same OBJECTID
+    assert layer.features[oids[3]]["geometry"]["x"] == 45.0
+    assert len(layer.features) == 5
+
+
+def test_dropped_key_becomes_a_delete(layer, state_path):
+    make_sync(layer, state_path).sync(catalog(range(1, 6)))
+    counts = make_sync(layer, state_path).sync(catalog([1, 2, 4, 5]))
+    assert (counts["added"], counts["updated"], counts["deleted"], counts["unchanged"]) == (0, 0, 1, 4)
+    assert on_layer(layer) == [1, 2, 4, 5]
+
+
+def test_duplicate_keys_on_the_layer_are_deleted(layer, state_path):
+    make_sync(layer, state_path).sync(catalog(range(1, 4)))
+    layer.edit_features(adds=[satellite(2)])
+    counts = make_sync(layer, state_path).sync(catalog(range(1, 4)))
+    assert counts["deleted"] == 1
+    assert on_layer(layer) == [1, 2, 3]
+
+
+# ------------------ Lost responses ------------------
+def test_lost_add_response_is_reconciled(layer, state_path):
+    sync = make_sync(layer, state_path, max_features=2)
+    # The first batch of two is applied but its response never arrives
+    layer.lost_responses = 1
+    counts = sync.sync(catalog(range(1, 6)))
+    assert (counts["added"], counts["failed"]) == (5, 0)
+    # Found through the key IN (...) lookup instead of being sent again
+    assert on_layer(layer) == [1, 2, 3, 4, 5]
+    assert layer.edits["adds"] == 5
+    assert sync.uploads[-1].retries == 0
+    for key, entry in sync.published.items():
+        assert layer.features[entry["oid"]]["attributes"]["norad_cat_id"] == int(key)
+
+    # The reconciled adds were recorded like any other: nothing left to do
+    assert make_sync(layer, state_path).sync(catalog(range(1, 6)))["unchanged"] == 5
+
+
+def test_reconcile_queries_by_key(layer):
+    sync = make_sync(layer, None)
+    layer.edit_features(adds=catalog([7, 9]))
+    adds = [{"attributes": {"norad_cat_id": i}} for i in (7, 8, 9)]
+    found = sync.added_on_layer(adds)([0, 1, 2])
+    assert {i: r["objectId"] for i, r in found.items()} == {0: 1, 2: 2}
+
+
+def test_string_keys_are_quoted(layer):
+    layer.edit_features(adds=[{"attributes": {"satname": "O'NEILL"}}, {"attributes": {"satname": "OTHER"}}])
+    sync = LayerSync(layer, "satname", None, **UPLOAD_OPTIONS)
+    adds = [{"attributes": {"satname": "O'NEILL"}}, {"attributes": {"satname": "MISSING"}}]
+    assert list(sync.added_on_layer(adds)([0, 1])) == [0]
+
+
+# ------------------ State file ------------------
+def test_missing_state_republishes_as_updates(layer, state_path):
+    make_sync(layer, state_path).sync(catalog(range(1, 6)))
+    os.remove(state_path)
+
+    counts = make_sync(layer, state_path).sync(catalog(range(1, 6)))
+    # Nothing is added twice or deleted; every feature is just sent again
+    assert (counts["added"], counts["updated"], counts["deleted"]) == (0, 5, 0)
+    assert on_layer(layer) == [1, 2, 3, 4, 5]
+    assert make_sync(layer, state_path).sync(catalog(range(1, 6)))["unchanged"] == 5
+
+
+def test_unreadable_state_is_ignored(layer, state_path):
+    make_sync(layer, state_path).sync(catalog(range(1, 4)))
+    with open(state_path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    counts = make_sync(layer, state_path).sync(catalog(range(1, 4)))
+    assert (counts["added"], counts["updated"], counts["deleted"]) == (0, 3, 0)
+
+
+def test_long_running_sync_reloads_when_state_goes_missing(layer, state_path):
+    sync = make_sync(layer, state_path)
+    sync.sync(catalog(range(1, 4)))
+    queries = layer.calls["query"]
+    assert sync.sync(catalog(range(1, 4)), reload=False)["unchanged"] == 3
+    assert layer.calls["query"] == queries
+
+    # Someone else emptied the layer and the state with it
+    layer.delete_features(where="1=1")
+    os.remove(state_path)
+    counts = sync.sync(catalog(range(1, 4)), reload=False)
+    assert layer.calls["query"] == queries + 1
+    assert (counts["added"], counts["updated"], counts["failed"]) == (3, 0, 0)
+    assert on_layer(layer) == [1, 2, 3]
+
+
+def test_long_running_sync_reloads_when_state_is_rewritten(layer, state_path):
+    sync = make_sync(layer, state_path)
+    sync.sync(catalog(range(1, 4)))
+
+    # Another job published to the same layer: one feature replaced, one added
+    make_sync(layer, state_path).sync([satellite(1), satellite(2, lon=90.0), satellite(3), satellite(4)])
+
+    counts = sync.sync(catalog(range(1, 4)), reload=False)
+    # Feature 4 is found and deleted and feature 2 put back, instead of
+    # trusting the map from before the other job ran
+    assert (counts["added"], counts["updated"], counts["deleted"]) == (0, 1, 1)
+    assert on_layer(layer) == [1, 2, 3]
+    assert layer.features[sync.published["2"]["oid"]]["geometry"]["x"] == 0.0
@@ -0,0 +1,150 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from flood_raster import Raster, write_float_grid  # noqa: E402
+from flood_reclassify import REMAP_RANGES, class_rectangles, class_regions, reclassify, reclassify_rasters  # noqa: E402
+
+# code/flood_reclassify.py on small synthetic depth arrays: RemapRange
+# binning, NODATA, class counts and areas, and dissolved polygons that come
+# out the same whatever the tiling.
+
+LEFT, BOTTOM, CELL = 500000.0, 3800000.0, 3.0
+
+
+# Depths with every class, a NODATA hole and NaN cells, 11 x 13 so that small
+# tiles leave ragged edges
+def synthetic_depth():
+    rows, cols = np.mgrid[0:11, 0:13]
+    depth = (rows * 0.9 + cols * 0.55).astype(float)
+    depth[0, :4] = 0.0
+    depth[4:6, 5:8] = np.nan
+    depth[10, 12] = 150.0
+    depth[9, 0] = -1.0
+    return depth
+
+
+def cell_union(classes, value):
+    rows, cols = np.nonzero(classes == value)
+    return shapely.union_all(shapely.box(cols, rows, cols + 1, rows + 1))
+
+
+@pytest.fixture
+def depth_path(tmp_path):
+    path = str(tmp_path / "depth.flt")
+    write_float_grid(path, synthetic_depth(), left=LEFT, bottom=BOTTOM, cell=CELL)
+    return path
+
+
+def test_breaks_are_closed_on_the_right():
+    values = [0.0, 0.5, 1.0, np.nextafter(1.0, 2.0), 2.0, 5.0, 5.5, 10.0, 10.5, 100.0]
+    assert reclassify(values).tolist() == [1, 1, 1, 2, 2, 5, 6, 6, 7, 7]
+
+
+def test_outside_the_ranges_gets_no_class():
+    values = [-0.1, np.nextafter(100.0, 200.0), 150.0, np.nan, np.inf, -np.inf]
+    assert reclassify(values).tolist() == [0] * len(values)
+
+
+def test_nodata_cells_read_as_nan(depth_path):
+    depth = Raster(depth_path).read((0, 0, 11, 13))
+    assert np.isnan(depth[4:6, 5:8]).all()
+    assert np.array_equal(np.isnan(depth), np.isnan(synthetic_depth()))
+
+
+def test_class_counts_and_areas(depth_path):
+    expected = np.bincount(reclassify(synthetic_depth()).ravel(), minlength=8)
+    rows = reclassify_rasters([depth_path], tile_size=4, workers=1)[depth_path]
+    assert [row["gridcode"] for row in rows] == [c for c in range(1, 8) if expected[c]]
+    for row in rows:
+        assert row["pixels"] == expected[row["gridcode"]]
+        assert row["area"] == row["pixels"] * CELL ** 2
+        assert row["geometry"].area == pytest.approx(row["area"])
+    # NODATA, NaN, the negative and the >100 cell are left out
+    assert sum(row["pixels"] for row in rows) == synthetic_depth().size - 6 - 2
+
+
+def test_polygons_match_the_cells(depth_path):
+    classes = reclassify(synthetic_depth())
+    raster = Raster(depth_path)
+    for row in reclassify_rasters([depth_path], tile_size=4, workers=1)[depth_path]:
+        cells = raster.to_map(cell_union(classes, row["gridcode"]))
+        assert shapely.equals(row["geometry"], cells)
+
+
+def test_geometry_is_in_map_coordinates(depth_path):
+    rows = reclassify_rasters([depth_path], tile_size=64, workers=1)[depth_path]
+    bounds = shapely.bounds(shapely.union_all([row["geometry"] for row in rows]))
+    assert bounds[0] >= LEFT and bounds[2] <= LEFT + 13 * CELL
+    assert bounds[1] >= BOTTOM and bounds[3] <= BOTTOM + 11 * CELL
+    # Row 0 is the top edge
+    top_left = shapely.box(LEFT, BOTTOM + 10 * CELL, LEFT + CELL, BOTTOM + 11 * CELL)
+    assert shapely.contains(rows[0]["geometry"], top_left)
+
+
+@pytest.mark.parametrize("tile_size", [1, 3, 4, 5, 12])
+def test_tile_edges_dissolve(depth_path, tile_size):
+    whole = {row["gridcode"]: row for row in reclassify_rasters([depth_path], tile_size=64, workers=1)[depth_path]}
+    tiled = reclassify_rasters([depth_path], tile_size=tile_size, workers=1)[depth_path]
+    assert len(tiled) == len(whole)
+    for row in tiled:
+        assert row["pixels"] == whole[row["gridcode"]]["pixels"]
+        assert shapely.equals(row["geometry"], whole[row["gridcode"]]["geometry"])
+        # No seams left where tiles met: as many parts as the untiled result
+        assert shapely.get_num_geometries(row["geometry"]) == \
+            shapely.get_num_geometries(whole[row["gridcode"]]["geometry"])
+
+
+def test_band_across_tiles_is_one_polygon(tmp_path):
+    depth = np.full((9, 9), np.nan)
+    depth[3:6, :] = 2.5
+    path = str(tmp_path / "band.flt")
+    write_float_grid(path, depth, cell=CELL)
+    (row,) = reclassify_rasters([path], tile_size=2, workers=1)[path]
+    assert row["gridcode"] == 3 and row["pixels"] == 27
+    assert row["geometry"].geom_type == "Polygon"
+    assert shapely.equals(row["geometry"], shapely.box(0, 3 * CELL, 9 * CELL, 6 * CELL))
+
+
+def test_rectangles_cover_each_class_exactly():
+    classes = np.random.default_rng(0).integers(0, 4, (20, 17)).astype(np.uint8)
+    classes[5:15, 3:12] = 2
+    rectangles = class_rectangles(classes, row0=40, col0=7)
+    for value in range(1, 4):
+        selected = rectangles[rectangles[:, 0] == value]
+        sizes = (selected[:, 3] - selected[:, 1]) * (selected[:, 4] - selected[:, 2])
+        # Disjoint rectangles whose cells add up to the class's cells
+        assert sizes.sum() == (classes == value).sum()
+        boxes = shapely.box(selected[:, 1] - 7, selected[:, 2] - 40, selected[:, 3] - 7, selected[:, 4] - 40)
+        assert shapely.equals(shapely.union_all(boxes), cell_union(classes, value))
+    assert class_regions(np.zeros((4, 4), dtype=np.uint8)) == {}
+
+
+def test_custom_remap(depth_path):
+    remap = ((0, 3, 1), (3, 100, 2))
+    rows = reclassify_rasters([depth_path], tile_size=5, workers=1, remap=remap)[depth_path]
+    binned = reclassify(synthetic_depth(), remap)
+    assert {row["gridcode"]: row["pixels"] for row in rows} == {1: (binned == 1).sum(), 2: (binned == 2).sum()}
+
+
+def test_workers_give_the_same_result(depth_path, tmp_path):
+    npy_path = str(tmp_path / "depth.npy")
+    np.save(npy_path, synthetic_depth().astype(np.float32))
+    one = reclassify_rasters([depth_path, npy_path], tile_size=4, workers=1)
+    pooled = reclassify_rasters([depth_path, npy_path], tile_size=4, workers=2)
+    for path in (depth_path, npy_path):
+        assert [r["pixels"] for r in one[path]] == [r["pixels"] for r in pooled[path]]
+        for a, b in zip(one[path], pooled[path]):
+            assert shapely.equals(a["geometry"], b["geometry"])
+    # The .npy shares depth.hdr, so both rasters give the same classes
+    assert [r["pixels"] for r in one[depth_path]] == [r["pixels"] for r in one[npy_path]]
+
+
+def test_remap_ranges_are_contiguous():
+    for (_, high, _), (low, _, _) in zip(REMAP_RANGES, REMAP_RANGES[1:]):
+        assert high == low
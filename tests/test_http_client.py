@@ -0,0 +1,292 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import http_client  # noqa: E402
+from gp_cache import DELTA_QUERY, GPStore, SPACETRACK_URL, spacetrack_login  # noqa: E402
+from http_client import HttpClient, redact  # noqa: E402
+
+FIXTURE_PATH = os.path.join(ROOT, "fixtures", "spacetrack_gp.json")
+
+# http_client.HttpClient against a local stub server: retries, conditional
+# requests, gzip, get_many and the Space-Track login check, plus a GP store
+# refresh replayed from fixtures/spacetrack_gp.json.  Nothing leaves the machine.
+
+
+# Serves recorded responses in the fixture's format
+#   [{"match": "<substring of the URL>", "status": 200, "body": [...]}]
+# with an ETag per response (a matching If-None-Match gets a 304), gzip when
+# the client accepts it, N2YO-style /above/<satid> answers, failures[path]
+# 503s before a path succeeds, and a Space-Track login that fails for
+# password=wrong.  benchmarks/bench_http.py uses it too.
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, responses=(), latency_s=0.0, failures=None):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.responses = []
+        for recorded in responses:
+            body = json.dumps(recorded["body"]).encode("utf-8")
+            self.responses.append({
+                "match": recorded["match"],
+                "status": recorded.get("status", 200),
+                "body": body,
+                "gzipped": gzip.compress(body),
+                "etag": '"' + hashlib.sha1(body).hexdigest() + '"',
+            })
+        self.latency_s = latency_s
+        # path -> 503s still to send
+        self.failures = dict(failures or {})
+        self.connections = 0
+        self.sent_bytes = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer the response so headers and body go out together (no Nagle stall)
+    wbufsize = -1
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.sent_bytes += len(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = self.rfile.read(length).decode("utf-8")
+        body = b'{"Login":"Failed"}' if "password=wrong" in form else b'""'
+        self.send(200, body, {"Content-Type": "application/json"})
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            time.sleep(self.server.latency_s)
+            self.answer()
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def answer(self):
+        # requests percent-encodes the ">" in Space-Track queries
+        full_path = urllib.parse.unquote(self.path)
+        path = full_path.split("?")[0]
+        with self.server.lock:
+            failing = self.server.failures.get(path, 0)
+            if failing:
+                self.server.failures[path] = failing - 1
+        if failing:
+            self.send(503, b"busy", {"Retry-After": "0"})
+            return
+        if path.startswith("/above/"):
+            body = json.dumps({"info": {"satcount": 1}, "above": [{"satid": int(path[7:])}]}).encode("utf-8")
+            self.send(200, body, {"Content-Type": "application/json"})
+            return
+        for recorded in self.server.responses:
+            if recorded["match"] not in full_path:
+                continue
+            if self.headers.get("If-None-Match") == recorded["etag"]:
+                self.send(304, headers={"ETag": recorded["etag"]})
+                return
+            body = recorded["body"]
+            headers = {"Content-Type": "application/json", "ETag": recorded["etag"]}
+            if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                body = recorded["gzipped"]
+                headers["Content-Encoding"] = "gzip"
+            self.send(recorded["status"], body, headers)
+            return
+        self.send(404, b"not recorded")
+
+
+# HttpClient that sends Space-Track URLs to the stub instead
+class LocalClient(HttpClient):
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def request(self, method, url, **kwargs):
+        return super().request(method, url.replace(SPACETRACK_URL, self.base_url), **kwargs)
+
+
+def load_fixture():
+    with open(FIXTURE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def server():
+    responses = load_fixture()["responses"] + [{"match": "/flaky", "body": "ok"}, {"match": "/down", "body": "ok"}]
+    server = StubServer(responses, failures={"/flaky": 2, "/down": 10})
+    yield server
+    server.close()
+
+
+# ------------------ Retries ------------------
+def test_retries_transient_status_then_succeeds(server):
+    slept = []
+    with HttpClient(sleep=slept.append) as client:
+        response = client.get(f"{server.url}/flaky")
+    assert response.status_code == 200
+    assert client.stats["retries"] == 2
+    # Retry-After: 0 from the server wins over the backoff
+    assert slept == [0.0, 0.0]
+
+
+def test_gives_up_after_retries(server):
+    slept = []
+    with HttpClient(retries=2, sleep=slept.append) as client:
+        response = client.get(f"{server.url}/down")
+    assert response.status_code == 503
+    assert client.stats["requests"] == 3
+    assert len(slept) == 2
+
+
+def test_retries_connection_errors_with_backoff():
+    import requests
+
+    server = StubServer()
+    url = server.url
+    server.close()
+    slept = []
+    with HttpClient(retries=2, backoff=0.5, sleep=slept.append) as client:
+        with pytest.raises(requests.ConnectionError):
+            client.get(url + "/gone")
+    assert slept == [0.5, 1.0]
+
+
+def test_client_errors_are_not_retried(server):
+    with HttpClient(sleep=lambda s: None) as client:
+        response = client.get(f"{server.url}/missing")
+    assert response.status_code == 404
+    assert client.stats["retries"] == 0
+
+
+# ------------------ Conditional requests and gzip ------------------
+def test_not_modified_after_stored_validator(server, tmp_path):
+    cache_path = str(tmp_path / "http_cache.json")
+    url = server.url + "/basicspacedata/query/class/gp/GP_ID/>1/format/json"
+    with HttpClient(cache_path=cache_path) as client:
+        first = client.get(url, conditional=True)
+        second = client.get(url, conditional=True)
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert client.stats["not_modified"] == 1
+
+    # The validator survives into the next run
+    with HttpClient(cache_path=cache_path) as client:
+        assert client.get(url, conditional=True).status_code == 304
+        # Unconditional requests don't send it
+        assert client.get(url).status_code == 200
+
+
+def test_validators_are_bounded(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(http_client, "MAX_VALIDATORS", 3)
+    cache_path = str(tmp_path / "http_cache.json")
+    urls = [server.url + DELTA_QUERY.format(gp_id=gp_id) for gp_id in range(5)]
+    with HttpClient(cache_path=cache_path) as client:
+        for url in urls:
+            client.get(url, conditional=True)
+    with open(cache_path, "r", encoding="utf-8") as f:
+        assert list(json.load(f)) == urls[2:]
+
+
+def test_secrets_are_not_stored(server, tmp_path):
+    cache_path = str(tmp_path / "http_cache.json")
+    url = server.url + "/basicspacedata/query/class/gp/GP_ID/>1/format/json?apiKey=secret"
+    with HttpClient(cache_path=cache_path) as client:
+        client.get(url, conditional=True)
+    with open(cache_path, "r", encoding="utf-8") as f:
+        assert "secret" not in f.read()
+    assert redact(url).endswith("apiKey=***")
+
+
+def test_gzip_is_requested_and_decoded(server):
+    recorded = load_fixture()["responses"][0]
+    with HttpClient() as client:
+        response = client.get(server.url + "/basicspacedata/query/" + recorded["match"])
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json() == recorded["body"]
+    assert server.sent_bytes < len(json.dumps(recorded["body"]))
+
+
+# ------------------ Concurrency ------------------
+def test_get_many_keeps_order_and_overlaps_requests():
+    server = StubServer(latency_s=0.05)
+    try:
+        urls = [f"{server.url}/above/{satid}?apiKey=secret" for satid in range(16)]
+        with HttpClient(pool_size=4) as client:
+            responses = client.get_many(urls)
+        assert [r.json()["above"][0]["satid"] for r in responses] == list(range(16))
+        assert 1 < server.max_in_flight <= 4
+        # Connections are pooled, not opened per request
+        assert server.connections <= 4
+    finally:
+        server.close()
+
+
+# ------------------ Space-Track ------------------
+def test_login_checks_the_answer(server):
+    with pytest.raises(RuntimeError):
+        spacetrack_login("user", "wrong", session=LocalClient(server.url))
+    with LocalClient(server.url) as session:
+        assert spacetrack_login("user", "right", session=session) is session
+
+
+def test_gp_store_refresh_from_fixture(server, tmp_path):
+    now = datetime.datetime.fromisoformat(load_fixture()["recorded_at"])
+    store = GPStore(str(tmp_path / "gp_cache.json"))
+    with LocalClient(server.url, cache_path=str(tmp_path / "http_cache.json")) as session:
+        store.refresh(session, now=now)
+        assert sorted(store.records) == [25544, 25545, 25546, 25547, 25548]
+
+        # The delta updates one satellite, decays one and adds one
+        store.refresh(session, now=now)
+        assert store.changed == {25545, 25600}
+        assert store.dropped == {25547}
+        assert store.max_gp_id == 280000102
+
+        # Nothing new since the cursor: the repeated delta URL is answered 304
+        # the second time and the store is left as it is
+        store.refresh(session, now=now)
+        records = dict(store.records)
+        assert store.refresh(session, now=now) == 0
+        assert session.stats["not_modified"] == 1
+        assert store.records == records
@@ -0,0 +1,103 @@
+import datetime
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from propagation import load_catalog, make_shards, propagate_catalog, propagate_subpoints, time_grid  # noqa: E402
+from synthetic import synthetic_gp  # noqa: E402
+from timescale import load_timescale  # noqa: E402
+
+# propagation.propagate_catalog with --workers: NORAD_CAT_ID-ordered shards
+# propagated in separate processes have to give exactly what one process
+# gives, satellite for satellite, including which entries were skipped.
+
+START = datetime.datetime(2025, 6, 1, 0, 17)
+OFFSETS = np.arange(0, 3600, 30)
+
+
+# Keeps timescale_cache.npz out of the working tree; one cache for the module
+@pytest.fixture(scope="module")
+def run_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("run")
+
+
+@pytest.fixture(autouse=True)
+def in_run_dir(run_dir, monkeypatch):
+    monkeypatch.chdir(run_dir)
+
+
+# Synthetic LEO/MEO/GEO/HEO elements in shuffled order, plus entries that are
+# skipped: no TLE lines, a line 1 that doesn't parse, and no NORAD_CAT_ID
+def mixed_catalog(count):
+    tle_data = synthetic_gp(count, epoch=START, mix={"leo": 0.6, "meo": 0.2, "geo": 0.1, "heo": 0.1})
+    np.random.default_rng(1).shuffle(tle_data)
+    broken = dict(tle_data[0], NORAD_CAT_ID="99001", OBJECT_NAME="NO LINES", TLE_LINE1=None)
+    garbled = dict(tle_data[0], NORAD_CAT_ID="99002", OBJECT_NAME="GARBLED", TLE_LINE1="garbage")
+    anonymous = {k: v for k, v in tle_data[0].items() if k != "NORAD_CAT_ID"}
+    return tle_data[:5] + [broken] + tle_data[5:9] + [garbled, anonymous] + tle_data[9:]
+
+
+def assert_same(one, many):
+    (catalog, lon, lat, alt_km), (other, lon2, lat2, alt_km2) = one, many
+    assert catalog.norad_ids == other.norad_ids
+    assert catalog.names == other.names
+    assert catalog.epochs == other.epochs
+    assert catalog.skipped == other.skipped
+    assert np.array_equal(catalog.mean_motion, other.mean_motion)
+    assert np.array_equal(catalog.inclination, other.inclination)
+    for a, b in ((lon, lon2), (lat, lat2), (alt_km, alt_km2)):
+        assert a.shape == b.shape == (len(catalog), len(OFFSETS))
+        assert np.array_equal(a, b, equal_nan=True)
+
+
+@pytest.mark.parametrize("workers", [2, 3, 4])
+def test_workers_match_one_process(workers):
+    tle_data = mixed_catalog(60)
+    assert_same(propagate_catalog(tle_data, START, OFFSETS, workers=1),
+                propagate_catalog(tle_data, START, OFFSETS, workers=workers))
+
+
+def test_one_process_matches_plain_propagation():
+    tle_data = mixed_catalog(30)
+    catalog, lon, lat, alt_km = propagate_catalog(tle_data, START, OFFSETS, workers=3)
+    assert catalog.norad_ids == sorted(catalog.norad_ids)
+    assert len(catalog) == 30
+    assert sorted(reason for reason, _ in catalog.skipped) == ["KeyError", "ValueError", "missing TLE lines"]
+
+    # The same satellites loaded and propagated without any sharding
+    by_id = {int(e["NORAD_CAT_ID"]): e for e in tle_data if e.get("NORAD_CAT_ID")}
+    plain = load_catalog([by_id[i] for i in catalog.norad_ids], verbose=False)
+    expected = propagate_subpoints(plain.array(), *time_grid(load_timescale(), START, OFFSETS))
+    for a, b in zip((lon, lat, alt_km), expected):
+        assert np.array_equal(a, b)
+
+
+def test_empty_catalog():
+    for workers in (1, 3):
+        catalog, lon, lat, alt_km = propagate_catalog([], START, OFFSETS, workers=workers)
+        assert len(catalog) == 0 and catalog.skipped == []
+        assert lon.shape == lat.shape == alt_km.shape == (0, len(OFFSETS))
+
+
+def test_fewer_satellites_than_workers():
+    tle_data = synthetic_gp(2, epoch=START)
+    assert len(make_shards(tle_data, 8)) == len(tle_data)
+    assert_same(propagate_catalog(tle_data, START, OFFSETS, workers=1),
+                propagate_catalog(tle_data, START, OFFSETS, workers=8))
+
+
+def test_shards_are_contiguous_in_norad_order():
+    tle_data = mixed_catalog(25)
+    shards = make_shards(tle_data, 4)
+    assert [len(s) for s in shards] == [7, 7, 7, 7]
+    ids = [e.get("NORAD_CAT_ID") for shard in shards for e in shard]
+    numbered = [int(i) for i in ids if i is not None]
+    assert numbered == sorted(numbered)
+    # Entries without an id go last
+    assert ids[-1] is None
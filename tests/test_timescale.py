@@ -0,0 +1,64 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import timescale  # noqa: E402
+from timescale import builtin_arrays, builtin_sha1, load_timescale  # noqa: E402
+
+# timescale.load_timescale: the .npz cache is built from skyfield's bundled
+# tables, reused while that bundle is unchanged, and rebuilt once it changes.
+
+
+def cached_sha1(path):
+    with np.load(path) as cached:
+        return str(cached["builtin_sha1"]) if "builtin_sha1" in cached.files else None
+
+
+def test_cache_is_built_and_reused(tmp_path):
+    path = str(tmp_path / "timescale_cache.npz")
+    ts = load_timescale(path)
+    assert cached_sha1(path) == builtin_sha1()
+    assert load_timescale(path) is ts
+
+    # Another process reads it back instead of writing it again
+    mtime = os.stat(path).st_mtime_ns
+    timescale._timescales.pop(path)
+    load_timescale(path)
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_cache_without_a_hash_is_rebuilt(tmp_path):
+    path = str(tmp_path / "timescale_cache.npz")
+    daily_tt, daily_delta_t, leap_dates, leap_offsets = builtin_arrays()
+    # As written before the hash was recorded, with a delta T that is off
+    np.savez(path, daily_tt=daily_tt, daily_delta_t=daily_delta_t + 5.0,
+             leap_dates=leap_dates, leap_offsets=leap_offsets)
+
+    ts = load_timescale(path)
+    assert cached_sha1(path) == builtin_sha1()
+    with np.load(path) as cached:
+        assert np.array_equal(cached["daily_delta_t"], daily_delta_t)
+    assert ts.utc(2020, 1, 1).delta_t < 70
+
+
+def test_cache_from_another_skyfield_is_rebuilt(tmp_path):
+    path = str(tmp_path / "timescale_cache.npz")
+    daily_tt, daily_delta_t, leap_dates, leap_offsets = builtin_arrays()
+    np.savez(path, daily_tt=daily_tt[:100], daily_delta_t=daily_delta_t[:100],
+             leap_dates=leap_dates, leap_offsets=leap_offsets, builtin_sha1="0" * 40)
+
+    load_timescale(path)
+    assert cached_sha1(path) == builtin_sha1()
+    with np.load(path) as cached:
+        assert len(cached["daily_tt"]) == len(daily_tt)
+
+
+def test_unreadable_cache_falls_back_to_the_bundle(tmp_path):
+    path = str(tmp_path / "timescale_cache.npz")
+    with open(path, "wb") as f:
+        f.write(b"not an npz")
+    ts = load_timescale(path)
+    assert ts.utc(2020, 1, 1).delta_t > 60
@@ -0,0 +1,118 @@
+import io
+import os
+import hashlib
+import pkgutil
+import argparse
+import numpy as np
+from skyfield.timelib import Timescale
+
+# ------------------ Config ------------------
+TIMESCALE_CACHE_PATH = "timescale_cache.npz"
+
+# Offline skyfield timescale.  The delta T and leap-second tables are kept in
+# a small .npz next to the other caches and the Timescale is built straight
+# from it, so startup neither reaches for the network nor imports skyfield.api
+# (and with it the download machinery).  The cache starts out as a copy of the
+# tables bundled with skyfield; running
+#   python timescale.py --download      (or --finals path/to/finals2000A.all)
+# replaces it with current IERS data whenever someone chooses to.
+#
+# The cache records the SHA-1 of the iers.npz bundled with the skyfield it was
+# built under.  Once skyfield is upgraded (and brings newer tables) the hash
+# no longer matches and the cache is rebuilt from the new bundle, so a cache
+# carried from run to run (CI) never keeps delta T / DUT1 from an old release.
+# A --finals/--download cache is replaced the same way; run it again after
+# an upgrade to get current IERS data back.
+
+_timescales = {}
+
+
+def builtin_sha1():
+    return hashlib.sha1(pkgutil.get_data("skyfield", "data/iers.npz")).hexdigest()
+
+
+def builtin_arrays():
+    # The same tables load.timescale(builtin=True) uses
+    arrays = np.load(io.BytesIO(pkgutil.get_data("skyfield", "data/iers.npz")))
+    daily_tt = arrays["tt_jd_minus_arange"] + np.arange(len(arrays["tt_jd_minus_arange"]))
+    daily_delta_t = (arrays["delta_t_1e7"] / 1e7).round(7)
+    return daily_tt, daily_delta_t, arrays["leap_dates"], arrays["leap_offsets"]
+
+
+def finals_arrays(finals_path):
+    from skyfield.data import iers
+
+    with open(finals_path, "rb") as f:
+        utc_mjd, dut1 = iers.parse_dut1_from_finals_all(f)
+    return iers.build_timescale_arrays(utc_mjd, dut1)
+
+
+def build_timescale_cache(path=TIMESCALE_CACHE_PATH, finals_path=None):
+    daily_tt, daily_delta_t, leap_dates, leap_offsets = (
+        finals_arrays(finals_path) if finals_path else builtin_arrays()
+    )
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, daily_tt=daily_tt, daily_delta_t=daily_delta_t,
+                 leap_dates=leap_dates, leap_offsets=leap_offsets, builtin_sha1=builtin_sha1())
+    os.replace(tmp_path, path)
+    _timescales.pop(path, None)
+    print(f"Wrote timescale cache {path} ({len(daily_tt)} daily delta T values"
+          f"{' from ' + finals_path if finals_path else ''}).")
+
+
+# The cached tables, or None when there is no cache or it was built under
+# another skyfield release
+def read_timescale_cache(path, builtin):
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as cached:
+        if "builtin_sha1" not in cached.files or str(cached["builtin_sha1"]) != builtin:
+            print(f"Timescale cache {path} was built under another skyfield release; rebuilding it.")
+            return None
+        return cached["daily_tt"], cached["daily_delta_t"], cached["leap_dates"], cached["leap_offsets"]
+
+
+# One Timescale per process and cache path
+def load_timescale(path=TIMESCALE_CACHE_PATH):
+    ts = _timescales.get(path)
+    if ts is not None:
+        return ts
+
+    arrays = None
+    if path:
+        try:
+            builtin = builtin_sha1()
+            arrays = read_timescale_cache(path, builtin)
+            if arrays is None:
+                build_timescale_cache(path)
+                arrays = read_timescale_cache(path, builtin)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unusable timescale cache {path}: {e}")
+    if arrays is None:
+        arrays = builtin_arrays()
+
+    daily_tt, daily_delta_t, leap_dates, leap_offsets = arrays
+    ts = _timescales[path] = Timescale((daily_tt, daily_delta_t), leap_dates, leap_offsets)
+    return ts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline skyfield timescale cache.")
+    parser.add_argument("--path", default=TIMESCALE_CACHE_PATH)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--finals", help="build from a local IERS finals2000A.all file")
+    source.add_argument("--download", action="store_true", help="download finals2000A.all from the IERS first")
+    args = parser.parse_args()
+
+    finals_path = args.finals
+    if args.download:
+        from skyfield.api import Loader
+
+        loader = Loader(os.path.dirname(os.path.abspath(args.path)))
+        finals_path = loader.download("finals2000A.all")
+    build_timescale_cache(args.path, finals_path)
+
+
+if __name__ == "__main__":
+    main()
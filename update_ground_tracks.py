@@ -1,10 +1,16 @@
 import os
-import requests
+import argparse
 import datetime
-import csv
-from arcgis.gis import GIS
-from skyfield.api import EarthSatellite, load
-from shapely.geometry import LineString
+import numpy as np
+from conjunctions import SCREEN_DISTANCE_KM, find_conjunctions, conjunction_features
+from country_index import load_country_index
+from ephemeris import Ephemeris, EPHEMERIS_PATH
+from feature_sync import LayerSync, state_path_for
+from gp_cache import GPStore, GP_CACHE_PATH, spacetrack_login
+from instrumentation import RunReport, default_report_path
+from ground_tracks import build_track_paths, SIMPLIFY_TOLERANCE_KM
+from pipeline import CHUNK_SIZE, QUEUE_SIZE, feature_chunks, run_pipeline
+from propagation import propagate_catalog, build_features
 
 # ------------------ Config ------------------
 POINT_LAYER_ID = "f11fc63900c548da89a4656d538b2e56"
@@ -12,147 +18,230 @@ LINE_LAYER_ID = "7dba0da43d22406898692bd1748bbb8b"
 PREDICTION_MINUTES = 60
 TIME_STEP_SECONDS = 30
 CSV_PATH = "sat_names.csv"
+SNAPSHOT_PATH = "snapshots"
 
 # ------------------ Environment ------------------
 AGOL_USERNAME = os.getenv("AGOL_USERNAME")
 AGOL_PASSWORD = os.getenv("AGOL_PASSWORD")
 SPACETRACK_USERNAME = os.getenv("SPACETRACK_USERNAME")
 SPACETRACK_PASSWORD = os.getenv("SPACETRACK_PASSWORD")
+# Hosted table for --conjunctions
+CONJUNCTION_TABLE_ID = os.getenv("CONJUNCTION_TABLE_ID")
 
-if not all([AGOL_USERNAME, AGOL_PASSWORD, SPACETRACK_USERNAME, SPACETRACK_PASSWORD]):
-    raise EnvironmentError("Missing required environment variables.")
-
-# ------------------ Load CSV ------------------
-csv_country_data = {}
-with open(CSV_PATH, mode="r", encoding="utf-8-sig", newline='') as csvfile:
-    reader = csv.DictReader(csvfile)
-    for row in reader:
-        try:
-            satid = int(row["satid"].strip())
-            country = row["country"].strip()
-            csv_country_data[satid] = country
-        except Exception as e:
-            print(f"Skipping row: {e}, data: {row}")
-print(f"Loaded {len(csv_country_data)} satellite-country entries.")
-
-# ------------------ AGOL Login ------------------
-print("Logging into ArcGIS Online...")
-gis = GIS("https://www.arcgis.com", AGOL_USERNAME, AGOL_PASSWORD)
-
-# ------------------ Space-Track Login ------------------
-print("Logging into Space-Track...")
-session = requests.Session()
-login_payload = {
-    "identity": SPACETRACK_USERNAME,
-    "password": SPACETRACK_PASSWORD
-}
-session.post("https://www.space-track.org/ajaxauth/login", data=login_payload)
 
 # ------------------ TLE Query ------------------
-print("🛰 Fetching TLE data from Space-Track in JSON format...")
-query_url = (
-    "https://www.space-track.org/basicspacedata/query/"
-    "class/gp/DECAY_DATE/null-val/EPOCH/>now-1/OBJECT_TYPE/PAYLOAD/"
-    "orderby/NORAD_CAT_ID/format/json"
-)
-response = session.get(query_url)
-if not response.ok:
-    raise RuntimeError(f"Space-Track query failed: {response.status_code} - {response.text}")
-
-tle_data = response.json()
-print(f"Retrieved {len(tle_data)} satellite entries.")
-
-# ------------------ Process TLEs ------------------
-ts = load.timescale()
-now = datetime.datetime.utcnow()
-last_update_str = now.strftime("%Y-%m-%d %H:%M:%S")
-
-point_features = []
-line_features = []
-
-print("Processing satellites...")
-for entry in tle_data:
-    try:
-        name = entry.get("OBJECT_NAME", "UNKNOWN")
-        line1 = entry.get("TLE_LINE1")
-        line2 = entry.get("TLE_LINE2")
-        if not line1 or not line2:
-            continue
-
-        satellite = EarthSatellite(line1, line2, name, ts)
-        norad_id = int(entry["NORAD_CAT_ID"])
-
-        minutes_range = range(0, PREDICTION_MINUTES * 60, TIME_STEP_SECONDS)
-        times = ts.utc(now.year, now.month, now.day, now.hour, now.minute, [s / 60 for s in minutes_range])
-        subpoints = [satellite.at(t).subpoint() for t in times]
-        coords = [(sp.longitude.degrees, sp.latitude.degrees) for sp in subpoints]
-        valid_coords = [pt for pt in coords if not any(map(lambda x: x is None or (isinstance(x, float) and x != x), pt))]
-
-        if len(valid_coords) < 2:
-            print(f"Skipping satellite {name} (NORAD {norad_id}) due to insufficient coordinates.")
-            continue
-
-        line_features.append({
-            "geometry": {"paths": [valid_coords], "spatialReference": {"wkid": 4326}},
-            "attributes": {
-                "sat_name": name,
-                "norad_cat_id": norad_id,
-                "epoch": satellite.epoch.utc_datetime().strftime("%Y-%m-%d %H:%M:%S"),
-                "last_update": last_update_str,
-                "duration_min": PREDICTION_MINUTES,
-                "country": csv_country_data.get(norad_id, None)
-            }
-        })
-
-        sp = satellite.at(ts.now()).subpoint()
-        point_features.append({
-            "geometry": {
-                "x": sp.longitude.degrees,
-                "y": sp.latitude.degrees,
-                "z": sp.elevation.km * 1000,
-                "spatialReference": {"wkid": 4326}
-            },
-            "attributes": {
-                "sat_name": name,
-                "norad_cat_id": norad_id,
-                "epoch": satellite.epoch.utc_datetime().strftime("%Y-%m-%d %H:%M:%S"),
-                "altitude_km": round(sp.elevation.km, 2),
-                "mean_motion": satellite.model.no_kozai,
-                "inclination": satellite.model.inclo,
-                "last_update": last_update_str,
-                "country": csv_country_data.get(norad_id, None)
-            }
-        })
-
-    except Exception as e:
-        print(f"Skipping satellite {entry.get('OBJECT_NAME', 'UNKNOWN')}: {e}")
-        continue
-
-# ------------------ Upload Helper ------------------
-def upload_in_batches(layer, features, batch_size=250):
-    for i in range(0, len(features), batch_size):
-        batch = features[i:i + batch_size]
-        result = layer.edit_features(adds=batch)
-        if not result.get("addResults") or not all(r.get("success") for r in result["addResults"]):
-            print(f"Upload failed for batch {i}-{i+batch_size}")
-        else:
-            print(f"Uploaded batch {i}-{i+batch_size}")
-
-# ------------------ Upload to AGOL ------------------
-print(f"Uploading {len(point_features)} points and {len(line_features)} lines...")
-
-point_layer = gis.content.get(POINT_LAYER_ID).layers[0]
-line_layer = gis.content.get(LINE_LAYER_ID).layers[0]
-
-point_layer.delete_features(where="1=1")
-upload_in_batches(point_layer, point_features)
-
-line_layer.delete_features(where="1=1")
-upload_in_batches(line_layer, line_features)
-
-print("Upload complete.")
-
-
-
+def fetch_tle_data(store, now, report=None):
+    print("Logging into Space-Track...")
+    session = spacetrack_login(SPACETRACK_USERNAME, SPACETRACK_PASSWORD)
+
+    # Only element sets published since the last run are downloaded; the rest
+    # come from the local GP store.
+    store.refresh(session, now=now)
+    tle_data = store.tle_data()
+    print(f"Retrieved {len(tle_data)} satellite entries.")
+    if report is not None:
+        report.add_bytes("fetch", store.received_bytes)
+        report.count("gp_records_changed", len(store.changed))
+        report.count("gp_records_dropped", len(store.dropped))
+    return tle_data
 
 
+# ------------------ Process TLEs ------------------
+def propagate_tle_data(tle_data, now, workers=1, satrec_cache=None, report=None, ephemeris=None):
+    stats_report = report or RunReport("update_ground_tracks", path="")
+
+    print("Processing satellites...")
+    # One vectorized SGP4 call per shard for every satellite x every time step.
+    # The first step is "now", so points and lines both come from the same result.
+    # With an ephemeris table the positions are interpolated from it instead.
+    offsets = np.arange(0, PREDICTION_MINUTES * 60, TIME_STEP_SECONDS)
+    with stats_report.stage("propagate"), stats_report.profile("propagate"):
+        catalog, lon, lat, alt_km = propagate_catalog(tle_data, now, offsets, workers=workers,
+                                                      satrec_cache=satrec_cache, report=report,
+                                                      ephemeris=ephemeris)
+    stats_report.count("satellites", len(catalog))
+    return catalog, lon, lat, alt_km
+
+
+# propagated: what propagate_tle_data returned, when the caller has already
+# propagated (for conjunction screening)
+def process_tle_data(tle_data, now, countries, workers=1, satrec_cache=None,
+                     track_tolerance_km=SIMPLIFY_TOLERANCE_KM, measure_track_error=False, report=None,
+                     ephemeris=None, propagated=None):
+    # Skips are printed as before when there is no run report; stage times and
+    # counts then go to a throwaway one
+    stats_report = report or RunReport("update_ground_tracks", path="")
+    last_update_str = now.strftime("%Y-%m-%d %H:%M:%S")
+
+    catalog, lon, lat, alt_km = propagated or propagate_tle_data(tle_data, now, workers, satrec_cache, report,
+                                                                 ephemeris)
+
+    # Simplify each track to the km tolerance and split it at the antimeridian
+    with stats_report.stage("tracks"):
+        paths, stats = build_track_paths(lon, lat, tolerance_km=track_tolerance_km,
+                                         measure_error=measure_track_error)
+    print(f"Track vertices: {stats['vertices_before']} -> {stats['vertices_after']}"
+          + (f", worst-case error {stats['max_error_km']} km" if measure_track_error else ""))
+    stats_report.count("track_vertices_before", stats["vertices_before"])
+    stats_report.count("track_vertices_after", stats["vertices_after"])
+
+    with stats_report.stage("features"):
+        point_features, line_features = build_features(
+            catalog, lon, lat, alt_km, last_update_str, PREDICTION_MINUTES, countries, paths=paths, report=report
+        )
+    stats_report.count("point_features", len(point_features))
+    stats_report.count("line_features", len(line_features))
+    return point_features, line_features
+
+
+# Puts the run's files in place and compacts days that have grown too many
+def save_snapshot(snapshots, snapshot, report):
+    with report.stage("snapshot"):
+        report.add_bytes("snapshot", snapshot.close())
+        report.count("snapshot_rows", snapshot.rows)
+        snapshots.compact()
+    print(f"Snapshot: {snapshot.rows} rows added to {snapshots.path}.")
+
+
+def run(args, report):
+    if not all([AGOL_USERNAME, AGOL_PASSWORD, SPACETRACK_USERNAME, SPACETRACK_PASSWORD]):
+        raise EnvironmentError("Missing required environment variables.")
+    if args.conjunctions and not CONJUNCTION_TABLE_ID:
+        raise EnvironmentError("--conjunctions needs CONJUNCTION_TABLE_ID.")
+
+    with report.stage("load_countries"):
+        countries = load_country_index(CSV_PATH)
+
+    # ------------------ AGOL Login ------------------
+    print("Logging into ArcGIS Online...")
+    with report.stage("agol_login"):
+        # Imported here: arcgis alone takes seconds to load
+        from arcgis.gis import GIS
+
+        gis = GIS("https://www.arcgis.com", AGOL_USERNAME, AGOL_PASSWORD)
+
+    now = datetime.datetime.utcnow()
+    with report.stage("fetch"):
+        store = GPStore(args.gp_cache)
+        tle_data = fetch_tle_data(store, now, report)
+
+    ephemeris = None
+    if args.ephemeris:
+        # Only satellites with new element sets are propagated here
+        with report.stage("ephemeris"):
+            ephemeris = Ephemeris(args.ephemeris)
+            ephemeris.update(tle_data, now, horizon_s=PREDICTION_MINUTES * 60,
+                             satrec_cache=store.satrec_cache, report=report)
+
+    point_layer = gis.content.get(POINT_LAYER_ID).layers[0]
+    line_layer = gis.content.get(LINE_LAYER_ID).layers[0]
+    point_sync = LayerSync(point_layer, "norad_cat_id", state_path_for(POINT_LAYER_ID))
+    line_sync = LayerSync(line_layer, "norad_cat_id", state_path_for(LINE_LAYER_ID))
+
+    propagated = None
+    conjunction_rows = None
+    if args.conjunctions:
+        # Screened on the same positions the tracks are built from
+        propagated = propagate_tle_data(tle_data, now, args.workers, store.satrec_cache, report, ephemeris)
+        with report.stage("conjunctions"):
+            offsets = np.arange(0, PREDICTION_MINUTES * 60, TIME_STEP_SECONDS)
+            conjunctions = find_conjunctions(*propagated, tle_data, now, offsets, distance_km=args.conjunction_km,
+                                             satrec_cache=store.satrec_cache, report=report)
+            conjunction_rows = conjunction_features(propagated[0], conjunctions, countries,
+                                                    now.strftime("%Y-%m-%d %H:%M:%S"))
+        print(f"{len(conjunction_rows)} satellite pairs within {args.conjunction_km} km "
+              f"in the next {PREDICTION_MINUTES} minutes.")
+
+    snapshots = snapshot = None
+    if args.snapshots:
+        # Imported here: pyarrow is only needed with --snapshots
+        from snapshot_store import SnapshotStore
+
+        snapshots = SnapshotStore(args.snapshots)
+        snapshot = snapshots.writer(now)
+
+    if args.stream:
+        # Each chunk is uploaded while the next one is propagated
+        print(f"Streaming {len(tle_data)} satellites in chunks of {args.chunk_size}...")
+        offsets = np.arange(0, PREDICTION_MINUTES * 60, TIME_STEP_SECONDS)
+        chunks = feature_chunks(tle_data, now, offsets, PREDICTION_MINUTES, countries,
+                                chunk_size=args.chunk_size, workers=args.workers,
+                                satrec_cache=store.satrec_cache, track_tolerance_km=args.track_tolerance_km,
+                                report=report, ephemeris=ephemeris, snapshot=snapshot)
+        with report.stage("pipeline"), report.profile("propagate"):
+            point_counts, line_counts = run_pipeline(chunks, point_sync, line_sync, queue_size=QUEUE_SIZE)
+        report.record_sync("points", point_counts)
+        report.record_sync("lines", line_counts)
+        print("Upload complete.")
+        if snapshot is not None:
+            save_snapshot(snapshots, snapshot, report)
+        return
+
+    if snapshot is not None:
+        # The snapshot needs the positions themselves, not just the features
+        propagated = propagated or propagate_tle_data(tle_data, now, args.workers, store.satrec_cache, report,
+                                                      ephemeris)
+        with report.stage("snapshot"):
+            snapshot.append(*propagated, now, np.arange(0, PREDICTION_MINUTES * 60, TIME_STEP_SECONDS))
+        save_snapshot(snapshots, snapshot, report)
+
+    point_features, line_features = process_tle_data(tle_data, now, countries, workers=args.workers,
+                                                     satrec_cache=store.satrec_cache,
+                                                     track_tolerance_km=args.track_tolerance_km,
+                                                     measure_track_error=args.measure_track_error,
+                                                     report=report, ephemeris=ephemeris, propagated=propagated)
+
+    # ------------------ Upload to AGOL ------------------
+    print(f"Uploading {len(point_features)} points and {len(line_features)} lines...")
+
+    # Differential sync keyed by NORAD id: the layers are never emptied
+    with report.stage("upload_points"):
+        report.record_sync("points", point_sync.sync(point_features))
+    with report.stage("upload_lines"):
+        report.record_sync("lines", line_sync.sync(line_features))
+    if conjunction_rows is not None:
+        conjunction_table = gis.content.get(CONJUNCTION_TABLE_ID).tables[0]
+        conjunction_sync = LayerSync(conjunction_table, "pair_id", state_path_for(CONJUNCTION_TABLE_ID))
+        with report.stage("upload_conjunctions"):
+            report.record_sync("conjunctions", conjunction_sync.sync(conjunction_rows))
+
+    print("Upload complete.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update satellite points and ground tracks on ArcGIS Online.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="propagate NORAD_CAT_ID-ordered shards in N processes (default: 1)")
+    parser.add_argument("--gp-cache", default=GP_CACHE_PATH,
+                        help=f"local GP element store (default: {GP_CACHE_PATH})")
+    parser.add_argument("--track-tolerance-km", type=float, default=SIMPLIFY_TOLERANCE_KM,
+                        help=f"ground track simplification tolerance (default: {SIMPLIFY_TOLERANCE_KM})")
+    parser.add_argument("--measure-track-error", action="store_true",
+                        help="report the worst-case distance between simplified and propagated tracks")
+    parser.add_argument("--stream", action="store_true",
+                        help="propagate and upload in chunks with bounded memory (see pipeline.py)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help=f"satellites per chunk with --stream (default: {CHUNK_SIZE})")
+    parser.add_argument("--ephemeris", nargs="?", const=EPHEMERIS_PATH, metavar="PATH",
+                        help=f"interpolate positions from a cached ephemeris table (default path: {EPHEMERIS_PATH})")
+    parser.add_argument("--conjunctions", action="store_true",
+                        help="screen for close approaches and publish them to the CONJUNCTION_TABLE_ID table")
+    parser.add_argument("--conjunction-km", type=float, default=SCREEN_DISTANCE_KM,
+                        help=f"miss distance to report with --conjunctions (default: {SCREEN_DISTANCE_KM})")
+    parser.add_argument("--snapshots", nargs="?", const=SNAPSHOT_PATH, metavar="PATH",
+                        help=f"append this run's positions and tracks to a local Parquet history "
+                             f"(default path: {SNAPSHOT_PATH}; see snapshot_store.py)")
+    parser.add_argument("--report", default=default_report_path("update_ground_tracks"),
+                        help="JSON run report path (default: %(default)s)")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile the propagation step and add the hot spots to the run report")
+    args = parser.parse_args()
+    if args.conjunctions and args.stream:
+        parser.error("--conjunctions needs every position at once and can't be combined with --stream")
+
+    with RunReport("update_ground_tracks", args.report, profile=args.profile) as report:
+        run(args, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,25 @@
-import requests
+import argparse
 import datetime
 import os
-import csv
-from arcgis.gis import GIS
-from arcgis.features import FeatureLayerCollection
-
-# Debugging: Ensure CSV file is visible in the working directory
-print("Working directory:", os.getcwd())
-print("Directory contents:", os.listdir())
+from country_index import load_country_index
+from ephemeris import Ephemeris, EPHEMERIS_PATH
+from feature_sync import LayerSync, state_path_for
+from gp_cache import GPStore, GP_CACHE_PATH, spacetrack_login
+from http_client import HttpClient, redact
+from instrumentation import RunReport, default_report_path
+from observer import satellites_above
+from propagation import load_catalog
+from timescale import load_timescale
 
 csv_path = "sat_names.csv"
-if not os.path.exists(csv_path):
-    raise FileNotFoundError(f"CSV file not found: {csv_path}")
 
 # Load environment variables from GitHub Actions secrets
 AGOL_USERNAME = os.getenv("AGOL_USERNAME")
 AGOL_PASSWORD = os.getenv("AGOL_PASSWORD")
 AGOL_ITEM_ID = os.getenv("AGOL_ITEM_ID")
 N2YO_API_KEY = os.getenv("N2YO_API_KEY")
-
-# Load CSV (explicitly handling potential UTF-8 BOM)
-csv_country_data = {}
-with open(csv_path, mode="r", encoding="utf-8-sig", newline='') as csvfile:
-    reader = csv.DictReader(csvfile)
-    row_count = 0
-    for row in reader:
-        row_count += 1
-        try:
-            satid = int(row["satid"].strip())
-            country = row["country"].strip()
-            csv_country_data[satid] = country
-        except Exception as e:
-            print(f"Skipping row {row_count} due to error: {e}, data: {row}")
-
-print(f"Loaded {len(csv_country_data)} satellite-country entries from CSV.")
+SPACETRACK_USERNAME = os.getenv("SPACETRACK_USERNAME")
+SPACETRACK_PASSWORD = os.getenv("SPACETRACK_PASSWORD")
 
 # API Parameters
 observer_lat = 34.7465
@@ -42,74 +28,155 @@ observer_alt = 102  # meters
 search_radius = 90  # degrees
 category_id = 0
 
-# Request satellite data
-url = f"https://api.n2yo.com/rest/v1/satellite/above/{observer_lat}/{observer_lng}/{observer_alt}/{search_radius}/{category_id}?apiKey={N2YO_API_KEY}"
-print("Requesting data from N2YO API:", url)
-
-response = requests.get(url)
-print("API response status:", response.status_code)
-
-try:
-    data = response.json()
-except Exception as e:
-    print("Failed to parse API response:", e)
-    print("Response content:", response.text)
-    exit(1)
-
-if "above" not in data:
-    print("Key 'above' not found in API response")
-    exit(1)
-
-# Prepare features
-satellites = data["above"]
-features = []
-enriched_count = 0
-local_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-for sat in satellites:
-    satid = sat.get("satid")
-    country_name = csv_country_data.get(satid)
-    if country_name:
-        enriched_count += 1
 
-    attributes = {
-        "satid": satid,
-        "intDesignator": sat.get("intDesignator"),
-        "satname": sat.get("satname"),
-        "launchDate": sat.get("launchDate"),
-        "satlat": sat.get("satlat"),
-        "satlng": sat.get("satlng"),
-        "satalt": sat.get("satalt"),
-        "last_update": local_time,
-        "country": country_name
-    }
-
-    geometry = {
-        "x": sat.get("satlng"),
-        "y": sat.get("satlat"),
-        "spatialReference": {"wkid": 4326}
-    }
-
-    features.append({"geometry": geometry, "attributes": attributes})
-
-print(f"Prepared {len(features)} satellite features; {enriched_count} have country names.")
-
-# Connect to ArcGIS Online
-gis = GIS("https://www.arcgis.com", AGOL_USERNAME, AGOL_PASSWORD)
-item = gis.content.get(AGOL_ITEM_ID)
-layer_collection = FeatureLayerCollection.fromitem(item)
-feature_layer = layer_collection.layers[0]
-
-# Update features on ArcGIS Online
-print("Deleting existing features...")
-feature_layer.delete_features(where="1=1")
-
-print("Uploading new features...")
-feature_layer.edit_features(adds=features)
-
-print("Feature upload complete.")
+# Request satellite data from N2YO, one "above" list per observer (lat, lng,
+# alt m); several observers are requested concurrently
+def fetch_above_n2yo(report=None, observers=((observer_lat, observer_lng, observer_alt),)):
+    urls = [f"https://api.n2yo.com/rest/v1/satellite/above/{lat}/{lng}/{alt}/{search_radius}/{category_id}?apiKey={N2YO_API_KEY}"
+            for lat, lng, alt in observers]
+    for url in urls:
+        print("Requesting data from N2YO API:", redact(url))
 
+    with HttpClient() as client:
+        responses = client.get_many(urls)
 
+    results = []
+    for response in responses:
+        print("API response status:", response.status_code)
+        if report is not None:
+            report.add_bytes("fetch", len(response.content))
 
+        try:
+            data = response.json()
+        except Exception as e:
+            print("Failed to parse API response:", e)
+            print("Response content:", response.text)
+            exit(1)
+
+        if "above" not in data:
+            print("Key 'above' not found in API response")
+            exit(1)
+
+        results.append(data["above"])
+    return results
+
+
+# Compute the same "above" list locally from the cached GP catalog. Covers the
+# active payloads in the GP store; N2YO's category 0 also lists debris and
+# rocket bodies.
+def compute_above_local(gp_cache_path=GP_CACHE_PATH, now=None, report=None, ephemeris_path=None):
+    now = now or datetime.datetime.utcnow()
+    store = GPStore(gp_cache_path)
+    print("Logging into Space-Track...")
+    store.refresh(spacetrack_login(SPACETRACK_USERNAME, SPACETRACK_PASSWORD), now=now)
+
+    catalog = load_catalog(store.tle_data(), satrec_cache=store.satrec_cache, report=report)
+    ephemeris = None
+    if ephemeris_path:
+        ephemeris = Ephemeris(ephemeris_path)
+        ephemeris.update(store.tle_data(), now, satrec_cache=store.satrec_cache, report=report)
+    observer = (observer_lat, observer_lng, observer_alt)
+    above = satellites_above(catalog, store.records, now, load_timescale(), [observer], search_radius,
+                             ephemeris=ephemeris)[0]
+    print(f"{len(above)} of {len(catalog)} satellites are above the observer.")
+    if report is not None:
+        report.add_bytes("fetch", store.received_bytes)
+        report.count("satellites", len(catalog))
+    return above
 
 
+# Prepare features
+def build_features(satellites, country_index):
+    features = []
+    enriched_count = 0
+    local_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    country_names = country_index.lookup([sat.get("satid") or 0 for sat in satellites])
+
+    for sat, country_name in zip(satellites, country_names):
+        satid = sat.get("satid")
+        if country_name:
+            enriched_count += 1
+
+        attributes = {
+            "satid": satid,
+            "intDesignator": sat.get("intDesignator"),
+            "satname": sat.get("satname"),
+            "launchDate": sat.get("launchDate"),
+            "satlat": sat.get("satlat"),
+            "satlng": sat.get("satlng"),
+            "satalt": sat.get("satalt"),
+            "last_update": local_time,
+            "country": country_name
+        }
+
+        geometry = {
+            "x": sat.get("satlng"),
+            "y": sat.get("satlat"),
+            "spatialReference": {"wkid": 4326}
+        }
+
+        features.append({"geometry": geometry, "attributes": attributes})
+
+    print(f"Prepared {len(features)} satellite features; {enriched_count} have country names.")
+    return features
+
+
+def run(args, report):
+    # Debugging: Ensure CSV file is visible in the working directory
+    print("Working directory:", os.getcwd())
+    print("Directory contents:", os.listdir())
+
+    # Load the compiled satellite-country index (rebuilt automatically when the CSV changes)
+    with report.stage("load_countries"):
+        country_index = load_country_index(csv_path)
+
+    with report.stage("fetch"), report.profile("fetch"):
+        if args.source == "local":
+            satellites = compute_above_local(args.gp_cache, report=report, ephemeris_path=args.ephemeris)
+        else:
+            satellites = fetch_above_n2yo(report)[0]
+    with report.stage("features"):
+        features = build_features(satellites, country_index)
+    report.count("features", len(features))
+
+    # Connect to ArcGIS Online (imported here: arcgis alone takes seconds to load)
+    with report.stage("agol_login"):
+        from arcgis.gis import GIS
+        from arcgis.features import FeatureLayerCollection
+
+        gis = GIS("https://www.arcgis.com", AGOL_USERNAME, AGOL_PASSWORD)
+        item = gis.content.get(AGOL_ITEM_ID)
+        layer_collection = FeatureLayerCollection.fromitem(item)
+        feature_layer = layer_collection.layers[0]
+
+    # Update features on ArcGIS Online (differential sync keyed by satid)
+    print("Syncing features...")
+    sync = LayerSync(feature_layer, "satid", state_path_for(AGOL_ITEM_ID))
+    with report.stage("upload"):
+        report.record_sync("satellites", sync.sync(features))
+
+    print("Feature upload complete.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the satellites above Little Rock to ArcGIS Online.")
+    parser.add_argument("--source", choices=["local", "n2yo"],
+                        default="local" if SPACETRACK_USERNAME and SPACETRACK_PASSWORD else "n2yo",
+                        help="compute positions locally from Space-Track GP data, or ask N2YO")
+    parser.add_argument("--gp-cache", default=GP_CACHE_PATH,
+                        help=f"local GP element store (default: {GP_CACHE_PATH})")
+    parser.add_argument("--ephemeris", nargs="?", const=EPHEMERIS_PATH, metavar="PATH",
+                        help=f"with --source local, interpolate from a cached ephemeris table "
+                             f"(default path: {EPHEMERIS_PATH})")
+    parser.add_argument("--report", default=default_report_path("upload_satellites"),
+                        help="JSON run report path (default: %(default)s)")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile the fetch/propagation step and add the hot spots to the run report")
+    args = parser.parse_args()
+
+    with RunReport("upload_satellites", args.report, profile=args.profile) as report:
+        run(args, report)
+
+
+if __name__ == "__main__":
+    main()